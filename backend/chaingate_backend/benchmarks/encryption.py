@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Envelope encryption throughput for KYC files and encrypted columns
+Files: streams synthetic documents through the encrypting writer and back
+through the decrypting reader in KYC_UPLOAD_CHUNK_SIZE pieces, against a
+plain copy, and records the peak Python heap (tracemalloc) of each pass.
+
+Columns: inserts and reads back --rows values through an EncryptedString
+column of an in-memory SQLite table, against a plain String column, for
+combinations of data key reuse (ENCRYPTION_KEY_MAX_USES) and unwrapped key
+cache size (ENCRYPTION_KEY_CACHE_SIZE).
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.http_load import git_commit
+from src.security.encryption import EncryptedString, envelope_encryption, generate_key
+
+MIB = 1024 * 1024
+READ_CHUNK = 64 * 1024
+
+# (label, ENCRYPTION_KEY_MAX_USES, ENCRYPTION_KEY_CACHE_SIZE)
+COLUMN_SETUPS = (
+    ('key per value, no cache', 1, 0),
+    ('key per value, cache', 1, 1024),
+    ('shared keys, no cache', 1000, 0),
+    ('shared keys, cache', 1000, 1024),
+)
+
+
+def copy(read, write):
+    while True:
+        chunk = read(READ_CHUNK)
+        if not chunk:
+            break
+        write(chunk)
+
+
+def measure(func, repeat):
+    """Fastest of repeat untraced runs in seconds, and the peak traced heap of one more run in MiB"""
+    elapsed = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = min(elapsed, time.perf_counter() - started)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, round(peak / MIB, 2)
+
+
+def run_file(workdir, size_mb, repeat):
+    source = os.path.join(workdir, 'source.bin')
+    with open(source, 'wb') as handle:
+        for _ in range(int(size_mb * MIB) // MIB):
+            handle.write(os.urandom(MIB))
+    plain = os.path.join(workdir, 'plain.bin')
+    sealed = os.path.join(workdir, 'sealed.bin')
+
+    def plain_copy():
+        with open(source, 'rb') as reader, open(plain, 'wb') as writer:
+            copy(reader.read, writer.write)
+
+    def encrypt():
+        with open(source, 'rb') as reader, open(sealed, 'wb') as raw, envelope_encryption.writer(raw) as writer:
+            copy(reader.read, writer.write)
+
+    def decrypt():
+        with envelope_encryption.open(sealed) as reader:
+            copy(reader.read, lambda chunk: None)
+
+    # Warm the page cache so the passes compare cipher work, not disk
+    plain_copy()
+    results = {'size_mb': size_mb}
+    for name, func in (('copy', plain_copy), ('encrypt', encrypt), ('decrypt', decrypt)):
+        elapsed, peak = measure(func, repeat)
+        results[f'{name}_mb_per_s'] = round(size_mb / elapsed, 1)
+        results[f'{name}_peak_heap_mb'] = peak
+    results['overhead_bytes'] = os.path.getsize(sealed) - os.path.getsize(source)
+    for path in (source, plain, sealed):
+        os.remove(path)
+    return results
+
+
+def run_columns(rows, value_length, repeat):
+    from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, select
+
+    metadata = MetaData()
+    table = Table(
+        'bench', metadata,
+        Column('id', Integer, primary_key=True),
+        Column('plain', String(255)),
+        Column('sealed', EncryptedString(255, context='bench.sealed')),
+    )
+    values = [f'{i:0{value_length}d}' for i in range(rows)]
+    runs = []
+
+    for label, max_uses, cache_size in (('plaintext', None, None),) + COLUMN_SETUPS:
+        column = 'plain' if max_uses is None else 'sealed'
+        if max_uses is not None:
+            envelope_encryption.key_max_uses = max_uses
+            envelope_encryption.key_cache_size = cache_size
+            envelope_encryption.configure(generate_key())
+
+        insert_s = select_s = float('inf')
+        for _ in range(repeat):
+            engine = create_engine('sqlite://')
+            metadata.create_all(engine)
+            with engine.begin() as connection:
+                started = time.perf_counter()
+                connection.execute(table.insert(), [{'id': i, column: value} for i, value in enumerate(values)])
+                insert_s = min(insert_s, time.perf_counter() - started)
+
+            # A fresh cache, as in a worker that has not read these rows before
+            envelope_encryption._cache.clear()
+            stats_before = envelope_encryption.stats()
+            with engine.connect() as connection:
+                started = time.perf_counter()
+                fetched = connection.execute(select(table.c[column]).order_by(table.c.id)).scalars().all()
+                select_s = min(select_s, time.perf_counter() - started)
+            assert fetched == values
+            stats = envelope_encryption.stats()
+            engine.dispose()
+
+        runs.append({
+            'setup': label,
+            'insert_rows_per_s': round(rows / insert_s),
+            'select_rows_per_s': round(rows / select_s),
+            'select_us_per_row': round(select_s / rows * 1e6, 2),
+            'unwraps': stats['key_cache_misses'] - stats_before['key_cache_misses'] if max_uses else 0,
+        })
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ChainGate envelope encryption throughput')
+    parser.add_argument('--sizes', default='1,10,50', help='comma-separated file sizes in MiB')
+    parser.add_argument('--chunk-kb', type=int, default=64, help='ENCRYPTION_CHUNK_SIZE in KiB')
+    parser.add_argument('--rows', type=int, default=20000, help='rows per column run')
+    parser.add_argument('--value-length', type=int, default=12, help='characters per column value')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement; the fastest is kept')
+    parser.add_argument('--output', help='write results JSON here')
+    args = parser.parse_args()
+
+    envelope_encryption.chunk_size = args.chunk_kb * 1024
+    envelope_encryption.configure(generate_key())
+    workdir = tempfile.mkdtemp(prefix='chaingate-encryption-')
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'chunk_kb': args.chunk_kb,
+            'rows': args.rows,
+            'value_length': args.value_length,
+            'repeat': args.repeat,
+        },
+        'files': [],
+        'columns': [],
+    }
+    for size_mb in [float(value) for value in args.sizes.split(',')]:
+        print(f'Files: {size_mb:g} MiB ...')
+        results['files'].append(run_file(workdir, size_mb, args.repeat))
+    print(f'Columns: {args.rows} rows ...')
+    results['columns'] = run_columns(args.rows, args.value_length, args.repeat)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'MiB':>5} {'copy MiB/s':>11} {'enc MiB/s':>10} {'dec MiB/s':>10} "
+          f"{'copy heap':>10} {'enc heap':>9} {'dec heap':>9} {'overhead B':>11}")
+    for run in results['files']:
+        print(f"{run['size_mb']:>5g} {run['copy_mb_per_s']:>11} {run['encrypt_mb_per_s']:>10} "
+              f"{run['decrypt_mb_per_s']:>10} {run['copy_peak_heap_mb']:>10} {run['encrypt_peak_heap_mb']:>9} "
+              f"{run['decrypt_peak_heap_mb']:>9} {run['overhead_bytes']:>11}")
+    print(f"{'column setup':<26} {'insert rows/s':>14} {'select rows/s':>14} {'us/row':>7} {'unwraps':>8}")
+    for run in results['columns']:
+        print(f"{run['setup']:<26} {run['insert_rows_per_s']:>14} {run['select_rows_per_s']:>14} "
+              f"{run['select_us_per_row']:>7} {run['unwraps']:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+HTTP load and latency benchmarks for the ChainGate API
+Boots create_app against a throwaway SQLite database, seeds it deterministically
+and runs concurrent scripted scenarios through the WSGI test client
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+PASSWORD = 'bench123'
+DEFAULT_SCENARIOS = ('login_storm', 'deposit_burst', 'deep_pagination', 'admin_polling', 'admin_review', 'player_dashboard')
+
+
+def configure_environment(db_path, rate_limits):
+    """Point the app at the benchmark database; must run before src is imported"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['RATELIMIT_ENABLED'] = 'True' if rate_limits else 'False'
+    for flag in ('CONFIRMATION_ENGINE_ENABLED', 'STATS_RECONCILE_ENABLED',
+                 'LEDGER_SNAPSHOT_ENABLED', 'LIVE_MONITOR_ENABLED'):
+        os.environ[flag] = 'False'
+
+
+class SqlCounter:
+    """Count statements executed by the current thread"""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def install(self, engine):
+        from sqlalchemy import event
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def reset(self):
+        self.local.count = 0
+
+    def read(self):
+        return getattr(self.local, 'count', 0)
+
+    def _count(self, *args):
+        self.local.count = getattr(self.local, 'count', 0) + 1
+
+
+class Recorder:
+    """Per-thread latency, CPU, statement and error samples, keyed by endpoint label"""
+
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, label, seconds, cpu, statements, error):
+        latencies, cpu_times, sql, errors = self.samples.setdefault(label, ([], [], [], [0]))
+        latencies.append(seconds)
+        cpu_times.append(cpu)
+        sql.append(statements)
+        errors[0] += error
+
+    def merge(self, other):
+        for label, (latencies, cpu_times, sql, errors) in other.samples.items():
+            mine = self.samples.setdefault(label, ([], [], [], [0]))
+            mine[0].extend(latencies)
+            mine[1].extend(cpu_times)
+            mine[2].extend(sql)
+            mine[3][0] += errors[0]
+
+
+class Session:
+    """One virtual user: a test client with its own cookie jar"""
+
+    def __init__(self, app, sql, rng, email=None):
+        self.client = app.test_client()
+        self.sql = sql
+        self.rng = rng
+        self.email = email
+        self.recorder = Recorder()
+        self.state = {}
+
+    def request(self, label, method, path, expect=(200,), **kwargs):
+        self.sql.reset()
+        # Thread CPU time isolates this request's work from the other virtual users
+        cpu_started = time.thread_time()
+        started = time.perf_counter()
+        response = self.client.open(path, method=method, **kwargs)
+        elapsed = time.perf_counter() - started
+        cpu = time.thread_time() - cpu_started
+        self.recorder.add(label, elapsed, cpu, self.sql.read(), response.status_code not in expect)
+        return response
+
+    def login(self):
+        response = self.client.post('/api/auth/login', json={'email': self.email, 'password': PASSWORD})
+        if response.status_code != 200:
+            raise RuntimeError(f'Login failed for {self.email}: {response.status_code}')
+
+
+# Scenarios: each function performs one iteration for one virtual user
+
+def login_storm(session, ctx):
+    email = f"player{session.rng.randrange(ctx['users'])}@bench.local"
+    session.request('POST /api/auth/login', 'POST', '/api/auth/login', json={'email': email, 'password': PASSWORD})
+
+def deposit_burst(session, ctx):
+    session.request('POST /api/player/simulate_deposit', 'POST', '/api/player/simulate_deposit', json={'amount': 0.001})
+    session.state['n'] = session.state.get('n', 0) + 1
+    if session.state['n'] % 4 == 0:
+        session.request(
+            'POST /api/player/withdraw', 'POST', '/api/player/withdraw',
+            json={'amount': 0.0005, 'address': 'tb1qbenchmarkdestination'}
+        )
+
+def deep_pagination(session, ctx):
+    pages = max(1, ctx['tx_per_user'] // 20)
+    page = session.rng.randrange(pages // 2, pages) + 1 if pages > 1 else 1
+    session.request(
+        'GET /api/player/transactions?page=deep', 'GET', f'/api/player/transactions?page={page}&per_page=20'
+    )
+
+    # Walk the same depth with cursors, one request per page
+    cursor = session.state.get('cursor', '')
+    response = session.request(
+        'GET /api/player/transactions?cursor', 'GET', f'/api/player/transactions?per_page=20&cursor={cursor}'
+    )
+    data = response.get_json(silent=True) or {}
+    session.state['cursor'] = data.get('next_cursor') or ''
+
+def admin_polling(session, ctx):
+    session.request('GET /api/admin/dashboard', 'GET', '/api/admin/dashboard')
+    session.request('GET /api/admin/transactions', 'GET', '/api/admin/transactions?per_page=50')
+
+def admin_review(session, ctx):
+    # Full-size review pages, where per-row serialization dominates
+    session.request('GET /api/admin/transactions?per_page=100', 'GET', '/api/admin/transactions?per_page=100')
+    cursor = session.state.get('cursor', '')
+    response = session.request(
+        'GET /api/admin/transactions?cursor', 'GET', f'/api/admin/transactions?per_page=100&cursor={cursor}'
+    )
+    data = response.get_json(silent=True) or {}
+    session.state['cursor'] = data.get('next_cursor') or ''
+
+def player_dashboard(session, ctx):
+    session.request('GET /api/player/dashboard', 'GET', '/api/player/dashboard')
+    session.request('GET /api/player/balance', 'GET', '/api/player/balance')
+
+
+SCENARIOS = {
+    'login_storm': (login_storm, None),
+    'deposit_burst': (deposit_burst, 'player'),
+    'deep_pagination': (deep_pagination, 'player'),
+    'admin_polling': (admin_polling, 'admin'),
+    'admin_review': (admin_review, 'admin'),
+    'player_dashboard': (player_dashboard, 'player'),
+}
+
+
+def seed(app, users, tx_per_user, seed_value):
+    """Bulk-load users, wallets, transactions and compliance rules"""
+    from werkzeug.security import generate_password_hash
+    from src.database import db
+    from src.models.user import User, Wallet, Transaction, ComplianceRule
+    from src.services.dashboard_stats import dashboard_stats
+
+    rng = random.Random(seed_value)
+    password_hash = generate_password_hash(PASSWORD)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as connection:
+            connection.execute(User.__table__.insert(), [
+                {'username': 'bench_admin', 'email': 'admin@bench.local', 'password_hash': password_hash,
+                 'role': 'admin', 'kyc_status': 'verified', 'risk_level': 'low', 'is_active': True}
+            ] + [
+                {'username': f'player{i}', 'email': f'player{i}@bench.local', 'password_hash': password_hash,
+                 'role': 'player', 'kyc_status': rng.choice(('verified', 'verified', 'pending')),
+                 'risk_level': 'low', 'is_active': True}
+                for i in range(users)
+            ])
+            user_ids = [row[0] for row in connection.execute(
+                db.select(User.id).where(User.role == 'player').order_by(User.id)
+            )]
+            connection.execute(Wallet.__table__.insert(), [
+                {'user_id': user_id, 'address': f'tb1qbench{user_id:08d}', 'balance': 10}
+                for user_id in user_ids
+            ])
+            connection.execute(ComplianceRule.__table__.insert(), [
+                {'rule_name': 'Daily Deposit Limit', 'rule_type': 'deposit_limit', 'threshold': 1, 'is_active': True},
+                {'rule_name': 'Withdrawal Limit', 'rule_type': 'withdrawal_limit', 'threshold': 0.5, 'is_active': True},
+                {'rule_name': 'Transaction Monitoring', 'rule_type': 'transaction_monitoring', 'threshold': 0.1, 'is_active': True},
+            ])
+
+            rows = []
+            for user_id in user_ids:
+                for n in range(tx_per_user):
+                    created = now - timedelta(days=30) + timedelta(seconds=rng.randrange(30 * 86400))
+                    rows.append({
+                        'user_id': user_id,
+                        'type': rng.choice(('deposit', 'deposit', 'withdrawal')),
+                        'amount': round(rng.uniform(0.0001, 0.2), 8),
+                        'status': 'completed',
+                        'tx_hash': f'bench_seed_{user_id}_{n}',
+                        'confirmations': 6,
+                        'flagged': rng.random() < 0.02,
+                        'created_at': created,
+                        'updated_at': created,
+                    })
+                    if len(rows) >= 10000:
+                        connection.execute(Transaction.__table__.insert(), rows)
+                        rows = []
+            if rows:
+                connection.execute(Transaction.__table__.insert(), rows)
+
+        dashboard_stats.reconcile()
+        return user_ids
+
+
+def run_scenario(app, sql, name, ctx, threads, duration, seed_value):
+    """Run one scenario on N threads for a fixed duration and summarize per endpoint"""
+    step, role = SCENARIOS[name]
+    sessions = []
+    for i in range(threads):
+        rng = random.Random(f'{seed_value}:{name}:{i}')
+        email = 'admin@bench.local' if role == 'admin' else f"player{i % ctx['users']}@bench.local"
+        session = Session(app, sql, rng, email)
+        if role:
+            session.login()
+        sessions.append(session)
+
+    barrier = threading.Barrier(threads + 1)
+    deadline = [0.0]
+
+    def worker(session):
+        barrier.wait()
+        while time.perf_counter() < deadline[0]:
+            step(session, ctx)
+
+    pool = [threading.Thread(target=worker, args=(session,)) for session in sessions]
+    for thread in pool:
+        thread.start()
+    deadline[0] = time.perf_counter() + duration
+    started = time.perf_counter()
+    barrier.wait()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    recorder = Recorder()
+    for session in sessions:
+        recorder.merge(session.recorder)
+
+    endpoints = {}
+    for label, (latencies, cpu_times, statements, errors) in sorted(recorder.samples.items()):
+        ms = np.array(latencies) * 1000
+        endpoints[label] = {
+            'requests': len(latencies),
+            'errors': errors[0],
+            'throughput_rps': round(len(latencies) / elapsed, 2),
+            'mean_ms': round(float(ms.mean()), 3),
+            'p50_ms': round(float(np.percentile(ms, 50)), 3),
+            'p95_ms': round(float(np.percentile(ms, 95)), 3),
+            'p99_ms': round(float(np.percentile(ms, 99)), 3),
+            'cpu_ms': round(float(np.mean(cpu_times)) * 1000, 3),
+            'sql_per_request': round(float(np.mean(statements)), 2),
+        }
+    return {'threads': threads, 'duration_s': round(elapsed, 3), 'endpoints': endpoints}
+
+
+def compare(results, baseline, threshold):
+    """List regressions of current results against a baseline"""
+    regressions = []
+    for scenario, data in results['scenarios'].items():
+        base_endpoints = baseline.get('scenarios', {}).get(scenario, {}).get('endpoints', {})
+        for label, current in data['endpoints'].items():
+            base = base_endpoints.get(label)
+            if not base:
+                continue
+            where = f'{scenario} {label}'
+            if current['p95_ms'] > base['p95_ms'] * (1 + threshold):
+                regressions.append(f"{where}: p95 {base['p95_ms']}ms -> {current['p95_ms']}ms")
+            if 'cpu_ms' in base and current['cpu_ms'] > base['cpu_ms'] * (1 + threshold):
+                regressions.append(f"{where}: CPU/request {base['cpu_ms']}ms -> {current['cpu_ms']}ms")
+            if current['throughput_rps'] < base['throughput_rps'] * (1 - threshold):
+                regressions.append(f"{where}: throughput {base['throughput_rps']} -> {current['throughput_rps']} req/s")
+            # Statement counts are deterministic, so any increase is a regression
+            if current['sql_per_request'] > base['sql_per_request'] + 0.05:
+                regressions.append(f"{where}: SQL/request {base['sql_per_request']} -> {current['sql_per_request']}")
+            if current['errors'] > base['errors']:
+                regressions.append(f"{where}: errors {base['errors']} -> {current['errors']}")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results):
+    print(f"{'scenario':<18} {'endpoint':<44} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'cpu':>7} {'sql':>5} {'err':>4}")
+    for scenario, data in results['scenarios'].items():
+        for label, m in data['endpoints'].items():
+            print(f"{scenario:<18} {label:<44} {m['throughput_rps']:>9.1f} {m['p50_ms']:>8.2f} "
+                  f"{m['p95_ms']:>8.2f} {m['p99_ms']:>8.2f} {m['cpu_ms']:>7.2f} {m['sql_per_request']:>5.1f} {m['errors']:>4}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ChainGate HTTP load and latency benchmarks')
+    parser.add_argument('--scenarios', default=','.join(DEFAULT_SCENARIOS), help='comma-separated scenario names')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent virtual users per scenario')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per scenario')
+    parser.add_argument('--users', type=int, default=200, help='seeded players')
+    parser.add_argument('--tx-per-user', type=int, default=200, help='seeded transactions per player')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--rate-limits', action='store_true', help='keep rate limiting enabled')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', help='compare against this results JSON')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed relative slowdown')
+    parser.add_argument('--save-baseline', help='also write results to this baseline path')
+    parser.add_argument('--keep-db', action='store_true', help='keep the SQLite file')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='chaingate-bench-'), 'bench.db')
+    configure_environment(db_path, args.rate_limits)
+
+    from src.main import create_app
+    from src.database import db
+    from src.services.audit_pipeline import audit_pipeline
+
+    app = create_app('production')
+    print(f'Seeding {args.users} players x {args.tx_per_user} transactions into {db_path}')
+    seed(app, args.users, args.tx_per_user, args.seed)
+
+    sql = SqlCounter()
+    with app.app_context():
+        sql.install(db.engine)
+
+    ctx = {'users': args.users, 'tx_per_user': args.tx_per_user}
+    results = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'threads': args.threads,
+            'duration_s': args.duration,
+            'users': args.users,
+            'tx_per_user': args.tx_per_user,
+            'seed': args.seed,
+            'rate_limits': args.rate_limits,
+        },
+        'scenarios': {},
+    }
+    for name in names:
+        print(f'Running {name} ...')
+        results['scenarios'][name] = run_scenario(app, sql, name, ctx, args.threads, args.duration, args.seed)
+        with app.app_context():
+            audit_pipeline.flush()
+
+    print_table(results)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f'Wrote {path}')
+
+    if not args.keep_db:
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(db_path + suffix)
+            except OSError:
+                pass
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regression(s) against {args.baseline}:')
+            for line in regressions:
+                print(f'  {line}')
+            sys.exit(1)
+        print(f'No regressions against {args.baseline} (threshold {args.threshold:.0%})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Job queue throughput against worker process count
+Fills a throwaway queue with synthetic jobs, drains it with `jobs-worker` pools
+of increasing size and reports jobs per second, speedup over one process, and
+the enqueue latency a request handler pays.
+
+Work kinds:
+  sleep  each job waits --job-ms, like a job bound on database or file I/O
+  cpu    each job spins for --job-ms; only scales up to the number of cores
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import signal
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.http_load import configure_environment, git_commit
+
+
+def sleep_job(ms):
+    time.sleep(ms / 1000)
+
+
+def cpu_job(ms):
+    deadline = time.thread_time() + ms / 1000
+    while time.thread_time() < deadline:
+        pass
+
+
+def fill(queue, kind, jobs, job_ms):
+    """Enqueue the jobs and return per-call latencies in milliseconds"""
+    latencies = []
+    for _ in range(jobs):
+        started = time.perf_counter()
+        queue.enqueue(f'bench.{kind}', {'ms': job_ms})
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def drain(queue, processes, jobs, timeout):
+    """Run a worker pool until the queue is empty and return the busy span in seconds"""
+    supervisor = multiprocessing.get_context('fork').Process(target=queue.run_pool, args=(processes,))
+    supervisor.start()
+    deadline = time.monotonic() + timeout
+    connection = queue._connection()
+    try:
+        while True:
+            done = connection.execute("SELECT COUNT(*) FROM jobs WHERE status = 'succeeded'").fetchone()[0]
+            if done >= jobs:
+                break
+            if time.monotonic() > deadline:
+                raise RuntimeError(f'{done}/{jobs} jobs finished before the timeout')
+            time.sleep(0.05)
+    finally:
+        os.kill(supervisor.pid, signal.SIGTERM)
+        supervisor.join(30)
+    # First claim to last completion, so pool start-up is not counted
+    first, last = connection.execute('SELECT MIN(started_at), MAX(finished_at) FROM jobs').fetchone()
+    return last - first
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ChainGate job queue throughput per worker process count')
+    parser.add_argument('--processes', default='1,2,4,8', help='comma-separated pool sizes')
+    parser.add_argument('--jobs', type=int, default=400, help='jobs per run')
+    parser.add_argument('--job-ms', type=float, default=20.0, help='work per job in milliseconds')
+    parser.add_argument('--work', choices=('sleep', 'cpu'), default='sleep')
+    parser.add_argument('--synchronous', default='FULL', help='SQLite synchronous mode of the queue file')
+    parser.add_argument('--timeout', type=float, default=300.0, help='seconds allowed per run')
+    parser.add_argument('--output', help='write results JSON here')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='chaingate-jobs-')
+    configure_environment(os.path.join(workdir, 'app.db'), rate_limits=False)
+    os.environ['JOB_QUEUE_PATH'] = os.path.join(workdir, 'jobs.db')
+    os.environ['JOB_SYNCHRONOUS'] = args.synchronous
+    os.environ['JOB_POLL_INTERVAL'] = '0.05'
+
+    from src.main import create_app
+    from src.services.job_queue import job_queue
+
+    create_app('production')
+    job_queue.task('bench.sleep')(sleep_job)
+    job_queue.task('bench.cpu')(cpu_job)
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'jobs': args.jobs,
+            'job_ms': args.job_ms,
+            'work': args.work,
+            'synchronous': args.synchronous,
+        },
+        'runs': [],
+    }
+    for processes in [int(value) for value in args.processes.split(',')]:
+        job_queue._connection().execute('DELETE FROM jobs')
+        latencies = fill(job_queue, args.work, args.jobs, args.job_ms)
+        print(f'Draining {args.jobs} {args.work} jobs with {processes} process(es) ...')
+        span = drain(job_queue, processes, args.jobs, args.timeout)
+        results['runs'].append({
+            'processes': processes,
+            'jobs_per_s': round(args.jobs / span, 1),
+            'span_s': round(span, 3),
+            'enqueue_p50_ms': round(float(np.percentile(latencies, 50)), 3),
+            'enqueue_p95_ms': round(float(np.percentile(latencies, 95)), 3),
+        })
+
+    base = results['runs'][0]['jobs_per_s'] / results['runs'][0]['processes']
+    ideal = 1000 / args.job_ms
+    print(f"{'procs':>5} {'jobs/s':>9} {'speedup':>8} {'of ideal':>9} {'enq p50':>8} {'enq p95':>8}")
+    for run in results['runs']:
+        run['speedup'] = round(run['jobs_per_s'] / base, 2)
+        print(f"{run['processes']:>5} {run['jobs_per_s']:>9.1f} {run['speedup']:>8.2f} "
+              f"{run['jobs_per_s'] / (ideal * run['processes']):>9.0%} "
+              f"{run['enqueue_p50_ms']:>8.3f} {run['enqueue_p95_ms']:>8.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+KYC upload memory and burst behaviour per gunicorn worker
+Runs single-worker gunicorn instances against a throwaway database and storage
+directory:
+
+  sizes  uploads one file of each size to a fresh worker and records the
+         worker's peak RSS (VmHWM) and the upload rate
+  burst  fires --burst concurrent uploads while probing /health and counts
+         accepted, busy (503) and failed responses, in two layouts:
+           shared  uploads and /health on the same API worker
+           split   uploads on an upload-pool worker (CHAINGATE_SERVE=upload),
+                   /health on its own API worker, as nginx routes them
+
+Validation jobs are only queued; no job worker runs during the benchmark.
+Needs aiohttp.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import struct
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.http_load import configure_environment, git_commit, seed
+from benchmarks.socket_connections import free_port, login, start_server, stop_server, worker_rss_mb
+
+MIB = 1024 * 1024
+
+
+def document(size, seed_value):
+    """A PNG header that passes validation, padded with unique bytes to the given size"""
+    header = b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>II', 1200, 800)
+    header += b'\x08\x02\x00\x00\x00\x00\x00\x00\x00' + struct.pack('>Q', seed_value)
+    return header + os.urandom(max(0, size - len(header)))
+
+
+async def upload(http, base_url, cookie, body, timeout):
+    import aiohttp
+
+    started = time.perf_counter()
+    try:
+        async with http.post(f'{base_url}/api/kyc/documents?document_type=passport', data=body,
+                             headers={'Cookie': cookie, 'Content-Type': 'application/octet-stream'},
+                             timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            await response.read()
+            status = response.status
+    except Exception as e:
+        status = type(e).__name__
+    return status, (time.perf_counter() - started) * 1000
+
+
+async def probe_health(http, base_url, done, timeout):
+    """Sequential /health requests until the burst is over"""
+    import aiohttp
+
+    latencies, errors = [], 0
+    while not done.is_set():
+        started = time.perf_counter()
+        try:
+            async with http.get(f'{base_url}/health', timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                await response.read()
+                if response.status != 200:
+                    errors += 1
+                    continue
+        except Exception:
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.05)
+    return latencies, errors
+
+
+async def run_size(base_url, size_mb, timeout, master_pid):
+    import aiohttp
+
+    body = document(int(size_mb * MIB), int(size_mb * 1000))
+    async with aiohttp.ClientSession() as http:
+        cookie = await login(http, base_url)
+        before = worker_rss_mb(master_pid, 'VmHWM')
+        status, elapsed_ms = await upload(http, base_url, cookie, body, timeout)
+    return {
+        'size_mb': size_mb,
+        'status': status,
+        'upload_ms': round(elapsed_ms, 1),
+        'mb_per_s': round(size_mb / (elapsed_ms / 1000), 1),
+        'peak_rss_before_mb': before,
+        'peak_rss_after_mb': worker_rss_mb(master_pid, 'VmHWM'),
+    }
+
+
+async def run_burst(upload_url, health_url, uploads, size_kb, timeout, master_pid):
+    import aiohttp
+
+    bodies = [document(size_kb * 1024, i) for i in range(uploads)]
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as http:
+        cookie = await login(http, upload_url)
+        done = asyncio.Event()
+        health = asyncio.ensure_future(probe_health(http, health_url, done, timeout))
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(upload(http, upload_url, cookie, body, timeout) for body in bodies))
+        span = time.perf_counter() - started
+        done.set()
+        latencies, health_errors = await health
+
+    statuses = {}
+    for status, _ in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    accepted = [elapsed for status, elapsed in outcomes if status in (200, 201, 202)]
+    return {
+        'uploads': uploads,
+        'size_kb': size_kb,
+        'statuses': statuses,
+        'span_s': round(span, 2),
+        'accepted_p95_ms': _percentile(accepted, 95),
+        'health_samples': len(latencies),
+        'health_p50_ms': _percentile(latencies, 50),
+        'health_p95_ms': _percentile(latencies, 95),
+        'health_errors': health_errors,
+        'peak_rss_mb': worker_rss_mb(master_pid, 'VmHWM'),
+    }
+
+
+def _percentile(values, q):
+    return round(float(np.percentile(values, q)), 2) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ChainGate KYC upload memory and burst behaviour')
+    parser.add_argument('--sizes', default='1,10,50', help='comma-separated upload sizes in MiB')
+    parser.add_argument('--burst', type=int, default=1000, help='concurrent uploads in the burst')
+    parser.add_argument('--burst-kb', type=int, default=256, help='size of each burst upload in KiB')
+    parser.add_argument('--concurrency', type=int, default=2, help='KYC_UPLOAD_CONCURRENCY of the worker')
+    parser.add_argument('--timeout', type=float, default=120.0, help='seconds allowed per request')
+    parser.add_argument('--output', help='write results JSON here')
+    args = parser.parse_args()
+    if shutil.which('gunicorn') is None:
+        parser.error('gunicorn is not installed')
+
+    workdir = tempfile.mkdtemp(prefix='chaingate-kyc-')
+    configure_environment(os.path.join(workdir, 'bench.db'), rate_limits=False)
+    os.environ['JOB_QUEUE_PATH'] = os.path.join(workdir, 'jobs.db')
+    os.environ['KYC_STORAGE_DIR'] = os.path.join(workdir, 'kyc')
+    os.environ['KYC_UPLOAD_CONCURRENCY'] = str(args.concurrency)
+
+    from src.main import create_app
+
+    seed(create_app('production'), users=2, tx_per_user=1, seed_value=42)
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'upload_concurrency': args.concurrency,
+        },
+        'sizes': [],
+        'burst': {},
+    }
+    env = dict(os.environ, FLASK_CONFIG='production', METRICS_ENABLED='False')
+
+    def start(mode, label):
+        port = free_port()
+        process = start_server(mode, port, env, os.path.join(workdir, f'gunicorn-{label}.log'))
+        return f'http://127.0.0.1:{port}', process
+
+    for size_mb in [float(value) for value in args.sizes.split(',')]:
+        print(f'Uploading {size_mb:g} MiB to a fresh worker ...')
+        url, process = start('gthread', f'{size_mb:g}mb')
+        try:
+            results['sizes'].append(asyncio.run(run_size(url, size_mb, args.timeout, process.pid)))
+        finally:
+            stop_server(process)
+
+    for layout in ('shared', 'split') if args.burst else ():
+        print(f'Bursting {args.burst} x {args.burst_kb} KiB uploads ({layout}) ...')
+        api_url, api = start('gthread', f'{layout}-api')
+        upload_url, uploader = (api_url, api) if layout == 'shared' else start('upload', f'{layout}-upload')
+        try:
+            results['burst'][layout] = asyncio.run(run_burst(
+                upload_url, api_url, args.burst, args.burst_kb, args.timeout, uploader.pid,
+            ))
+        finally:
+            stop_server(api)
+            if uploader is not api:
+                stop_server(uploader)
+
+    print(f"{'size MiB':>9} {'status':>7} {'ms':>9} {'MiB/s':>7} {'peak before':>12} {'peak after':>11}")
+    for run in results['sizes']:
+        print(f"{run['size_mb']:>9g} {run['status']:>7} {run['upload_ms']:>9.1f} {run['mb_per_s']:>7.1f} "
+              f"{run['peak_rss_before_mb']:>12} {run['peak_rss_after_mb']:>11}")
+    for layout, burst in results['burst'].items():
+        print(f"{layout} burst: {burst['uploads']} x {burst['size_kb']} KiB in {burst['span_s']} s, "
+              f"statuses {burst['statuses']}, health p50/p95 {burst['health_p50_ms']}/{burst['health_p95_ms']} ms "
+              f"over {burst['health_samples']} probes, {burst['health_errors']} errors, "
+              f"upload worker peak RSS {burst['peak_rss_mb']} MiB")
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f'Wrote {args.output}')
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Concurrent Socket.IO connections per gunicorn worker
+Seeds a throwaway SQLite database, starts one gunicorn worker per serving mode
+and opens authenticated Socket.IO clients against it in steps. For each step it
+records how many clients completed the connect/join round trip, how long that
+took, how /health responds while the sockets are held, and the worker's RSS.
+
+Modes:
+  sync     bare gunicorn (empty config, sync worker), the previous deployment
+  gthread  CHAINGATE_SERVE=api from gunicorn.conf.py
+  gevent   CHAINGATE_SERVE=socket from gunicorn.conf.py
+
+Needs the python-socketio asyncio client: pip install "python-socketio[asyncio_client]"
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.http_load import PASSWORD, configure_environment, git_commit, seed
+
+MODES = ('sync', 'gthread', 'gevent')
+SERVE_MODES = {'gthread': 'api', 'gevent': 'socket'}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, port, env, log_path):
+    """Start gunicorn with a single worker in the given mode, or in a CHAINGATE_SERVE mode by name"""
+    env = dict(env, GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_WORKERS='1', GUNICORN_ERROR_LOG=log_path)
+    if mode == 'sync':
+        # What an empty gunicorn.conf.py gave us: defaults throughout
+        empty = os.path.join(os.path.dirname(log_path), 'empty.conf.py')
+        open(empty, 'w').close()
+        env['SOCKETIO_ASYNC_MODE'] = 'threading'
+        command = ['gunicorn', '-c', empty, '-b', f'127.0.0.1:{port}', '--error-logfile', log_path, 'wsgi:app']
+    else:
+        env['CHAINGATE_SERVE'] = SERVE_MODES.get(mode, mode)
+        env['METRICS_DIR'] = tempfile.mkdtemp(prefix=f'chaingate-metrics-{mode}-')
+        command = ['gunicorn', '-c', 'gunicorn.conf.py']
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, start_new_session=True)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn ({mode}) exited with {process.returncode}; see {log_path}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f'gunicorn ({mode}) did not start; see {log_path}')
+
+
+def stop_server(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def worker_rss_mb(master_pid, field='VmRSS'):
+    """Resident memory of the master's worker children, in MiB (Linux only); VmHWM gives the peak"""
+    total = 0
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as handle:
+                ppid = int(handle.read().rsplit(')', 1)[1].split()[1])
+            if ppid != master_pid:
+                continue
+            with open(f'/proc/{entry}/status') as handle:
+                for line in handle:
+                    if line.startswith(f'{field}:'):
+                        total += int(line.split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+    return round(total / 1024, 1)
+
+
+async def login(http, base_url):
+    async with http.post(f'{base_url}/api/auth/login',
+                         json={'email': 'player0@bench.local', 'password': PASSWORD}) as response:
+        if response.status != 200:
+            raise RuntimeError(f'login failed with {response.status}')
+        return '; '.join(f'{name}={morsel.value}' for name, morsel in response.cookies.items())
+
+
+async def open_client(base_url, cookie, timeout, clients, failures):
+    """Connect, join the user's room and wait for the server's acknowledgement"""
+    import socketio
+
+    client = socketio.AsyncClient(reconnection=False)
+    joined = asyncio.Event()
+    client.on('joined', lambda data: joined.set())
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(_connect(client, base_url, cookie, joined), timeout)
+    except Exception as e:
+        failures.append(type(e).__name__)
+        await _discard(client)
+        return None
+    clients.append(client)
+    return (time.perf_counter() - started) * 1000
+
+
+async def _connect(client, base_url, cookie, joined):
+    await client.connect(base_url, headers={'Cookie': cookie}, wait_timeout=60)
+    await client.emit('join', {})
+    await joined.wait()
+
+
+async def _discard(client):
+    try:
+        await asyncio.wait_for(client.disconnect(), 5)
+    except Exception:
+        pass
+
+
+async def probe_health(http, base_url, samples, timeout):
+    """Sequential /health requests while the sockets are held"""
+    import aiohttp
+
+    latencies, errors = [], 0
+    for _ in range(samples):
+        started = time.perf_counter()
+        try:
+            async with http.get(f'{base_url}/health', timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                await response.read()
+                if response.status != 200:
+                    errors += 1
+                    continue
+        except Exception:
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies, errors
+
+
+async def run_step(base_url, connections, ramp, connect_timeout, hold, health_samples, master_pid):
+    import aiohttp
+
+    clients, failures, connect_ms = [], [], []
+    async with aiohttp.ClientSession() as http:
+        cookie = await login(http, base_url)
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(ramp)
+
+        async def one():
+            async with semaphore:
+                elapsed = await open_client(base_url, cookie, connect_timeout, clients, failures)
+                if elapsed is not None:
+                    connect_ms.append(elapsed)
+
+        await asyncio.gather(*(one() for _ in range(connections)))
+        ramp_s = time.perf_counter() - started
+
+        # Sockets stay open through at least one Engine.IO ping cycle
+        await asyncio.sleep(hold)
+        still_connected = sum(1 for client in clients if client.connected)
+        health, health_errors = await probe_health(http, base_url, health_samples, connect_timeout)
+        rss = worker_rss_mb(master_pid)
+
+        await asyncio.gather(*(_discard(client) for client in clients))
+
+    return {
+        'connections': connections,
+        'connected': len(clients),
+        'held': still_connected,
+        'failed': len(failures),
+        'failure_kinds': sorted(set(failures)),
+        'ramp_s': round(ramp_s, 2),
+        'connect_p50_ms': _percentile(connect_ms, 50),
+        'connect_p95_ms': _percentile(connect_ms, 95),
+        'health_p50_ms': _percentile(health, 50),
+        'health_p95_ms': _percentile(health, 95),
+        'health_errors': health_errors,
+        'worker_rss_mb': rss,
+    }
+
+
+def _percentile(values, q):
+    return round(float(np.percentile(values, q)), 2) if values else None
+
+
+def print_table(results):
+    print(f"{'mode':<8} {'target':>7} {'conn':>6} {'held':>6} {'fail':>5} {'ramp s':>7} "
+          f"{'conn p95':>9} {'health p50':>11} {'health p95':>11} {'h err':>6} {'rss MiB':>8}")
+    for mode, steps in results['modes'].items():
+        for step in steps:
+            print(f"{mode:<8} {step['connections']:>7} {step['connected']:>6} {step['held']:>6} {step['failed']:>5} "
+                  f"{step['ramp_s']:>7.1f} {_cell(step['connect_p95_ms']):>9} {_cell(step['health_p50_ms']):>11} "
+                  f"{_cell(step['health_p95_ms']):>11} {step['health_errors']:>6} {step['worker_rss_mb']:>8}")
+
+
+def _cell(value):
+    return '-' if value is None else f'{value:.1f}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ChainGate Socket.IO connections per gunicorn worker')
+    parser.add_argument('--modes', default=','.join(MODES), help='comma-separated serving modes')
+    parser.add_argument('--connections', default='10,100,500,1000', help='comma-separated client counts per step')
+    parser.add_argument('--ramp', type=int, default=50, help='clients connecting at the same time')
+    parser.add_argument('--connect-timeout', type=float, default=10.0, help='seconds allowed per connect and /health probe')
+    parser.add_argument('--hold', type=float, default=30.0, help='seconds to hold the sockets before probing')
+    parser.add_argument('--health-samples', type=int, default=20)
+    parser.add_argument('--output', help='write results JSON here')
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(unknown)}")
+    if shutil.which('gunicorn') is None:
+        parser.error('gunicorn is not installed')
+    steps = [int(value) for value in args.connections.split(',')]
+
+    workdir = tempfile.mkdtemp(prefix='chaingate-sockets-')
+    db_path = os.path.join(workdir, 'bench.db')
+    configure_environment(db_path, rate_limits=False)
+
+    from src.main import create_app
+
+    print(f'Seeding {db_path}')
+    seed(create_app('production'), users=10, tx_per_user=10, seed_value=42)
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'ramp': args.ramp,
+            'hold_s': args.hold,
+            'connect_timeout_s': args.connect_timeout,
+        },
+        'modes': {},
+    }
+    env = dict(os.environ, FLASK_CONFIG='production', METRICS_ENABLED='False')
+    for mode in modes:
+        results['modes'][mode] = []
+        for connections in steps:
+            port = free_port()
+            log_path = os.path.join(workdir, f'gunicorn-{mode}-{connections}.log')
+            print(f'Running {mode} with {connections} clients ...')
+            process = start_server(mode, port, env, log_path)
+            try:
+                step = asyncio.run(run_step(
+                    f'http://127.0.0.1:{port}', connections, args.ramp, args.connect_timeout,
+                    args.hold, args.health_samples, process.pid,
+                ))
+            finally:
+                stop_server(process)
+            results['modes'][mode].append(step)
+            # A mode that already failed most clients will not do better with more
+            if step['connected'] < connections / 2:
+                break
+
+    print_table(results)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f'Wrote {args.output}')
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
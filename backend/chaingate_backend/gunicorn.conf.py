@@ -0,0 +1,102 @@
+"""
+Gunicorn settings for ChainGate
+Two serving modes, chosen with CHAINGATE_SERVE and run as separate gunicorn
+instances behind nginx (see deployment/nginx.conf):
+
+  api     threaded sync workers for the REST API. CPU-bound requests get a
+          process each; a few threads per process overlap database waits.
+  socket  one gevent worker per instance for /socket.io. Every connection is
+          a greenlet, so one worker holds thousands of idle sockets. Run one
+          instance per core on consecutive ports; nginx pins each client to
+          one of them, since Socket.IO long-polling needs sticky sessions.
+  upload  threaded workers for /api/kyc only. A burst of document uploads
+          queues here instead of in front of the API pool's threads.
+
+Run from the chaingate_backend directory:
+  CHAINGATE_SERVE=api gunicorn -c gunicorn.conf.py
+  CHAINGATE_SERVE=socket GUNICORN_BIND=127.0.0.1:5101 gunicorn -c gunicorn.conf.py
+  CHAINGATE_SERVE=upload gunicorn -c gunicorn.conf.py
+"""
+
+import glob
+import multiprocessing
+import os
+import tempfile
+
+mode = os.getenv('CHAINGATE_SERVE', 'api')
+if mode not in ('api', 'socket', 'upload'):
+    raise RuntimeError(f'CHAINGATE_SERVE must be api, socket or upload, not {mode!r}')
+
+wsgi_app = 'wsgi:app'
+proc_name = f'chaingate-{mode}'
+
+# Behind nginx: keep-alive only has to outlast the proxy's idle upstream connections
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+forwarded_allow_ips = os.getenv('GUNICORN_FORWARDED_ALLOW_IPS', '127.0.0.1')
+# Heartbeat files on tmpfs, so a slow disk cannot make the arbiter kill healthy workers
+worker_tmp_dir = os.getenv('GUNICORN_WORKER_TMP_DIR', '/dev/shm' if os.path.isdir('/dev/shm') else None)
+accesslog = os.getenv('GUNICORN_ACCESS_LOG')
+errorlog = os.getenv('GUNICORN_ERROR_LOG', '-')
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+# Workers import the app after fork (and after gevent has patched the standard library)
+preload_app = False
+
+if mode == 'api':
+    bind = os.getenv('GUNICORN_BIND', '127.0.0.1:5000')
+    worker_class = 'gthread'
+    workers = int(os.getenv('GUNICORN_WORKERS', str(multiprocessing.cpu_count() + 1)))
+    threads = int(os.getenv('GUNICORN_THREADS', '4'))
+    timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+    # Recycle workers now and then so slow leaks cannot grow without bound
+    max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '5000'))
+    max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '500'))
+    # API workers emit through the message queue; socket clients are served by the socket pool
+    os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'threading')
+elif mode == 'socket':
+    bind = os.getenv('GUNICORN_BIND', '127.0.0.1:5101')
+    worker_class = 'gevent'
+    # Socket.IO sessions live in one process; scale out with more instances, not workers
+    workers = 1
+    worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '5000'))
+    timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+    # Recycling would drop every open socket at once
+    max_requests = 0
+    os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'gevent')
+elif mode == 'upload':
+    bind = os.getenv('GUNICORN_BIND', '127.0.0.1:5200')
+    worker_class = 'gthread'
+    workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+    # More threads than KYC_UPLOAD_CONCURRENCY, so uploads past the cap get a quick 503
+    # and a Retry-After instead of waiting in the worker's queue
+    threads = int(os.getenv('GUNICORN_THREADS', '4'))
+    # nginx buffers each body before passing it on, so this covers disk time, not the client
+    timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+    max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '5000'))
+    max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '500'))
+    os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'threading')
+
+# Every pool runs several processes: each block clock would advance confirmations again
+# and each live monitor would poll and push its own deltas. Exactly one
+# `flask confirmations` and one `flask live-monitor` process run them, outside gunicorn
+for flag in ('CONFIRMATION_ENGINE_ENABLED', 'LIVE_MONITOR_ENABLED'):
+    os.environ[flag] = 'False'
+
+if mode != 'api':
+    # Database pollers would stall the socket pool's event loop on driver calls and have
+    # no business in the upload pool; ledger-snapshot and reconcile-stats run from cron
+    for flag in ('STATS_RECONCILE_ENABLED', 'LEDGER_SNAPSHOT_ENABLED'):
+        os.environ.setdefault(flag, 'False')
+
+# nginx is the one proxy in front of every pool
+os.environ.setdefault('PROXY_COUNT', '1')
+
+# Per-worker metrics are merged through this directory when /metrics is scraped
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f'chaingate-metrics-{mode}'))
+
+
+def on_starting(server):
+    # Counters from a previous run of this instance would otherwise be merged forever
+    for path in glob.glob(os.path.join(os.environ['METRICS_DIR'], 'metrics-*.json')):
+        os.remove(path)
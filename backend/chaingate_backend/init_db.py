@@ -3,15 +3,14 @@ import os
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask
-from src.models.user import db, User, Wallet, SystemSetting
+from src.main import create_app
+from src.database import db
+from src.models.user import User, Wallet, SystemSetting
 from src.services.bitcoin_simulator import BitcoinSimulator
 
-# Create Flask app
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
+# Uses the application config, so DATABASE_URL selects the target database.
+# For production-sized data use tools/generate_dataset.py instead.
+app = create_app()
 
 def init_database():
     with app.app_context():
@@ -19,8 +18,8 @@ def init_database():
         db.create_all()
 
         print("Checking for existing users...")
-        existing_users = User.query.all()
-        print(f"Found {len(existing_users)} existing users")
+        existing_users = db.session.query(User.id).count()
+        print(f"Found {existing_users} existing users")
 
         if not existing_users:
             print("Creating demo users...")
@@ -62,13 +61,15 @@ def init_database():
                 )
                 user.set_password(user_data['password'])
                 db.session.add(user)
+                # Assigns user.id for the wallet
+                db.session.flush()
                 print(f"Created user: {user.username}")
 
                 # Create wallet for demo user
                 btc_address = bitcoin_simulator.generate_address(user.id)
                 wallet = Wallet(
                     user_id=user.id,
-                    btc_address=btc_address,
+                    address=btc_address,
                     balance=0.0
                 )
                 db.session.add(wallet)
@@ -103,7 +104,10 @@ def init_database():
                 }
             ]
 
+            existing_keys = {key for key, in db.session.query(SystemSetting.key)}
             for setting_data in settings:
+                if setting_data['key'] in existing_keys:
+                    continue
                 setting = SystemSetting(
                     key=setting_data['key'],
                     value=setting_data['value'],
@@ -122,13 +126,13 @@ def init_database():
         else:
             print("Database already has users, skipping initialization")
 
-        # Verify the database
-        users = User.query.all()
+        # Verify the database; one joined query, capped for generated datasets
+        users = db.session.query(User, Wallet).outerjoin(Wallet, Wallet.user_id == User.id)\
+            .order_by(User.id).limit(20).all()
         print(f"\nDatabase verification:")
-        print(f"Total users: {len(users)}")
-        for user in users:
-            wallet = Wallet.query.filter_by(user_id=user.id).first()
-            print(f"  {user.username} ({user.email}) - Wallet: {wallet.btc_address if wallet else 'None'} - Balance: {wallet.balance if wallet else 'N/A'}")
+        print(f"Total users: {db.session.query(User.id).count()}")
+        for user, wallet in users:
+            print(f"  {user.username} ({user.email}) - Wallet: {wallet.address if wallet else 'None'} - Balance: {wallet.balance if wallet else 'N/A'}")
 
         return True
 
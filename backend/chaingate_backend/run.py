@@ -2,26 +2,25 @@
 """
 Simple runner script for ChainGate application
 Run this from the chaingate_backend directory
+Development only; production is served by gunicorn (see gunicorn.conf.py)
 """
 
 import os
-import sys
 
-# Add the src directory to Python path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
-
-from main import create_app
+from src.main import create_app
+from src.services.notification_service import socketio
 
 if __name__ == '__main__':
-    app = create_app()
+    app = create_app(os.getenv('FLASK_CONFIG', 'development'))
     
     with app.app_context():
         # Create database tables
-        from database import db
+        from src.database import db
         db.create_all()
         print("Database tables created successfully!")
         print("Starting ChainGate server...")
         print("Access the application at: http://localhost:5000")
     
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # socketio.run also serves the WebSocket endpoint
+    socketio.run(app, host='0.0.0.0', port=5000, debug=app.config['DEBUG'])
     
\ No newline at end of file
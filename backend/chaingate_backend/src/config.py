@@ -23,28 +23,164 @@ class Config:
         # Windows Authentication
         SQLALCHEMY_DATABASE_URI = f"mssql+pyodbc://@{DB_SERVER}/{DB_NAME}?driver={DB_DRIVER}&trusted_connection=yes"
     
+    # Explicit URL, e.g. sqlite:///chaingate.db as a local stand-in for SQL Server
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', SQLALCHEMY_DATABASE_URI)
+    
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Connection Pool (per worker process; in-memory SQLite takes no sizing)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+    
+    # Read Replica (read_only views fall back to the primary when unset)
+    DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+    REPLICA_STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+    
     # Application Settings
     BITCOIN_NETWORK = os.getenv('BITCOIN_NETWORK', 'testnet')
     COMPLIANCE_LEVEL = os.getenv('COMPLIANCE_LEVEL', 'high')
     KYC_REQUIRED = os.getenv('KYC_REQUIRED', 'True').lower() == 'true'
+    
+    # Audit Log Pipeline
+    AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', '10000'))
+    AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '500'))
+    AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '1.0'))
+    AUDIT_PUT_TIMEOUT = float(os.getenv('AUDIT_PUT_TIMEOUT', '0.05'))
+    
+    # Confirmation Engine (enable in exactly one process, or run `flask confirmations`)
+    CONFIRMATION_ENGINE_ENABLED = os.getenv('CONFIRMATION_ENGINE_ENABLED', 'False').lower() == 'true'
+    CONFIRMATION_BLOCK_INTERVAL = float(os.getenv('CONFIRMATION_BLOCK_INTERVAL', '0.5'))
+    CONFIRMATION_THRESHOLD = int(os.getenv('CONFIRMATION_THRESHOLD', '3'))
+    
+    # Identifier Allocation
+    ID_BLOCK_SIZE = int(os.getenv('ID_BLOCK_SIZE', '100'))
+    
+    # Dashboard Counters
+    STATS_CACHE_TTL = float(os.getenv('STATS_CACHE_TTL', '2.0'))
+    STATS_COUNTER_SHARDS = int(os.getenv('STATS_COUNTER_SHARDS', '8'))
+    STATS_RECONCILE_ENABLED = os.getenv('STATS_RECONCILE_ENABLED', 'False').lower() == 'true'
+    STATS_RECONCILE_INTERVAL = float(os.getenv('STATS_RECONCILE_INTERVAL', '300'))
+    
+    # Wallet Ledger
+    LEDGER_SNAPSHOT_ENABLED = os.getenv('LEDGER_SNAPSHOT_ENABLED', 'False').lower() == 'true'
+    LEDGER_SNAPSHOT_INTERVAL = float(os.getenv('LEDGER_SNAPSHOT_INTERVAL', '300'))
+    LEDGER_SNAPSHOT_BATCH_SIZE = int(os.getenv('LEDGER_SNAPSHOT_BATCH_SIZE', '500'))
+    
+    # User Principal Cache (the stamp file must be shared by all workers on a host)
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))
+    USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '30'))
+    USER_CACHE_STAMP_FILE = os.getenv('USER_CACHE_STAMP_FILE')
+    
+    # Compliance Reporting
+    REPORT_YIELD_PER = int(os.getenv('REPORT_YIELD_PER', '1000'))
+    REPORT_EXPORT_DIR = os.getenv('REPORT_EXPORT_DIR')
+
+    # Background Jobs (the queue file must be shared by the API and `flask jobs-worker` on a host)
+    JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH')
+    JOB_WORKER_PROCESSES = int(os.getenv('JOB_WORKER_PROCESSES', '0')) or None
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '0.2'))
+    JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '300'))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+    JOB_BACKOFF_BASE = float(os.getenv('JOB_BACKOFF_BASE', '2'))
+    JOB_BACKOFF_MAX = float(os.getenv('JOB_BACKOFF_MAX', '600'))
+    JOB_RETENTION_DAYS = float(os.getenv('JOB_RETENTION_DAYS', '7'))
+    JOB_SYNCHRONOUS = os.getenv('JOB_SYNCHRONOUS', 'FULL')
+
+    # KYC Uploads (the storage directory must be shared by the API and job workers)
+    KYC_STORAGE_DIR = os.getenv('KYC_STORAGE_DIR')
+    KYC_MAX_UPLOAD_BYTES = int(os.getenv('KYC_MAX_UPLOAD_BYTES', str(64 * 1024 * 1024)))
+    KYC_UPLOAD_CHUNK_SIZE = int(os.getenv('KYC_UPLOAD_CHUNK_SIZE', str(64 * 1024)))
+    KYC_UPLOAD_CONCURRENCY = int(os.getenv('KYC_UPLOAD_CONCURRENCY', '2'))
+    KYC_ALLOWED_TYPES = os.getenv('KYC_ALLOWED_TYPES', 'image/jpeg,image/png,application/pdf')
+    KYC_MIN_IMAGE_WIDTH = int(os.getenv('KYC_MIN_IMAGE_WIDTH', '600'))
+    KYC_MIN_IMAGE_HEIGHT = int(os.getenv('KYC_MIN_IMAGE_HEIGHT', '400'))
+    KYC_MAX_IMAGE_PIXELS = int(os.getenv('KYC_MAX_IMAGE_PIXELS', '50000000'))
+
+    # Encryption (base64 32-byte keys from `flask encryption-key`; retired keys only decrypt)
+    ENCRYPTION_MASTER_KEY = os.getenv('ENCRYPTION_MASTER_KEY')
+    ENCRYPTION_RETIRED_KEYS = os.getenv('ENCRYPTION_RETIRED_KEYS', '')
+    ENCRYPTION_CHUNK_SIZE = int(os.getenv('ENCRYPTION_CHUNK_SIZE', str(64 * 1024)))
+    ENCRYPTION_KEY_CACHE_SIZE = int(os.getenv('ENCRYPTION_KEY_CACHE_SIZE', '1024'))
+    ENCRYPTION_KEY_MAX_USES = int(os.getenv('ENCRYPTION_KEY_MAX_USES', '1000'))
+    ENCRYPTION_KEY_MAX_AGE = float(os.getenv('ENCRYPTION_KEY_MAX_AGE', '300'))
+
+    # Risk Scoring
+    RISK_BATCH_SIZE = int(os.getenv('RISK_BATCH_SIZE', '50000'))
+    RISK_FLAG_THRESHOLD = float(os.getenv('RISK_FLAG_THRESHOLD', '75'))
+
+    # Compliance Rules
+    COMPLIANCE_RELOAD_INTERVAL = float(os.getenv('COMPLIANCE_RELOAD_INTERVAL', '5'))
+
+    # Rate Limiting
+    RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'True').lower() == 'true'
+    RATELIMIT_STORAGE = os.getenv('RATELIMIT_STORAGE', 'sqlite')
+    RATELIMIT_STORAGE_PATH = os.getenv('RATELIMIT_STORAGE_PATH')
+    RATELIMIT_RULES = os.getenv('RATELIMIT_RULES')
+
+    # Reverse Proxy (trusted X-Forwarded-* hops in front of the app; 0 when served directly)
+    PROXY_COUNT = int(os.getenv('PROXY_COUNT', '0'))
+
+    # IP Access Control
+    IP_ACL_FILE = os.getenv('IP_ACL_FILE')
+    IP_ACL_PROTECTED_PATHS = os.getenv('IP_ACL_PROTECTED_PATHS', '/api/admin,/api/compliance,/metrics')
+    IP_ACL_RELOAD_INTERVAL = float(os.getenv('IP_ACL_RELOAD_INTERVAL', '10'))
+
+    # Real-time Notifications
+    SOCKETIO_ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE')
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+    NOTIFY_COALESCE_WINDOW = float(os.getenv('NOTIFY_COALESCE_WINDOW', '0.05'))
+    NOTIFY_MAX_PENDING = int(os.getenv('NOTIFY_MAX_PENDING', '10000'))
+
+    # Live Monitoring
+    LIVE_MONITOR_ENABLED = os.getenv('LIVE_MONITOR_ENABLED', 'False').lower() == 'true'
+    LIVE_MONITOR_WINDOW = int(os.getenv('LIVE_MONITOR_WINDOW', '300'))
+    LIVE_MONITOR_INTERVAL = float(os.getenv('LIVE_MONITOR_INTERVAL', '1'))
+    LIVE_MONITOR_SNAPSHOT_FILE = os.getenv('LIVE_MONITOR_SNAPSHOT_FILE')
+
+    # Transaction Monitoring
+    TXMON_MAX_USERS = int(os.getenv('TXMON_MAX_USERS', '1000000'))
+    TXMON_WINDOW = int(os.getenv('TXMON_WINDOW', '600'))
+    TXMON_VELOCITY_LIMIT = int(os.getenv('TXMON_VELOCITY_LIMIT', '10'))
+    TXMON_STRUCTURING_COUNT = int(os.getenv('TXMON_STRUCTURING_COUNT', '3'))
+    TXMON_STRUCTURING_MARGIN = float(os.getenv('TXMON_STRUCTURING_MARGIN', '0.1'))
+    TXMON_STATE_FILE = os.getenv('TXMON_STATE_FILE')
+
+    # Request Metrics (the directory must be shared by all workers on a host)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_DIR = os.getenv('METRICS_DIR')
+    METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '1'))
+    PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'False').lower() == 'true'
+    PROFILER_SLOW_MS = float(os.getenv('PROFILER_SLOW_MS', '500'))
+    PROFILER_INTERVAL = float(os.getenv('PROFILER_INTERVAL', '0.005'))
+    PROFILER_DIR = os.getenv('PROFILER_DIR')
 
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     TESTING = False
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '5'))
 
 class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     TESTING = False
+    # Sized for threaded workers; pool_size + max_overflow per process must fit the server's connection limit
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '20'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    # Recycle before SQL Server or a load balancer drops idle connections
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '900'))
 
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     DEBUG = True
     DB_NAME = 'chaingate_test'
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '5'))
 
 config = {
     'development': DevelopmentConfig,
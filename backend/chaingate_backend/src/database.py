@@ -1,9 +1,21 @@
+import sqlite3
+import time
+from functools import wraps
+from operator import attrgetter
+from flask import current_app, g, has_request_context, session
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import MetaData
+from flask_sqlalchemy.session import Session
+from sqlalchemy import MetaData, event, make_url
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import now
+
+# Bind key of the optional read replica
+REPLICA = 'replica'
 
 # Naming convention for SQL Server
 convention = {
-    "ix": 'ix_%(column_0_label)s',
+    "ix": "ix_%(table_name)s_%(column_0_N_name)s",
     "uq": "uq_%(table_name)s_%(column_0_name)s",
     "ck": "ck_%(table_name)s_%(constraint_name)s",
     "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
@@ -11,7 +23,110 @@ convention = {
 }
 
 metadata = MetaData(naming_convention=convention)
-db = SQLAlchemy(metadata=metadata)
+
+
+class RoutingSession(Session):
+    """Session that reads from the replica while a read_only view runs"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        # Flushes and DML always go to the primary, even inside a read_only view
+        if (bind is None and self.info.get(REPLICA) and not self._flushing
+                and not getattr(clause, 'is_dml', False)):
+            engine = self._db.engines.get(REPLICA)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy with per-environment pool settings and an optional read replica"""
+
+    def init_app(self, app):
+        """Apply pool settings and the replica bind, then create the engines"""
+        primary = app.config['SQLALCHEMY_DATABASE_URI']
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            **pool_options(app.config, primary),
+            **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+        }
+        replica = app.config.get('DATABASE_REPLICA_URL')
+        if replica:
+            binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+            binds.setdefault(REPLICA, {'url': replica, **pool_options(app.config, replica)})
+            app.config['SQLALCHEMY_BINDS'] = binds
+
+        super().init_app(app)
+
+        if replica:
+            with app.app_context():
+                event.listen(self.engine, 'before_cursor_execute', _note_write)
+            app.after_request(_stick_to_primary)
+
+
+def pool_options(config, url):
+    """Engine pool arguments for one database URL"""
+    url = make_url(url)
+    options = {'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)}
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # In-memory SQLite gets a StaticPool, which takes no sizing
+        return options
+    options.update(
+        pool_size=config.get('DB_POOL_SIZE', 10),
+        max_overflow=config.get('DB_MAX_OVERFLOW', 20),
+        pool_timeout=config.get('DB_POOL_TIMEOUT', 30),
+        pool_recycle=config.get('DB_POOL_RECYCLE', 1800),
+    )
+    return options
+
+
+def read_only(view):
+    """Serve the view's session queries from the replica, unless the client wrote recently"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if REPLICA not in db.engines or session.get('_primary_until', 0) > time.time():
+            return view(*args, **kwargs)
+        db.session.info[REPLICA] = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            db.session.info.pop(REPLICA, None)
+    return wrapper
+
+
+def read_engine():
+    """Replica engine for bulk reads that tolerate lag, else the primary"""
+    return db.engines.get(REPLICA) or db.engine
+
+
+def _note_write(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and context is not None and (context.isinsert or context.isupdate or context.isdelete):
+        g._db_wrote = True
+
+
+def _stick_to_primary(response):
+    # Read-your-writes: the client that wrote reads from the primary until the replica has caught up
+    if g.get('_db_wrote'):
+        session['_primary_until'] = time.time() + current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+    return response
+
+
+db = RoutingSQLAlchemy(metadata=metadata, session_options={'class_': RoutingSession})
+
+@event.listens_for(Engine, 'connect')
+def configure_sqlite(dbapi_connection, connection_record):
+    """WAL lets readers proceed during writes when SQLite stands in for SQL Server"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA busy_timeout=5000')
+        cursor.close()
+
+@compiles(now, 'sqlite')
+def sqlite_now(element, compiler, **kw):
+    """NOW() on SQLite in the text format SQLAlchemy binds datetimes in"""
+    # SQLite compares timestamps as text; CURRENT_TIMESTAMP has no fraction, so a
+    # server-default created_at sorted below a bound cursor of the same second and
+    # keyset pages never moved past it
+    return "(strftime('%Y-%m-%d %H:%M:%f', 'now') || '000')"
 
 class BaseModel(db.Model):
     """Base model with common fields"""
@@ -23,4 +138,12 @@ class BaseModel(db.Model):
 
     def to_dict(self):
         """Convert model to dictionary"""
-        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
\ No newline at end of file
+        # Column names and a single getter are built once per class
+        cls = type(self)
+        columns = cls.__dict__.get('_dict_columns')
+        if columns is None:
+            # Every model has at least id, created_at and updated_at, so the getter returns a tuple
+            names = tuple(c.name for c in cls.__table__.columns)
+            columns = cls._dict_columns = (names, attrgetter(*names))
+        names, getter = columns
+        return dict(zip(names, getter(self)))
\ No newline at end of file
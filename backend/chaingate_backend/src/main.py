@@ -2,9 +2,29 @@ from datetime import timezone
 from flask import Flask, jsonify, request
 from flask_login import LoginManager, current_user
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from .config import config
 from .database import db
-from .models.user import User, AuditLog
+from .serialization import FastJSONProvider
+from .services.audit_pipeline import audit_pipeline
+from .services.bitcoin_simulator import confirmation_engine
+from .services.id_allocator import id_allocator
+from .services.dashboard_stats import dashboard_stats
+from .services.ledger import wallet_ledger
+from .services.user_cache import user_cache
+from .services.reporting_generator import reporting_generator
+from .services.job_queue import job_queue
+from .services.kyc_processor import kyc_processor
+from .services.risk_engine import risk_engine
+from .services.compliance_checker import compliance_checker
+from .services.transaction_monitor import transaction_monitor
+from .security.rate_limiting import rate_limiter
+from .security.ip_whitelisting import ip_filter
+from .security.encryption import envelope_encryption
+from .services.notification_service import notification_hub, socketio
+from .real_time.live_monitoring import live_monitor
+from .real_time import websocket
+from .services.request_metrics import request_metrics
 import logging
 from datetime import datetime
 import os
@@ -13,10 +33,33 @@ def create_app(config_name='default'):
     """Create and configure the Flask application"""
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.json = FastJSONProvider(app)
+    if app.config['PROXY_COUNT']:
+        # Client addresses for the IP filter and rate limiter come from the proxy's headers
+        count = app.config['PROXY_COUNT']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=count, x_proto=count, x_host=count)
 
     # Initialize extensions
     db.init_app(app)
+    request_metrics.init_app(app)
     CORS(app)
+    audit_pipeline.init_app(app)
+    confirmation_engine.init_app(app)
+    id_allocator.init_app(app)
+    dashboard_stats.init_app(app)
+    wallet_ledger.init_app(app)
+    user_cache.init_app(app)
+    reporting_generator.init_app(app)
+    job_queue.init_app(app)
+    envelope_encryption.init_app(app)
+    kyc_processor.init_app(app)
+    risk_engine.init_app(app)
+    compliance_checker.init_app(app)
+    transaction_monitor.init_app(app)
+    rate_limiter.init_app(app)
+    ip_filter.init_app(app)
+    notification_hub.init_app(app)
+    live_monitor.init_app(app)
 
     # Configure login manager
     login_manager = LoginManager()
@@ -25,33 +68,34 @@ def create_app(config_name='default'):
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return user_cache.load(user_id)
 
     # Register blueprints
     from .routes.auth import auth_bp
     from .routes.player import player_bp
     from .routes.admin import admin_bp
+    from .routes.compliance import compliance_bp
+    from .routes.jobs import jobs_bp
+    from .routes.kyc import kyc_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(player_bp, url_prefix='/api/player')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(compliance_bp, url_prefix='/api/compliance')
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+    app.register_blueprint(kyc_bp, url_prefix='/api/kyc')
 
     # Logging middleware
     @app.before_request
     def log_request():
-        if request.endpoint and 'static' not in request.endpoint:
-            audit_log = AuditLog(
+        if request.endpoint and 'static' not in request.endpoint and request.endpoint != 'metrics':
+            audit_pipeline.record(
                 user_id=current_user.id if current_user.is_authenticated else None,
                 action=f'{request.method} {request.endpoint}',
                 resource=request.path,
                 ip_address=request.remote_addr,
                 user_agent=request.user_agent.string
             )
-            db.session.add(audit_log)
-            try:
-                db.session.commit()
-            except:
-                db.session.rollback()
 
     # Error handlers
     @app.errorhandler(404)
@@ -89,5 +133,5 @@ if __name__ == '__main__':
         db.create_all()
         print("Database tables created successfully!")
     
-    # Run the application
-    app.run(host='0.0.0.0', port=5000, debug=app.config['DEBUG'])
\ No newline at end of file
+    # Run the application; socketio.run also serves the WebSocket endpoint
+    socketio.run(app, host='0.0.0.0', port=5000, debug=app.config['DEBUG'])
\ No newline at end of file
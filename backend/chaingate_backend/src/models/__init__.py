@@ -1,2 +1,5 @@
 # This file makes the models directory a Python package
-from .user import User, Wallet, Transaction, KYCDocument, RiskAssessment, AuditLog, ComplianceRule
+from .user import (
+    User, Wallet, Transaction, KYCDocument, RiskAssessment, AuditLog, ComplianceRule,
+    SystemSetting, IdSequence, StatCounter, WalletEntry, WalletSnapshot
+)
@@ -2,6 +2,13 @@ from src.database import db, BaseModel
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy.orm import relationship
+from src.security.encryption import EncryptedString
+
+# Statuses the confirmation engine still advances; the WHERE of ix_transactions_pending.
+# Confirmed rows move on to 'completed' at MAX_CONFIRMATIONS, so the index only holds
+# rows that are still being advanced
+IN_FLIGHT_STATUSES = ('pending', 'confirmed')
+IN_FLIGHT_FILTER = "status IN ('pending', 'confirmed')"
 
 class User(UserMixin, BaseModel):
     __tablename__ = 'users'
@@ -14,10 +21,15 @@ class User(UserMixin, BaseModel):
     risk_level = db.Column(db.String(20), default='low')
     is_active = db.Column(db.Boolean, default=True)
     
+    __table_args__ = (
+        # KYC review queues and the pending_kyc counter
+        db.Index(None, 'kyc_status'),
+    )
+    
     # Relationships
     wallet = relationship("Wallet", back_populates="user", uselist=False)
     transactions = relationship("Transaction", back_populates="user")
-    kyc_documents = relationship("KYCDocument", back_populates="user")
+    kyc_documents = relationship("KYCDocument", back_populates="user", foreign_keys="KYCDocument.user_id")
     
     def set_password(self, password):
         """Set password hash"""
@@ -43,9 +55,19 @@ class Wallet(BaseModel):
     balance = db.Column(db.Numeric(18, 8), default=0.00000000)
     currency = db.Column(db.String(10), default='BTC')
     
+    __table_args__ = (
+        # Every player request looks up the wallet by owner
+        db.Index(None, 'user_id'),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="wallet")
-    transactions = relationship("Transaction", back_populates="wallet")
+    transactions = relationship(
+        "Transaction",
+        primaryjoin="Wallet.user_id == foreign(Transaction.user_id)",
+        back_populates="wallet",
+        viewonly=True
+    )
 
 class Transaction(BaseModel):
     __tablename__ = 'transactions'
@@ -58,26 +80,93 @@ class Transaction(BaseModel):
     from_address = db.Column(db.String(255))
     to_address = db.Column(db.String(255))
     confirmations = db.Column(db.Integer, default=0)
-    risk_score = db.Column(db.Numeric(5, 2), default=0.00)
+    # NULL until the risk engine scores the row; sent explicitly so a legacy
+    # DEFAULT 0.00 on the column cannot mark new rows as scored
+    risk_score = db.Column(db.Numeric(5, 2), default=db.null())
     flagged = db.Column(db.Boolean, default=False)
     
+    __table_args__ = (
+        # Unique among non-null hashes; SQL Server would otherwise allow only one NULL
+        db.Index(
+            'uq_transactions_tx_hash', 'tx_hash', unique=True,
+            mssql_where=db.text('tx_hash IS NOT NULL'),
+            sqlite_where=db.text('tx_hash IS NOT NULL'),
+            postgresql_where=db.text('tx_hash IS NOT NULL')
+        ),
+        # Player history, keyset pages and daily deposit totals; the clustered key (id)
+        # breaks created_at ties, so ORDER BY created_at, id needs no sort
+        db.Index(None, 'user_id', 'created_at', mssql_include=['type', 'amount', 'status']),
+        # Admin listing and date-range exports
+        db.Index(None, 'created_at'),
+        # The live monitor tails rows by last change
+        db.Index(None, 'updated_at'),
+        # Flagged rows are a small slice of the table; filtered so the index stays small
+        db.Index(
+            'ix_transactions_flagged', 'created_at',
+            mssql_where=db.text('flagged = 1'),
+            sqlite_where=db.text('flagged = 1'),
+            postgresql_where=db.text('flagged'),
+            mssql_include=['user_id', 'amount', 'status']
+        ),
+        # Rows the risk engine has yet to score; as small as its backlog
+        db.Index(
+            'ix_transactions_unscored', 'id',
+            mssql_where=db.text('risk_score IS NULL'),
+            sqlite_where=db.text('risk_score IS NULL'),
+            postgresql_where=db.text('risk_score IS NULL')
+        ),
+        # In-flight rows advanced by the confirmation engine on every block
+        db.Index(
+            'ix_transactions_pending', 'status', 'confirmations',
+            mssql_where=db.text(IN_FLIGHT_FILTER),
+            sqlite_where=db.text(IN_FLIGHT_FILTER),
+            postgresql_where=db.text(IN_FLIGHT_FILTER)
+        ),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="transactions")
-    wallet = relationship("Wallet", back_populates="transactions")
+    wallet = relationship(
+        "Wallet",
+        primaryjoin="foreign(Transaction.user_id) == Wallet.user_id",
+        back_populates="transactions",
+        viewonly=True
+    )
+    
+    @classmethod
+    def in_flight(cls):
+        """Predicate that lets a query use ix_transactions_pending"""
+        # Filtered indexes only match literal predicates, so the values are inlined
+        return cls.status.in_(db.bindparam('in_flight', IN_FLIGHT_STATUSES, expanding=True, literal_execute=True))
+    
+    @classmethod
+    def unscored(cls):
+        """Predicate that lets a query use ix_transactions_unscored"""
+        return cls.risk_score.is_(None)
 
 class KYCDocument(BaseModel):
     __tablename__ = 'kyc_documents'
     
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     document_type = db.Column(db.String(50), nullable=False)
-    document_number = db.Column(db.String(100))
+    # Encrypted token; 255 characters hold a document number of up to 100 ASCII characters
+    document_number = db.Column(EncryptedString(255, context='kyc_documents.document_number'))
     file_path = db.Column(db.String(500))
-    status = db.Column(db.String(20), default='pending')
+    content_hash = db.Column(db.String(64))  # SHA-256 of the stored file
+    file_size = db.Column(db.BigInteger)
+    mime_type = db.Column(db.String(50))
+    status = db.Column(db.String(20), default='pending')  # 'processing' until validated
+    rejection_reason = db.Column(db.String(255))
     verified_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     verified_at = db.Column(db.DateTime)
     
+    __table_args__ = (
+        # A user's documents; re-uploads of the same file are found by hash
+        db.Index(None, 'user_id', 'content_hash'),
+    )
+    
     # Relationships
-    user = relationship("User", back_populates="kyc_documents")
+    user = relationship("User", back_populates="kyc_documents", foreign_keys=[user_id])
 
 class RiskAssessment(BaseModel):
     __tablename__ = 'risk_assessments'
@@ -86,6 +175,10 @@ class RiskAssessment(BaseModel):
     risk_score = db.Column(db.Numeric(5, 2), nullable=False)
     risk_factors = db.Column(db.Text)
     assessed_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    
+    __table_args__ = (
+        db.Index(None, 'user_id', 'created_at'),
+    )
 
 class AuditLog(BaseModel):
     __tablename__ = 'audit_logs'
@@ -96,6 +189,13 @@ class AuditLog(BaseModel):
     details = db.Column(db.Text)
     ip_address = db.Column(db.String(45))
     user_agent = db.Column(db.String(500))
+    
+    __table_args__ = (
+        # Date-range exports and retention
+        db.Index(None, 'created_at'),
+        # One user's activity, newest first
+        db.Index(None, 'user_id', 'created_at'),
+    )
 
 class ComplianceRule(BaseModel):
     __tablename__ = 'compliance_rules'
@@ -104,4 +204,53 @@ class ComplianceRule(BaseModel):
     description = db.Column(db.String(500))
     rule_type = db.Column(db.String(50), nullable=False)
     threshold = db.Column(db.Numeric(18, 8))
-    is_active = db.Column(db.Boolean, default=True)
\ No newline at end of file
+    is_active = db.Column(db.Boolean, default=True)
+class SystemSetting(BaseModel):
+    __tablename__ = 'system_settings'
+    
+    key = db.Column(db.String(100), unique=True, nullable=False)
+    value = db.Column(db.String(500))
+    description = db.Column(db.String(500))
+    updated_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+
+
+class IdSequence(BaseModel):
+    __tablename__ = 'id_sequences'
+    
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    next_value = db.Column(db.BigInteger, nullable=False)
+
+class StatCounter(BaseModel):
+    __tablename__ = 'stat_counters'
+    
+    name = db.Column(db.String(50), nullable=False)
+    shard = db.Column(db.Integer, nullable=False, default=0)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('name', 'shard'),
+    )
+
+class WalletEntry(BaseModel):
+    __tablename__ = 'wallet_entries'
+    
+    wallet_id = db.Column(db.Integer, db.ForeignKey('wallets.id'), nullable=False)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'))
+    entry_type = db.Column(db.String(20), nullable=False)  # credit, debit
+    amount = db.Column(db.Numeric(18, 8), nullable=False)  # signed: credits positive, debits negative
+    
+    __table_args__ = (
+        # Ledger balances sum the entries after a wallet's latest snapshot
+        db.Index(None, 'wallet_id'),
+    )
+
+class WalletSnapshot(BaseModel):
+    __tablename__ = 'wallet_snapshots'
+    
+    wallet_id = db.Column(db.Integer, db.ForeignKey('wallets.id'), nullable=False)
+    balance = db.Column(db.Numeric(18, 8), nullable=False)
+    last_entry_id = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.Index(None, 'wallet_id'),
+    )
@@ -0,0 +1,133 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from flask_sqlalchemy.pagination import SelectPagination
+from sqlalchemy import Select, and_, func, or_, select
+
+MAX_PER_PAGE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+class KeysetPage:
+    """One page of keyset-paginated rows with opaque cursors to its neighbours"""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    def to_dict(self):
+        """Pagination metadata for a JSON response"""
+        data = {
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+            'per_page': self.per_page
+        }
+        if self.total is not None:
+            data['total'] = self.total
+        return data
+
+
+def encode_cursor(created_at, row_id, direction):
+    """Encode a (created_at, id) position as an opaque URL-safe token"""
+    raw = json.dumps([created_at.isoformat(), row_id, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a token produced by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, row_id, direction = json.loads(raw)
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return datetime.fromisoformat(created_at), int(row_id), direction
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor}') from e
+
+
+class RowPagination(SelectPagination):
+    """Page-number pagination of a Core select that keeps whole rows, not just the first column"""
+
+    def _query_items(self):
+        query = self._query_args['select'].limit(self.per_page).offset(self._query_offset)
+        return self._query_args['session'].execute(query).all()
+
+    def _query_count(self):
+        query = self._query_args['select'].order_by(None).subquery()
+        return self._query_args['session'].execute(select(func.count()).select_from(query)).scalar()
+
+
+def paginate_rows(session, query, page, per_page):
+    """Same semantics as Query.paginate(error_out=False), for a Core select"""
+    return RowPagination(select=query, session=session, page=page, per_page=per_page,
+                         max_per_page=None, error_out=False)
+
+
+def wants_keyset(args):
+    """Whether request args ask for cursor pagination instead of page numbers"""
+    return 'cursor' in args or args.get('paging') == 'cursor'
+
+
+def keyset_paginate(query, model, per_page, cursor=None, include_total=False, session=None):
+    """Page a query newest-first on (created_at, id) without OFFSET or COUNT
+
+    query is a legacy Query, or a Core select run on the given session.
+    """
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    created_col, id_col = model.__table__.c.created_at, model.__table__.c.id
+    direction = 'next'
+    filtered = query
+
+    if cursor:
+        created_at, row_id, direction = decode_cursor(cursor)
+        # Row-value comparison spelled out, since SQL Server has no (a, b) < (x, y)
+        if direction == 'next':
+            filtered = query.filter(or_(
+                created_col < created_at,
+                and_(created_col == created_at, id_col < row_id)
+            ))
+        else:
+            filtered = query.filter(or_(
+                created_col > created_at,
+                and_(created_col == created_at, id_col > row_id)
+            ))
+
+    if direction == 'next':
+        ordered = filtered.order_by(created_col.desc(), id_col.desc())
+    else:
+        ordered = filtered.order_by(created_col.asc(), id_col.asc())
+
+    # One extra row tells whether another page exists in the walking direction
+    rows = _all(ordered.limit(per_page + 1), session)
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'prev':
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        first, last = rows[0], rows[-1]
+        if has_more or direction == 'prev':
+            next_cursor = encode_cursor(last.created_at, last.id, 'next')
+        if cursor and (has_more or direction == 'next'):
+            prev_cursor = encode_cursor(first.created_at, first.id, 'prev')
+
+    total = _count(query, session) if include_total else None
+    return KeysetPage(rows, per_page, next_cursor, prev_cursor, total)
+
+
+def _all(query, session):
+    return session.execute(query).all() if isinstance(query, Select) else query.all()
+
+
+def _count(query, session):
+    if isinstance(query, Select):
+        return session.execute(select(func.count()).select_from(query.order_by(None).subquery())).scalar()
+    return query.order_by(None).count()
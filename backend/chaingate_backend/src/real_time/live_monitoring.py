@@ -0,0 +1,325 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from sqlalchemy import select
+from ..database import db
+from ..models.user import Transaction
+
+METRICS = ('transactions', 'deposits', 'withdrawals', 'deposit_btc', 'withdrawal_btc', 'flagged')
+TYPE_METRICS = {'deposit': ('deposits', 'deposit_btc'), 'withdrawal': ('withdrawals', 'withdrawal_btc')}
+SETTLED_STATUSES = ('confirmed', 'completed')
+
+# Rows committed a little after their updated_at was stamped are still picked up
+TAIL_OVERLAP = timedelta(seconds=5)
+
+
+def _epoch(value):
+    # Database timestamps are naive UTC
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class RollingWindow:
+    """Per-second counters in a ring buffer covering the last N seconds"""
+
+    def __init__(self, seconds, names=METRICS):
+        self.seconds = seconds
+        self.rows = {name: i for i, name in enumerate(names)}
+        self.epochs = np.full(seconds, -1, dtype=np.int64)
+        self.values = np.zeros((len(names), seconds))
+
+    def add(self, timestamp, name, amount=1.0):
+        """Add to the counter for the second containing timestamp, if it is still in the ring"""
+        second = int(timestamp)
+        slot = second % self.seconds
+        if self.epochs[slot] != second:
+            if second < self.epochs[slot]:
+                return False
+            # The slot last held a second that has since left the window
+            self.epochs[slot] = second
+            self.values[:, slot] = 0.0
+        self.values[self.rows[name], slot] += amount
+        return True
+
+    def totals(self, now):
+        """Sum each counter over the seconds still inside the window"""
+        live = (self.epochs > now - self.seconds) & (self.epochs <= now)
+        sums = self.values[:, live].sum(axis=1)
+        return {name: float(sums[row]) for name, row in self.rows.items()}
+
+
+class SampleRing:
+    """Fixed-size ring of timestamped samples for percentile queries"""
+
+    def __init__(self, size=4096):
+        self.times = np.full(size, -np.inf)
+        self.values = np.zeros(size)
+        self.position = 0
+
+    def add(self, timestamp, value):
+        slot = self.position % len(self.times)
+        self.times[slot] = timestamp
+        self.values[slot] = value
+        self.position += 1
+
+    def percentile(self, q, since):
+        """Percentile of samples newer than since, or None without samples"""
+        recent = self.values[self.times > since]
+        return (float(np.percentile(recent, q)), len(recent)) if len(recent) else (None, 0)
+
+
+class LiveMonitor:
+    """Rolling transaction aggregates fed by tailing changed rows, pushed to admin viewers"""
+
+    def __init__(self, window=300, interval=1.0, full_every=30, max_tracked=200000):
+        self.window = window
+        self.interval = interval
+        self.full_every = full_every
+        self.max_tracked = max_tracked
+        self.snapshot_path = None
+        self.app = None
+
+        self._lock = threading.Lock()
+        self._reset()
+        self._pid = None
+        self._running = False
+
+        # Counters exposed through stats()
+        self._polls = 0
+        self._rows_seen = 0
+        self._pushes = 0
+        self._errors = 0
+
+    def init_app(self, app):
+        """Bind to an application and start the monitor loop if enabled"""
+        self.app = app
+        self.window = app.config.get('LIVE_MONITOR_WINDOW', self.window)
+        self.interval = app.config.get('LIVE_MONITOR_INTERVAL', self.interval)
+        self.snapshot_path = app.config.get('LIVE_MONITOR_SNAPSHOT_FILE') or self._default_snapshot_path(app)
+        self._reset()
+        app.extensions['live_monitor'] = self
+
+        @app.cli.command('live-monitor')
+        def run_live_monitor():
+            """Run the monitor loop in the foreground"""
+            self._pid = os.getpid()
+            self._running = True
+            self.run_forever()
+
+        if app.config.get('LIVE_MONITOR_ENABLED'):
+            self.start()
+
+    def bootstrap(self):
+        """Load in-flight rows and set the tail position; the only full read the monitor does"""
+        table = Transaction.__table__
+        with db.engine.connect() as connection:
+            db_now = connection.execute(select(db.func.now())).scalar_one()
+            pending = connection.execute(
+                select(table.c.id, table.c.type, table.c.created_at)
+                .where(Transaction.in_flight())
+                .where(table.c.status == 'pending')
+            ).all()
+
+        with self._lock:
+            self._reset()
+            self._since = db_now
+            for tx_id, tx_type, created_at in pending:
+                self._pending[tx_id] = (tx_type, _epoch(created_at))
+            self._bootstrapped = True
+
+    def poll(self):
+        """Fold rows changed since the last poll into the aggregates"""
+        if not self._bootstrapped:
+            self.bootstrap()
+
+        table = Transaction.__table__
+        with db.engine.connect() as connection:
+            db_now = connection.execute(select(db.func.now())).scalar_one()
+            rows = connection.execute(
+                select(
+                    table.c.id, table.c.type, table.c.amount, table.c.status,
+                    table.c.flagged, table.c.created_at, table.c.updated_at
+                )
+                .where(table.c.updated_at >= self._since - TAIL_OVERLAP)
+                .order_by(table.c.updated_at)
+            ).all()
+
+        with self._lock:
+            # Measure the window on the database clock so worker clock skew does not matter
+            self._offset = _epoch(db_now) - time.time()
+            now = _epoch(db_now)
+            for row in rows:
+                self._apply(row, now)
+            if rows:
+                self._since = max(self._since, rows[-1].updated_at)
+            self._expire(now)
+            self._polls += 1
+            self._rows_seen += len(rows)
+        return len(rows)
+
+    def snapshot(self):
+        """Current aggregates; processes not running the monitor read the last published copy"""
+        if not self._running:
+            try:
+                with open(self.snapshot_path) as handle:
+                    return json.load(handle)
+            except (OSError, ValueError, TypeError):
+                return {}
+
+        with self._lock:
+            now = time.time() + self._offset
+            totals = self._window.totals(now)
+            p95, samples = self._confirmations.percentile(95, now - self.window)
+            pending_withdrawals = sum(1 for tx_type, _ in self._pending.values() if tx_type == 'withdrawal')
+
+        btc = totals['deposit_btc'] + totals['withdrawal_btc']
+        return {
+            'window_seconds': self.window,
+            'transactions': int(totals['transactions']),
+            'deposits': int(totals['deposits']),
+            'withdrawals': int(totals['withdrawals']),
+            'deposit_btc': round(totals['deposit_btc'], 8),
+            'withdrawal_btc': round(totals['withdrawal_btc'], 8),
+            'btc_per_minute': round(btc / self.window * 60, 8),
+            'flagged': int(totals['flagged']),
+            'flagged_rate': round(totals['flagged'] / totals['transactions'], 4) if totals['transactions'] else 0.0,
+            'pending_withdrawals': pending_withdrawals,
+            'confirmation_p95_seconds': round(p95, 3) if p95 is not None else None,
+            'confirmation_samples': samples,
+        }
+
+    def push(self, full=False):
+        """Emit the fields that changed since the last push to the live room"""
+        from .websocket import ROOM_LIVE
+        from ..services.notification_service import socketio
+
+        current = self.snapshot()
+        changed = current if full else {
+            key: value for key, value in current.items() if self._last_pushed.get(key) != value
+        }
+        self._last_pushed = current
+        self._publish_snapshot(current)
+
+        if changed and socketio.server is not None:
+            socketio.emit(
+                'live_stats',
+                dict(changed, full=full, as_of=datetime.now(timezone.utc).isoformat()),
+                to=ROOM_LIVE, namespace='/'
+            )
+            self._pushes += 1
+        return changed
+
+    def run_forever(self):
+        """Poll and push on a fixed cadence"""
+        from ..services.notification_service import socketio
+
+        ticks = 0
+        while True:
+            with self.app.app_context():
+                try:
+                    self.poll()
+                    # Periodic full snapshots let late subscribers on other workers converge
+                    self.push(full=ticks % self.full_every == 0)
+                except Exception as e:
+                    self._errors += 1
+                    logging.error(f"Live monitor error: {str(e)}")
+            ticks += 1
+            socketio.sleep(self.interval)
+
+    def start(self):
+        """Run the monitor loop as a Socket.IO background task of this process"""
+        # Each process running the loop polls and pushes its own deltas, so only one may;
+        # gunicorn.conf.py keeps it off in the pools in favour of `flask live-monitor`
+        from ..services.notification_service import socketio
+
+        if self._pid == os.getpid() and self._running:
+            return
+        self._pid = os.getpid()
+        self._running = True
+        socketio.start_background_task(self.run_forever)
+
+    def stats(self):
+        """Return monitor loop counters"""
+        return {
+            'running': self._running,
+            'polls': self._polls,
+            'rows_seen': self._rows_seen,
+            'pushes': self._pushes,
+            'errors': self._errors,
+            'tracked_rows': len(self._recent),
+            'in_flight': len(self._pending),
+        }
+
+    def _reset(self):
+        self._window = RollingWindow(self.window)
+        self._confirmations = SampleRing()
+        # Rows created inside the window: id -> (second, flagged), oldest first
+        self._recent = OrderedDict()
+        # Rows still pending: id -> (type, created epoch)
+        self._pending = {}
+        self._since = None
+        self._offset = 0.0
+        self._last_pushed = {}
+        self._bootstrapped = False
+
+    def _apply(self, row, now):
+        created = _epoch(row.created_at)
+        seen = self._recent.get(row.id)
+
+        if seen is None and created > now - self.window:
+            # First sighting of a row inside the window
+            second = int(created)
+            self._window.add(created, 'transactions')
+            count_metric, btc_metric = TYPE_METRICS.get(row.type, (None, None))
+            if count_metric:
+                self._window.add(created, count_metric)
+                self._window.add(created, btc_metric, float(row.amount or 0))
+            if row.flagged:
+                self._window.add(created, 'flagged')
+            self._recent[row.id] = (second, bool(row.flagged))
+            if row.status == 'pending':
+                self._pending[row.id] = (row.type, created)
+        elif seen is not None and row.flagged and not seen[1]:
+            # Flagged after it was first counted, e.g. by the risk engine
+            self._window.add(seen[0], 'flagged')
+            self._recent[row.id] = (seen[0], True)
+
+        if row.status != 'pending' and row.id in self._pending:
+            _, pending_since = self._pending.pop(row.id)
+            if row.status in SETTLED_STATUSES:
+                updated = _epoch(row.updated_at)
+                self._confirmations.add(updated, updated - pending_since)
+
+    def _expire(self, now):
+        cutoff = now - self.window
+        while self._recent:
+            tx_id, (second, _) = next(iter(self._recent.items()))
+            if second > cutoff and len(self._recent) <= self.max_tracked:
+                break
+            self._recent.popitem(last=False)
+
+    def _publish_snapshot(self, snapshot):
+        # Written atomically so any worker can answer a new subscriber without a query
+        if not self.snapshot_path:
+            return
+        partial = f'{self.snapshot_path}.{os.getpid()}.tmp'
+        try:
+            with open(partial, 'w') as handle:
+                json.dump(snapshot, handle)
+            os.replace(partial, self.snapshot_path)
+        except OSError as e:
+            logging.error(f"Live monitor snapshot error: {str(e)}")
+
+    def _default_snapshot_path(self, app):
+        digest = hashlib.sha1(str(app.config.get('SQLALCHEMY_DATABASE_URI')).encode()).hexdigest()[:12]
+        return os.path.join(tempfile.gettempdir(), f'chaingate-live-{digest}.json')
+
+
+# Create global instance
+live_monitor = LiveMonitor()
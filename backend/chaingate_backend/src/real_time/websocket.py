@@ -0,0 +1,22 @@
+from flask_socketio import emit, join_room, leave_room
+from flask_login import current_user
+from ..services.notification_service import socketio
+from .live_monitoring import live_monitor
+
+ROOM_LIVE = 'live_monitor'
+
+
+@socketio.on('subscribe_live')
+def handle_subscribe_live(data=None):
+    """Join the live monitoring room and receive the current aggregates"""
+    if not current_user.is_authenticated or not current_user.is_admin():
+        emit('error', {'error': 'Admin access required'})
+        return
+    join_room(ROOM_LIVE)
+    # Served from memory or the published snapshot file, never the database
+    emit('live_stats', dict(live_monitor.snapshot(), full=True))
+
+@socketio.on('unsubscribe_live')
+def handle_unsubscribe_live(data=None):
+    """Stop receiving live monitoring pushes"""
+    leave_room(ROOM_LIVE)
@@ -1,46 +1,59 @@
 from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
-from database import db
-from models.user import User, Transaction, AuditLog
+from ..database import db, read_only
+from ..pagination import InvalidCursor, keyset_paginate, paginate_rows, wants_keyset
+from ..models.user import Transaction
+from ..serialization import Projection
+from ..services.audit_pipeline import audit_pipeline
+from ..services.bitcoin_simulator import confirmation_engine
+from ..services.dashboard_stats import dashboard_stats
+from ..services.user_cache import user_cache
+from ..services.risk_engine import risk_engine
+from ..services.compliance_checker import compliance_checker
+from ..services.transaction_monitor import transaction_monitor
+from ..security.rate_limiting import rate_limiter
+from ..security.ip_whitelisting import ip_filter
+from ..services.notification_service import notification_hub
+from ..real_time.live_monitoring import live_monitor
+from ..services.request_metrics import request_metrics
+from ..services.job_queue import job_queue
+from ..services.kyc_processor import kyc_processor
+from ..security.encryption import envelope_encryption
 
 admin_bp = Blueprint('admin', __name__)
 
+# Only the columns each response carries, as plain rows instead of ORM objects
+RECENT_ACTIVITY = Projection(Transaction, 'id', 'user_id', 'type', 'amount', 'status', 'created_at')
+REVIEW_TRANSACTION = Projection(
+    Transaction, 'id', 'user_id', 'type', 'amount', 'status', 'risk_score', 'flagged', 'created_at'
+)
+
 @admin_bp.route('/dashboard', methods=['GET'])
 @login_required
+@read_only
 def admin_dashboard():
     """Admin dashboard data"""
     if not current_user.is_admin():
         return jsonify({'error': 'Admin access required'}), 403
     
     try:
-        # Get basic statistics
-        total_users = User.query.count()
-        total_transactions = Transaction.query.count()
-        pending_kyc = User.query.filter_by(kyc_status='pending').count()
-        flagged_transactions = Transaction.query.filter_by(flagged=True).count()
+        # Get basic statistics from the maintained counters
+        stats = dashboard_stats.get()
         
-        # Get recent activities
-        recent_transactions = Transaction.query.order_by(
-            Transaction.created_at.desc()
-        ).limit(10).all()
+        # Get recent activities (newest ids first, served by the primary key)
+        table = Transaction.__table__
+        recent_transactions = db.session.execute(
+            RECENT_ACTIVITY.select().order_by(table.c.id.desc()).limit(10)
+        )
         
         return jsonify({
             'stats': {
-                'total_users': total_users,
-                'total_transactions': total_transactions,
-                'pending_kyc': pending_kyc,
-                'flagged_transactions': flagged_transactions
+                'total_users': stats['total_users'],
+                'total_transactions': stats['total_transactions'],
+                'pending_kyc': stats['pending_kyc'],
+                'flagged_transactions': stats['flagged_transactions']
             },
-            'recent_activities': [
-                {
-                    'id': tx.id,
-                    'user_id': tx.user_id,
-                    'type': tx.type,
-                    'amount': float(tx.amount),
-                    'status': tx.status,
-                    'created_at': tx.created_at.isoformat()
-                } for tx in recent_transactions
-            ]
+            'recent_activities': RECENT_ACTIVITY.rows(recent_transactions)
         })
         
     except Exception as e:
@@ -48,6 +61,7 @@ def admin_dashboard():
 
 @admin_bp.route('/transactions', methods=['GET'])
 @login_required
+@read_only
 def get_all_transactions():
     """Get all transactions for admin review"""
     if not current_user.is_admin():
@@ -57,27 +71,67 @@ def get_all_transactions():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         
-        transactions = Transaction.query.order_by(
-            Transaction.created_at.desc()
-        ).paginate(page=page, per_page=per_page, error_out=False)
+        if wants_keyset(request.args):
+            # Cursor mode: deep pages cost the same as the first, total only on request
+            keyset = keyset_paginate(
+                REVIEW_TRANSACTION.select(), Transaction, per_page,
+                cursor=request.args.get('cursor'),
+                include_total=request.args.get('include_total', 'false').lower() == 'true',
+                session=db.session
+            )
+            items = keyset.items
+            meta = keyset.to_dict()
+        else:
+            transactions = paginate_rows(
+                db.session, REVIEW_TRANSACTION.select().order_by(Transaction.__table__.c.created_at.desc()),
+                page, per_page
+            )
+            items = transactions.items
+            meta = {
+                'total': transactions.total,
+                'pages': transactions.pages,
+                'current_page': page
+            }
         
         return jsonify({
-            'transactions': [
-                {
-                    'id': tx.id,
-                    'user_id': tx.user_id,
-                    'type': tx.type,
-                    'amount': float(tx.amount),
-                    'status': tx.status,
-                    'risk_score': float(tx.risk_score),
-                    'flagged': tx.flagged,
-                    'created_at': tx.created_at.isoformat()
-                } for tx in transactions.items
-            ],
-            'total': transactions.total,
-            'pages': transactions.pages,
-            'current_page': page
+            'transactions': REVIEW_TRANSACTION.rows(items),
+            **meta
         })
         
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
     except Exception as e:
-        return jsonify({'error': 'Internal server error'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Internal server error'}), 500
+
+@admin_bp.route('/live', methods=['GET'])
+@login_required
+def live_stats():
+    """Rolling live-monitoring aggregates, for clients without a socket"""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    return jsonify(live_monitor.snapshot())
+
+@admin_bp.route('/system/stats', methods=['GET'])
+@login_required
+def system_stats():
+    """Internal subsystem counters"""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    return jsonify({
+        'audit': audit_pipeline.stats(),
+        'confirmations': confirmation_engine.stats(),
+        'user_cache': user_cache.stats(),
+        'risk_engine': risk_engine.stats(),
+        'compliance': compliance_checker.stats(),
+        'transaction_monitor': transaction_monitor.stats(),
+        'rate_limits': rate_limiter.stats(),
+        'ip_filter': ip_filter.stats(),
+        'notifications': notification_hub.stats(),
+        'live_monitor': live_monitor.stats(),
+        'request_metrics': request_metrics.stats(),
+        'jobs': job_queue.stats(),
+        'kyc': kyc_processor.stats(),
+        'encryption': envelope_encryption.stats()
+    })
\ No newline at end of file
@@ -0,0 +1,113 @@
+from datetime import datetime
+from flask import Blueprint, Response, jsonify, request, send_file, stream_with_context
+from flask_login import login_required, current_user
+from ..services.reporting_generator import reporting_generator, EXPORTS, FORMATS
+import logging
+
+compliance_bp = Blueprint('compliance', __name__)
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+def parse_export_filters(args):
+    """Read date-range and user filters from request args"""
+    filters = {}
+    for key in ('start', 'end'):
+        if args.get(key):
+            filters[key] = datetime.fromisoformat(args[key])
+    if args.get('user_id'):
+        filters['user_id'] = int(args['user_id'])
+    return filters
+
+@compliance_bp.route('/exports/<kind>', methods=['GET'])
+@login_required
+def stream_export(kind):
+    """Stream an export as chunked NDJSON or CSV"""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    fmt = request.args.get('format', 'ndjson')
+    if kind not in EXPORTS or fmt not in FORMATS:
+        return jsonify({'error': 'Unknown export or format'}), 400
+    
+    try:
+        filters = parse_export_filters(request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid filter'}), 400
+    
+    return Response(
+        stream_with_context(reporting_generator.iter_format(kind, fmt, **filters)),
+        content_type=CONTENT_TYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename={kind}.{fmt}'}
+    )
+
+@compliance_bp.route('/exports', methods=['POST'])
+@login_required
+def start_export():
+    """Start an offline gzip export"""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    try:
+        data = request.get_json() or {}
+        kind = data.get('kind', 'transactions')
+        fmt = data.get('format', 'ndjson')
+        if kind not in EXPORTS or fmt not in FORMATS:
+            return jsonify({'error': 'Unknown export or format'}), 400
+        
+        filters = parse_export_filters(data)
+        # Retried submissions with the same key return the export queued the first time
+        key = request.headers.get('Idempotency-Key')
+        report_id, job = reporting_generator.start_export(
+            kind, fmt,
+            requested_by=current_user.id,
+            idempotency_key=f'export:{current_user.id}:{key}' if key else None,
+            **filters
+        )
+        
+        return jsonify({
+            'report_id': report_id,
+            'job_id': job['id'],
+            'status': reporting_generator.export_status(report_id, job['args']['fmt']),
+            'format': job['args']['fmt']
+        }), 202
+        
+    except ValueError:
+        return jsonify({'error': 'Invalid filter'}), 400
+    except Exception as e:
+        logging.error(f"Export start error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@compliance_bp.route('/exports/<report_id>/status', methods=['GET'])
+@login_required
+def export_status(report_id):
+    """Status of an offline export"""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    fmt = request.args.get('format', 'ndjson')
+    status = reporting_generator.export_status(report_id, fmt)
+    if status is None:
+        return jsonify({'error': 'Export not found'}), 404
+    
+    return jsonify({'report_id': report_id, 'status': status})
+
+@compliance_bp.route('/exports/<report_id>/download', methods=['GET'])
+@login_required
+def download_export(report_id):
+    """Download a finished gzip export"""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    fmt = request.args.get('format', 'ndjson')
+    if reporting_generator.export_status(report_id, fmt) != 'completed':
+        return jsonify({'error': 'Export not ready'}), 404
+    
+    return send_file(
+        reporting_generator.export_path(report_id, fmt),
+        mimetype='application/gzip',
+        as_attachment=True,
+        download_name=f'{report_id}.{fmt}.gz'
+    )
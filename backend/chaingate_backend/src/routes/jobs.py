@@ -0,0 +1,98 @@
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+from ..services.job_queue import job_queue, job_dict, STATUSES
+import logging
+
+jobs_bp = Blueprint('jobs', __name__)
+
+MAX_PAGE_SIZE = 100
+
+def visible_job(job_id):
+    """The job if the current user owns it or is an admin, else None"""
+    job = job_queue.get(job_id)
+    if job is None or (job['user_id'] != current_user.id and not current_user.is_admin()):
+        return None
+    return job
+
+@jobs_bp.route('', methods=['GET'])
+@login_required
+def list_jobs():
+    """The caller's jobs newest first; admins may list every job"""
+    try:
+        status = request.args.get('status')
+        if status is not None and status not in STATUSES:
+            return jsonify({'error': 'Unknown status'}), 400
+        
+        limit = min(request.args.get('limit', 50, type=int), MAX_PAGE_SIZE)
+        user_id = current_user.id
+        if current_user.is_admin():
+            user_id = request.args.get('user_id', type=int)
+        
+        jobs = job_queue.find(
+            user_id=user_id,
+            status=status,
+            task=request.args.get('task'),
+            before=request.args.get('before', type=int),
+            limit=limit
+        )
+        
+        return jsonify({
+            'jobs': [job_dict(job) for job in jobs],
+            'next_before': jobs[-1]['id'] if len(jobs) == limit else None
+        })
+    
+    except Exception as e:
+        logging.error(f"Job list error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+@login_required
+def get_job(job_id):
+    """Status and result of one job"""
+    try:
+        job = visible_job(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        return jsonify(job_dict(job))
+    
+    except Exception as e:
+        logging.error(f"Job status error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@jobs_bp.route('/<int:job_id>/cancel', methods=['POST'])
+@login_required
+def cancel_job(job_id):
+    """Cancel a job that has not started yet"""
+    try:
+        if visible_job(job_id) is None:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        if not job_queue.cancel(job_id):
+            return jsonify({'error': 'Job already started'}), 409
+        
+        return jsonify(job_dict(job_queue.get(job_id)))
+    
+    except Exception as e:
+        logging.error(f"Job cancel error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@jobs_bp.route('/<int:job_id>/retry', methods=['POST'])
+@login_required
+def retry_job(job_id):
+    """Requeue a failed or cancelled job"""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    try:
+        if job_queue.get(job_id) is None:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        if not job_queue.requeue(job_id):
+            return jsonify({'error': 'Only failed or cancelled jobs can be retried'}), 409
+        
+        return jsonify(job_dict(job_queue.get(job_id))), 202
+    
+    except Exception as e:
+        logging.error(f"Job retry error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
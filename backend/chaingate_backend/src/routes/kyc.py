@@ -0,0 +1,188 @@
+from flask import Blueprint, Response, jsonify, request
+from flask_login import login_required, current_user
+from ..database import db
+from ..models.user import KYCDocument
+from ..services.audit_pipeline import audit_pipeline
+from ..services.job_queue import job_queue
+from ..services.kyc_processor import kyc_processor, DOCUMENT_TYPES, MAX_DOCUMENT_NUMBER_LENGTH, UploadTooLarge
+from ..security.rate_limiting import rate_limiter
+import logging
+
+kyc_bp = Blueprint('kyc', __name__)
+
+def document_dict(document):
+    """API view of a KYC document; storage paths and hashes stay internal"""
+    return {
+        'id': document.id,
+        'document_type': document.document_type,
+        'status': document.status,
+        'mime_type': document.mime_type,
+        'file_size': document.file_size,
+        'rejection_reason': document.rejection_reason,
+        'created_at': document.created_at.isoformat() if document.created_at else None,
+        'verified_at': document.verified_at.isoformat() if document.verified_at else None
+    }
+
+@kyc_bp.route('/documents', methods=['POST'])
+@login_required
+@rate_limiter.limit('kyc_upload', by='user')
+def upload_document():
+    """Stream a KYC document to storage and queue its validation"""
+    # Refused before a byte of the body is read
+    if request.content_length is not None and request.content_length > kyc_processor.max_bytes:
+        return jsonify({'error': 'File too large'}), 413
+    
+    # Query strings end up in access logs and proxy histories
+    if 'document_number' in request.args:
+        return jsonify({'error': 'document_number must be sent in the X-Document-Number header or a multipart field'}), 400
+    
+    with kyc_processor.upload_slot() as acquired:
+        if not acquired:
+            response = jsonify({'error': 'Too many uploads in progress'})
+            response.status_code = 503
+            response.headers['Retry-After'] = '1'
+            return response
+        
+        try:
+            # Raw bodies stream straight to storage; multipart forms arrive through
+            # Werkzeug's spooled temporary file, so neither is held in memory
+            if request.mimetype == 'multipart/form-data':
+                upload = request.files.get('file')
+                if upload is None:
+                    return jsonify({'error': 'File required'}), 400
+                fields, read = request.form, upload.stream.read
+                document_number = fields.get('document_number')
+            else:
+                fields, read = request.args, request.stream.read
+                document_number = request.headers.get('X-Document-Number')
+            
+            document_type = fields.get('document_type')
+            if document_type not in DOCUMENT_TYPES:
+                return jsonify({'error': 'Invalid document type', 'document_types': list(DOCUMENT_TYPES)}), 400
+            
+            # Checked before the file is stored; a longer number would not fit the column
+            if document_number is not None and (
+                not document_number.isascii() or len(document_number) > MAX_DOCUMENT_NUMBER_LENGTH
+            ):
+                return jsonify({
+                    'error': f'Document number must be at most {MAX_DOCUMENT_NUMBER_LENGTH} ASCII characters'
+                }), 400
+            
+            content_hash, size, file_path = kyc_processor.store(read)
+        except UploadTooLarge:
+            return jsonify({'error': 'File too large'}), 413
+        except Exception as e:
+            logging.error(f"KYC upload error: {str(e)}")
+            return jsonify({'error': 'Internal server error'}), 500
+    
+    if size == 0:
+        return jsonify({'error': 'Empty upload'}), 400
+    
+    try:
+        # The same file sent again for the same document is the same submission
+        existing = KYCDocument.query.filter_by(
+            user_id=current_user.id, content_hash=content_hash, document_type=document_type
+        ).first()
+        if existing is not None:
+            return jsonify({'document': document_dict(existing), 'duplicate': True})
+        
+        document = KYCDocument(
+            user_id=current_user.id,
+            document_type=document_type,
+            document_number=document_number,
+            file_path=file_path,
+            content_hash=content_hash,
+            file_size=size,
+            status='processing'
+        )
+        db.session.add(document)
+        db.session.flush()
+        audit_pipeline.record_in_transaction(
+            db.session,
+            user_id=current_user.id,
+            action='kyc_upload',
+            resource='/api/kyc/documents',
+            details=f'Uploaded {document_type} document {document.id} ({size} bytes)',
+            ip_address=request.remote_addr
+        )
+        db.session.commit()
+        
+        # Always settled by the job, even when the bytes already have a verdict: an
+        # immediate answer would tell the uploader the file is already in storage
+        job = job_queue.enqueue(
+            'kyc.validate',
+            {'document_id': document.id},
+            idempotency_key=f'kyc.validate:{document.id}',
+            user_id=current_user.id
+        )
+        return jsonify({'document': document_dict(document), 'job_id': job['id']}), 202
+    
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"KYC document error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@kyc_bp.route('/documents', methods=['GET'])
+@login_required
+def list_documents():
+    """The current user's KYC documents"""
+    try:
+        documents = KYCDocument.query.filter_by(user_id=current_user.id).order_by(KYCDocument.id.desc()).all()
+        return jsonify({'documents': [document_dict(document) for document in documents]})
+    
+    except Exception as e:
+        logging.error(f"KYC list error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@kyc_bp.route('/documents/<int:document_id>', methods=['GET'])
+@login_required
+def get_document(document_id):
+    """One KYC document, for its owner or an admin"""
+    try:
+        document = db.session.get(KYCDocument, document_id)
+        if document is None or (document.user_id != current_user.id and not current_user.is_admin()):
+            return jsonify({'error': 'Document not found'}), 404
+        
+        return jsonify({'document': document_dict(document)})
+    
+    except Exception as e:
+        logging.error(f"KYC status error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@kyc_bp.route('/documents/<int:document_id>/file', methods=['GET'])
+@login_required
+def document_file(document_id):
+    """Stream a document's file to a reviewer, decrypted chunk by chunk"""
+    if not current_user.is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    try:
+        document = db.session.get(KYCDocument, document_id)
+        if document is None or document.content_hash is None:
+            return jsonify({'error': 'Document not found'}), 404
+        
+        handle = kyc_processor.open_blob(document.content_hash)
+        audit_pipeline.record(
+            user_id=current_user.id,
+            action='kyc_document_viewed',
+            resource=f'/api/kyc/documents/{document_id}/file',
+            details=f'Viewed {document.document_type} document {document_id} of user {document.user_id}',
+            ip_address=request.remote_addr
+        )
+        
+        def chunks():
+            with handle:
+                while True:
+                    chunk = handle.read(kyc_processor.chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+        
+        response = Response(chunks(), mimetype=document.mime_type or 'application/octet-stream')
+        response.headers['Content-Length'] = str(document.file_size)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    
+    except Exception as e:
+        logging.error(f"KYC file error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
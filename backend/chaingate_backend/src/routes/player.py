@@ -1,28 +1,51 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from database import db
-from models.user import User, Wallet, Transaction, AuditLog
+from ..database import db, read_only
+from ..pagination import InvalidCursor, keyset_paginate, paginate_rows, wants_keyset
+from ..models.user import User, Wallet, Transaction
+from ..serialization import Projection
+from ..services.audit_pipeline import audit_pipeline
+from ..services.compliance_checker import compliance_checker
+from ..services.id_allocator import id_allocator
+from ..services.ledger import InsufficientFunds, wallet_ledger
+from ..services.transaction_monitor import transaction_monitor
+from ..security.rate_limiting import rate_limiter
+from datetime import datetime
 from decimal import Decimal
 import logging
 
 player_bp = Blueprint('player', __name__)
 
+# Only the columns each response carries, as plain rows instead of ORM objects
+RECENT_TRANSACTION = Projection(Transaction, 'id', 'type', 'amount', 'status', 'created_at')
+HISTORY_TRANSACTION = Projection(
+    Transaction, 'id', 'type', 'amount', 'status', 'tx_hash', 'confirmations', 'created_at'
+)
+
 @player_bp.route('/dashboard', methods=['GET'])
 @login_required
+@read_only
 def dashboard():
     """Player dashboard data"""
     try:
         user = current_user
-        wallet = Wallet.query.filter_by(user_id=user.id).first()
+        wallets, table = Wallet.__table__, Transaction.__table__
+        wallet = db.session.execute(
+            db.select(wallets.c.address, wallets.c.balance, wallets.c.currency)
+            .where(wallets.c.user_id == user.id)
+            .limit(1)
+        ).first()
         
         if not wallet:
             return jsonify({'error': 'Wallet not found'}), 404
         
         # Get recent transactions
-        transactions = Transaction.query.filter_by(user_id=user.id)\
-            .order_by(Transaction.created_at.desc())\
-            .limit(10)\
-            .all()
+        transactions = db.session.execute(
+            RECENT_TRANSACTION.select()
+            .where(table.c.user_id == user.id)
+            .order_by(table.c.created_at.desc())
+            .limit(10)
+        )
         
         return jsonify({
             'user': {
@@ -37,15 +60,7 @@ def dashboard():
                 'balance': float(wallet.balance),
                 'currency': wallet.currency
             },
-            'recent_transactions': [
-                {
-                    'id': tx.id,
-                    'type': tx.type,
-                    'amount': float(tx.amount),
-                    'status': tx.status,
-                    'created_at': tx.created_at.isoformat()
-                } for tx in transactions
-            ]
+            'recent_transactions': RECENT_TRANSACTION.rows(transactions)
         })
         
     except Exception as e:
@@ -54,6 +69,7 @@ def dashboard():
 
 @player_bp.route('/balance', methods=['GET'])
 @login_required
+@read_only
 def get_balance():
     """Get player balance"""
     try:
@@ -78,39 +94,50 @@ def get_balance():
 
 @player_bp.route('/transactions', methods=['GET'])
 @login_required
+@read_only
 def get_transactions():
     """Get transaction history"""
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
+        table = Transaction.__table__
+        query = HISTORY_TRANSACTION.select().where(table.c.user_id == current_user.id)
         
-        transactions = Transaction.query.filter_by(user_id=current_user.id)\
-            .order_by(Transaction.created_at.desc())\
-            .paginate(page=page, per_page=per_page, error_out=False)
+        if wants_keyset(request.args):
+            # Cursor mode: deep pages cost the same as the first, total only on request
+            keyset = keyset_paginate(
+                query, Transaction, per_page,
+                cursor=request.args.get('cursor'),
+                include_total=request.args.get('include_total', 'false').lower() == 'true',
+                session=db.session
+            )
+            items = keyset.items
+            meta = keyset.to_dict()
+        else:
+            transactions = paginate_rows(
+                db.session, query.order_by(table.c.created_at.desc()), page, per_page
+            )
+            items = transactions.items
+            meta = {
+                'total': transactions.total,
+                'pages': transactions.pages,
+                'current_page': page
+            }
         
         return jsonify({
-            'transactions': [
-                {
-                    'id': tx.id,
-                    'type': tx.type,
-                    'amount': float(tx.amount),
-                    'status': tx.status,
-                    'tx_hash': tx.tx_hash,
-                    'confirmations': tx.confirmations,
-                    'created_at': tx.created_at.isoformat()
-                } for tx in transactions.items
-            ],
-            'total': transactions.total,
-            'pages': transactions.pages,
-            'current_page': page
+            'transactions': HISTORY_TRANSACTION.rows(items),
+            **meta
         })
         
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
     except Exception as e:
         logging.error(f"Transactions error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @player_bp.route('/simulate_deposit', methods=['POST'])
 @login_required
+@rate_limiter.limit('simulate_deposit', by='user')
 def simulate_deposit():
     """Simulate Bitcoin deposit"""
     try:
@@ -124,6 +151,21 @@ def simulate_deposit():
         if not wallet:
             return jsonify({'error': 'Wallet not found'}), 404
         
+        # Daily deposit limits need today's total, so only query it when such a rule is active
+        daily_total = 0
+        if compliance_checker.applies('deposit_limit'):
+            today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+            daily_total = db.session.execute(
+                db.select(db.func.coalesce(db.func.sum(Transaction.amount), 0))
+                .where(Transaction.user_id == current_user.id)
+                .where(Transaction.type == 'deposit')
+                .where(Transaction.created_at >= today)
+            ).scalar_one()
+        
+        decision = compliance_checker.evaluate('deposit', amount, daily_total)
+        if decision.blocked:
+            return jsonify({'error': 'Deposit exceeds compliance limit', 'rules': list(decision.blocked)}), 400
+        
         # Create transaction
         transaction = Transaction(
             user_id=current_user.id,
@@ -131,29 +173,40 @@ def simulate_deposit():
             amount=amount,
             status='completed',
             to_address=wallet.address,
-            tx_hash=f'sim_tx_{current_user.id}_{Transaction.query.count() + 1}'
+            tx_hash=id_allocator.tx_hash('sim_tx', current_user.id),
+            flagged=bool(decision.flagged)
         )
         
-        # Update balance
-        wallet.balance += amount
-        
         db.session.add(transaction)
-        db.session.commit()
+        db.session.flush()
         
-        # Log the deposit
-        audit_log = AuditLog(
+        # Credit through the ledger: one atomic UPDATE plus an append-only entry
+        new_balance = wallet_ledger.credit(db.session, wallet.id, amount, transaction.id)
+        
+        # Log the deposit in the same transaction as the balance change
+        audit_pipeline.record_in_transaction(
+            db.session,
             user_id=current_user.id,
             action='simulated_deposit',
             resource='/api/player/simulate_deposit',
-            details=f'Simulated deposit of {amount} BTC'
+            details=f'Simulated deposit of {amount} BTC',
+            ip_address=request.remote_addr
         )
-        db.session.add(audit_log)
+        
+        # Velocity and structuring patterns across this user's recent transactions; observed
+        # last, so attempts that fail above never count towards them
+        patterns = transaction_monitor.observe(current_user.id, 'deposit', amount)
+        if patterns:
+            transaction.flagged = True
         db.session.commit()
         
+        if patterns:
+            transaction_monitor.alert(current_user.id, transaction.id, patterns)
+        
         return jsonify({
             'message': 'Deposit simulation successful',
             'transaction_id': transaction.id,
-            'new_balance': float(wallet.balance)
+            'new_balance': float(new_balance)
         })
         
     except Exception as e:
@@ -163,6 +216,7 @@ def simulate_deposit():
 
 @player_bp.route('/withdraw', methods=['POST'])
 @login_required
+@rate_limiter.limit('withdraw', by='user')
 def withdraw():
     """Request withdrawal"""
     try:
@@ -180,8 +234,9 @@ def withdraw():
         if not wallet:
             return jsonify({'error': 'Wallet not found'}), 404
         
-        if wallet.balance < amount:
-            return jsonify({'error': 'Insufficient balance'}), 400
+        decision = compliance_checker.evaluate('withdrawal', amount)
+        if decision.blocked:
+            return jsonify({'error': 'Withdrawal exceeds compliance limit', 'rules': list(decision.blocked)}), 400
         
         # Create withdrawal transaction
         transaction = Transaction(
@@ -191,29 +246,44 @@ def withdraw():
             status='pending',
             from_address=wallet.address,
             to_address=address,
-            tx_hash=f'withdraw_tx_{current_user.id}_{Transaction.query.count() + 1}'
+            tx_hash=id_allocator.tx_hash('withdraw_tx', current_user.id),
+            flagged=bool(decision.flagged)
         )
         
-        # Reserve balance (will be deducted when approved)
-        wallet.balance -= amount
-        
         db.session.add(transaction)
-        db.session.commit()
+        db.session.flush()
         
-        # Log the withdrawal request
-        audit_log = AuditLog(
+        # Reserve balance (will be deducted when approved); the balance check and
+        # debit are a single conditional UPDATE so concurrent withdrawals cannot overdraw
+        try:
+            new_balance = wallet_ledger.debit(db.session, wallet.id, amount, transaction.id)
+        except InsufficientFunds:
+            db.session.rollback()
+            return jsonify({'error': 'Insufficient balance'}), 400
+        
+        # Log the withdrawal request in the same transaction as the balance change
+        audit_pipeline.record_in_transaction(
+            db.session,
             user_id=current_user.id,
             action='withdrawal_request',
             resource='/api/player/withdraw',
-            details=f'Withdrawal request of {amount} BTC to {address}'
+            details=f'Withdrawal request of {amount} BTC to {address}',
+            ip_address=request.remote_addr
         )
-        db.session.add(audit_log)
+        
+        # Observed only once the debit went through; rejected withdrawals are not activity
+        patterns = transaction_monitor.observe(current_user.id, 'withdrawal', amount)
+        if patterns:
+            transaction.flagged = True
         db.session.commit()
         
+        if patterns:
+            transaction_monitor.alert(current_user.id, transaction.id, patterns)
+        
         return jsonify({
             'message': 'Withdrawal request submitted',
             'transaction_id': transaction.id,
-            'new_balance': float(wallet.balance)
+            'new_balance': float(new_balance)
         })
         
     except Exception as e:
@@ -0,0 +1,422 @@
+import base64
+import hashlib
+import io
+import logging
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.keywrap import InvalidUnwrap, aes_key_unwrap, aes_key_wrap
+from sqlalchemy.types import String, TypeDecorator
+
+# Encrypted files: header, then chunks of ciphertext each followed by a 16-byte tag.
+# Every chunk's nonce holds its index and a last-chunk flag, so chunks cannot be
+# reordered, dropped or cut off at the end without failing authentication.
+FILE_MAGIC = b'CGE1'
+FILE_HEADER = struct.Struct('>4s4s40sI7s')  # magic, master key id, wrapped data key, chunk size, nonce prefix
+TAG_SIZE = 16
+
+# Encrypted column values: prefix + base64 of master key id, wrapped data key, nonce, ciphertext and tag
+TOKEN_PREFIX = 'cg1:'
+TOKEN_HEADER = struct.Struct('>4s40s12s')
+
+KEY_SIZE = 32
+
+
+class DecryptionError(Exception):
+    """Raised when a value or file fails authentication or needs a master key that is not configured"""
+
+
+def generate_key():
+    """A new random master key, base64-encoded for ENCRYPTION_MASTER_KEY"""
+    return base64.b64encode(os.urandom(KEY_SIZE)).decode('ascii')
+
+
+def key_id(master_key):
+    """Short fingerprint of a master key, stored with every data key it wraps"""
+    return hashlib.sha256(master_key).digest()[:4]
+
+
+def chunk_nonce(prefix, index, last):
+    return prefix + struct.pack('>I?', index, last)
+
+
+def header_aad(header):
+    """Header fields every chunk authenticates; the wrapped key is left out so it can be rewrapped"""
+    return header[:4] + header[-11:]
+
+
+class EncryptingWriter:
+    """File-like writer that seals whatever is written to it chunk by chunk"""
+
+    def __init__(self, raw, cipher, header, chunk_size):
+        self.raw = raw
+        self.cipher = cipher
+        self.chunk_size = chunk_size
+        self.aad = header_aad(header)
+        self.prefix = header[-7:]
+        self.plaintext_size = 0
+        self._index = 0
+        # Holds at most one chunk beyond what has been sealed; the last chunk is only
+        # known when the writer is finished
+        self._buffer = bytearray()
+        self._finished = False
+        raw.write(header)
+
+    def write(self, data):
+        self._buffer += data
+        self.plaintext_size += len(data)
+        while len(self._buffer) > self.chunk_size:
+            self._seal(bytes(self._buffer[:self.chunk_size]), False)
+            del self._buffer[:self.chunk_size]
+        return len(data)
+
+    def finish(self):
+        """Seal the final chunk; the underlying file stays open"""
+        if not self._finished:
+            self._seal(bytes(self._buffer), True)
+            self._buffer.clear()
+            self._finished = True
+
+    def _seal(self, chunk, last):
+        self.raw.write(self.cipher.encrypt(chunk_nonce(self.prefix, self._index, last), chunk, self.aad))
+        self._index += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # A failed write leaves an unfinished file, which never authenticates
+        if exc_type is None:
+            self.finish()
+
+
+class DecryptingReader(io.RawIOBase):
+    """Seekable reader over an encrypted file that decrypts one chunk at a time"""
+
+    def __init__(self, raw, cipher, header, chunk_size, file_size):
+        self.raw = raw
+        self.cipher = cipher
+        self.chunk_size = chunk_size
+        self.aad = header_aad(header)
+        self.prefix = header[-7:]
+        body = file_size - len(header)
+        self.chunks = -(-body // (chunk_size + TAG_SIZE))
+        if self.chunks < 1:
+            raise DecryptionError('Encrypted file is truncated')
+        self.size = body - self.chunks * TAG_SIZE
+        self._position = 0
+        self._index = None
+        self._chunk = b''
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError('negative seek position')
+        self._position = offset
+        return offset
+
+    def readinto(self, buffer):
+        if self._position >= self.size:
+            return 0
+        index, offset = divmod(self._position, self.chunk_size)
+        chunk = self._load(index)
+        count = min(len(buffer), len(chunk) - offset)
+        buffer[:count] = chunk[offset:offset + count]
+        self._position += count
+        return count
+
+    def _load(self, index):
+        if index != self._index:
+            self.raw.seek(FILE_HEADER.size + index * (self.chunk_size + TAG_SIZE))
+            sealed = self.raw.read(self.chunk_size + TAG_SIZE)
+            try:
+                self._chunk = self.cipher.decrypt(
+                    chunk_nonce(self.prefix, index, index == self.chunks - 1), sealed, self.aad
+                )
+            except InvalidTag:
+                raise DecryptionError(f'Encrypted file failed authentication at chunk {index}') from None
+            self._index = index
+        return self._chunk
+
+    def close(self):
+        if not self.closed:
+            self.raw.close()
+        super().close()
+
+
+class EnvelopeEncryption:
+    """Envelope encryption: data keys wrapped by a master key, AES-GCM for columns and streamed files"""
+
+    def __init__(self, chunk_size=64 * 1024, key_cache_size=1024, key_max_uses=1000, key_max_age=300.0):
+        self.chunk_size = chunk_size
+        self.key_cache_size = key_cache_size
+        self.key_max_uses = key_max_uses
+        self.key_max_age = key_max_age
+        self.app = None
+
+        # Master keys by id; the active one wraps new data keys, retired ones only unwrap
+        self._master_keys = {}
+        self._active_id = None
+
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._column_key = None
+
+        # Counters exposed through stats()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._keys_generated = 0
+        self._files_encrypted = 0
+
+    def init_app(self, app):
+        """Bind to an application and load the master keys"""
+        self.app = app
+        self.chunk_size = app.config.get('ENCRYPTION_CHUNK_SIZE', self.chunk_size)
+        self.key_cache_size = app.config.get('ENCRYPTION_KEY_CACHE_SIZE', self.key_cache_size)
+        self.key_max_uses = app.config.get('ENCRYPTION_KEY_MAX_USES', self.key_max_uses)
+        self.key_max_age = app.config.get('ENCRYPTION_KEY_MAX_AGE', self.key_max_age)
+        self.configure(
+            app.config.get('ENCRYPTION_MASTER_KEY'),
+            (app.config.get('ENCRYPTION_RETIRED_KEYS') or '').split(',')
+        )
+        if not self.enabled:
+            logging.warning("ENCRYPTION_MASTER_KEY is not set; KYC files and columns are stored in plaintext")
+        app.extensions['encryption'] = self
+
+        @app.cli.command('encryption-key')
+        def encryption_key():
+            """Print a new random master key"""
+            print(generate_key())
+
+    def configure(self, master_key, retired_keys=()):
+        """Load the active and retired master keys, each base64-encoded"""
+        keys = {}
+        active_id = None
+        for position, encoded in enumerate([master_key] + list(retired_keys)):
+            if not encoded or not encoded.strip():
+                continue
+            key = base64.b64decode(encoded.strip(), validate=True)
+            if len(key) != KEY_SIZE:
+                raise ValueError(f'Master keys must be {KEY_SIZE} bytes, base64-encoded')
+            keys[key_id(key)] = key
+            if position == 0:
+                active_id = key_id(key)
+        with self._lock:
+            self._master_keys = keys
+            self._active_id = active_id
+            self._cache.clear()
+            self._column_key = None
+
+    @property
+    def enabled(self):
+        return self._active_id is not None
+
+    @property
+    def active_key_id(self):
+        return self._active_id
+
+    def new_data_key(self):
+        """Generate a data key; returns (cipher, master key id, wrapped key)"""
+        if not self.enabled:
+            raise RuntimeError('ENCRYPTION_MASTER_KEY is not configured')
+        key = AESGCM.generate_key(bit_length=KEY_SIZE * 8)
+        master_id = self._active_id
+        wrapped = aes_key_wrap(self._master_keys[master_id], key)
+        cipher = AESGCM(key)
+        with self._lock:
+            self._keys_generated += 1
+            self._remember(master_id + wrapped, cipher)
+        return cipher, master_id, wrapped
+
+    def data_key(self, master_id, wrapped):
+        """Cipher for a wrapped data key, unwrapped once and then served from the cache"""
+        cache_key = master_id + wrapped
+        with self._lock:
+            cipher = self._cache.get(cache_key)
+            if cipher is not None:
+                self._cache.move_to_end(cache_key)
+                self._hits += 1
+                return cipher
+            self._misses += 1
+
+        cipher = AESGCM(self._unwrap(master_id, wrapped))
+        with self._lock:
+            self._remember(cache_key, cipher)
+        return cipher
+
+    def _remember(self, cache_key, cipher):
+        # Caller holds the lock
+        if self.key_cache_size <= 0:
+            return
+        self._cache[cache_key] = cipher
+        self._cache.move_to_end(cache_key)
+        while len(self._cache) > self.key_cache_size:
+            self._cache.popitem(last=False)
+            self._evictions += 1
+
+    def _shared_key(self):
+        """Data key for column values, reused for a bounded number of writes and seconds"""
+        now = time.monotonic()
+        with self._lock:
+            current = self._column_key
+            if current is not None and current[3] < self.key_max_uses and current[4] > now:
+                current[3] += 1
+                return current[0], current[1], current[2]
+        cipher, master_id, wrapped = self.new_data_key()
+        with self._lock:
+            self._column_key = [cipher, master_id, wrapped, 1, now + self.key_max_age]
+        return cipher, master_id, wrapped
+
+    def encrypt(self, data, context=b''):
+        """Seal bytes into a text token; context must match on decrypt"""
+        cipher, master_id, wrapped = self._shared_key()
+        nonce = os.urandom(12)
+        sealed = TOKEN_HEADER.pack(master_id, wrapped, nonce) + cipher.encrypt(nonce, data, context)
+        return TOKEN_PREFIX + base64.urlsafe_b64encode(sealed).decode('ascii')
+
+    def decrypt(self, token, context=b''):
+        """Open a token made by encrypt()"""
+        try:
+            sealed = base64.urlsafe_b64decode(token[len(TOKEN_PREFIX):])
+            master_id, wrapped, nonce = TOKEN_HEADER.unpack_from(sealed)
+        except (ValueError, struct.error):
+            raise DecryptionError('Malformed encrypted value') from None
+        cipher = self.data_key(master_id, wrapped)
+        try:
+            return cipher.decrypt(nonce, sealed[TOKEN_HEADER.size:], context)
+        except InvalidTag:
+            raise DecryptionError('Encrypted value failed authentication') from None
+
+    def is_encrypted(self, token):
+        return token.startswith(TOKEN_PREFIX)
+
+    def writer(self, raw):
+        """Encrypting writer over an open binary file, under a data key of its own"""
+        if not self.enabled:
+            return nullcontext(raw)
+        cipher, master_id, wrapped = self.new_data_key()
+        header = FILE_HEADER.pack(FILE_MAGIC, master_id, wrapped, self.chunk_size, os.urandom(7))
+        with self._lock:
+            self._files_encrypted += 1
+        return EncryptingWriter(raw, cipher, header, self.chunk_size)
+
+    def is_encrypted_file(self, path):
+        with open(path, 'rb') as raw:
+            return raw.read(len(FILE_MAGIC)) == FILE_MAGIC
+
+    def open(self, path):
+        """Open a stored file for reading, decrypting it if it was written encrypted"""
+        raw = open(path, 'rb')
+        try:
+            header = raw.read(FILE_HEADER.size)
+            if len(header) < FILE_HEADER.size or not header.startswith(FILE_MAGIC):
+                # Written before encryption was configured
+                raw.seek(0)
+                return raw
+            magic, master_id, wrapped, chunk_size, prefix = FILE_HEADER.unpack(header)
+            reader = DecryptingReader(
+                raw, self.data_key(master_id, wrapped), header, chunk_size, os.fstat(raw.fileno()).st_size
+            )
+        except BaseException:
+            raw.close()
+            raise
+        return io.BufferedReader(reader, buffer_size=chunk_size)
+
+    def rewrap_file(self, path):
+        """Move an encrypted file's data key under the active master key; returns whether it changed"""
+        with open(path, 'r+b') as raw:
+            header = raw.read(FILE_HEADER.size)
+            if len(header) < FILE_HEADER.size or not header.startswith(FILE_MAGIC):
+                return False
+            magic, master_id, wrapped, chunk_size, prefix = FILE_HEADER.unpack(header)
+            if master_id == self._active_id:
+                return False
+            # Chunks do not authenticate the wrapped key, so only it changes
+            key = self._unwrap(master_id, wrapped)
+            raw.seek(0)
+            raw.write(FILE_HEADER.pack(magic, self._active_id, aes_key_wrap(self._master_keys[self._active_id], key),
+                                       chunk_size, prefix))
+        return True
+
+    def needs_rewrap(self, token):
+        """Whether a token's data key is wrapped by a retired master key"""
+        try:
+            master_id = base64.urlsafe_b64decode(token[len(TOKEN_PREFIX):len(TOKEN_PREFIX) + 8])[:4]
+        except ValueError:
+            return False
+        return master_id != self._active_id
+
+    def _unwrap(self, master_id, wrapped):
+        master_key = self._master_keys.get(master_id)
+        if master_key is None:
+            raise DecryptionError(f'No master key with id {master_id.hex()} is configured')
+        try:
+            return aes_key_unwrap(master_key, wrapped)
+        except InvalidUnwrap:
+            raise DecryptionError('Data key failed to unwrap') from None
+
+    def stats(self):
+        """Return key cache counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': self.enabled,
+                'master_key_id': self._active_id.hex() if self._active_id else None,
+                'master_keys': len(self._master_keys),
+                'key_cache_size': len(self._cache),
+                'key_cache_capacity': self.key_cache_size,
+                'key_cache_hits': self._hits,
+                'key_cache_misses': self._misses,
+                'key_cache_hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'key_cache_evictions': self._evictions,
+                'keys_generated': self._keys_generated,
+                'files_encrypted': self._files_encrypted,
+            }
+
+
+# Create global instance
+envelope_encryption = EnvelopeEncryption()
+
+
+class EncryptedString(TypeDecorator):
+    """String column stored as an envelope-encrypted token
+
+    The context ties each value to its column, so a token copied into another
+    encrypted column fails to decrypt. Values written before encryption was
+    configured are read back as they are and encrypted on their next write.
+    """
+
+    impl = String
+    cache_ok = True
+
+    def __init__(self, length=None, context=None, **kwargs):
+        super().__init__(length, **kwargs)
+        self.context = (context or '').encode('utf-8')
+
+    def process_bind_param(self, value, dialect):
+        if value is None or not envelope_encryption.enabled:
+            return value
+        return envelope_encryption.encrypt(value.encode('utf-8'), self.context)
+
+    def process_result_value(self, value, dialect):
+        if value is None or not envelope_encryption.is_encrypted(value):
+            return value
+        return envelope_encryption.decrypt(value, self.context).decode('utf-8')
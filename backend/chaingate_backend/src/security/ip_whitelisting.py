@@ -0,0 +1,206 @@
+import ipaddress
+import logging
+import os
+import socket
+import threading
+import time
+from array import array
+from flask import jsonify, request
+
+ALLOW = 1
+DENY = 2
+ACTIONS = {'allow': ALLOW, 'deny': DENY}
+
+
+class PrefixTrie:
+    """Binary radix trie over address bits, stored in flat arrays, with longest-prefix match"""
+
+    def __init__(self, bits):
+        self.bits = bits
+        # Node i has children zero[i] / one[i] (0 means none) and an action (0 means no prefix ends here)
+        self.zero = array('i', [0])
+        self.one = array('i', [0])
+        self.action = array('b', [0])
+
+    def __len__(self):
+        return len(self.action)
+
+    def insert(self, network, prefixlen, action):
+        """Add a prefix; deny wins when the same prefix is listed both ways"""
+        node = 0
+        for shift in range(self.bits - 1, self.bits - 1 - prefixlen, -1):
+            branch = self.one if (network >> shift) & 1 else self.zero
+            child = branch[node]
+            if not child:
+                child = len(self.action)
+                self.zero.append(0)
+                self.one.append(0)
+                self.action.append(0)
+                branch[node] = child
+            node = child
+        self.action[node] = max(self.action[node], action)
+
+    def lookup(self, address):
+        """Action of the longest prefix containing the address, or 0"""
+        zero, one, actions = self.zero, self.one, self.action
+        result = actions[0]
+        node = 0
+        shift = self.bits - 1
+        while shift >= 0:
+            node = (one if (address >> shift) & 1 else zero)[node]
+            if not node:
+                break
+            if actions[node]:
+                result = actions[node]
+            shift -= 1
+        return result
+
+
+class IpAccessList:
+    """Compiled allow/deny prefixes for both address families"""
+
+    def __init__(self, entries=()):
+        self.v4 = PrefixTrie(32)
+        self.v6 = PrefixTrie(128)
+        self.has_allow = False
+        self.size = 0
+
+        for action, cidr in entries:
+            network = ipaddress.ip_network(cidr, strict=False)
+            trie = self.v4 if network.version == 4 else self.v6
+            trie.insert(int(network.network_address), network.prefixlen, ACTIONS[action])
+            self.has_allow = self.has_allow or action == 'allow'
+            self.size += 1
+
+    def lookup(self, address):
+        """Return ALLOW, DENY or 0 for an address string"""
+        try:
+            if ':' not in address:
+                return self.v4.lookup(int.from_bytes(socket.inet_pton(socket.AF_INET, address), 'big'))
+            value = int.from_bytes(socket.inet_pton(socket.AF_INET6, address.split('%', 1)[0]), 'big')
+        except OSError:
+            return 0
+
+        # IPv4-mapped addresses (::ffff:a.b.c.d) are matched against the IPv4 list
+        if value >> 32 == 0xffff:
+            return self.v4.lookup(value & 0xffffffff)
+        return self.v6.lookup(value)
+
+
+def parse_entries(lines):
+    """Parse 'allow 10.0.0.0/8' / 'deny 2001:db8::/32' lines; a bare prefix means allow"""
+    entries = []
+    for number, line in enumerate(lines, 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        parts = line.split()
+        action, cidr = (parts[0].lower(), parts[1]) if len(parts) == 2 else ('allow', parts[0])
+        if action not in ACTIONS:
+            raise ValueError(f'Line {number}: unknown action {action}')
+        ipaddress.ip_network(cidr, strict=False)
+        entries.append((action, cidr))
+    return entries
+
+
+class IpFilter:
+    """Reject denied addresses everywhere and unlisted addresses on protected paths"""
+
+    def __init__(self, acl_file=None, protected_paths=('/api/admin',), reload_interval=10.0):
+        self.acl_file = acl_file
+        self.protected_paths = tuple(protected_paths)
+        self.reload_interval = reload_interval
+
+        self._lock = threading.Lock()
+        self._acl = IpAccessList()
+        self._mtime = None
+        self._checked_at = 0.0
+
+        # Counters exposed through stats()
+        self._denied = 0
+        self._reloads = 0
+
+    def init_app(self, app):
+        """Bind to an application and check every request"""
+        self.acl_file = app.config.get('IP_ACL_FILE', self.acl_file)
+        paths = app.config.get('IP_ACL_PROTECTED_PATHS')
+        if paths:
+            self.protected_paths = tuple(path.strip() for path in paths.split(',') if path.strip())
+        self.reload_interval = app.config.get('IP_ACL_RELOAD_INTERVAL', self.reload_interval)
+        app.extensions['ip_filter'] = self
+
+        if self.acl_file:
+            self.reload()
+        app.before_request(self._before_request)
+
+    def load(self, entries):
+        """Compile entries and swap them in as the active list"""
+        # Build fully, then swap the reference, so requests never see a partial trie
+        acl = IpAccessList(entries)
+        self._acl = acl
+        self._reloads += 1
+        return acl.size
+
+    def reload(self):
+        """Rebuild from the ACL file if it changed since the last load"""
+        # Only one thread rebuilds; the rest keep using the current list
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.acl_file).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime == self._mtime:
+                return False
+
+            try:
+                if mtime is None:
+                    entries = []
+                else:
+                    with open(self.acl_file) as handle:
+                        entries = parse_entries(handle)
+                self.load(entries)
+                self._mtime = mtime
+                return True
+            except (OSError, ValueError) as e:
+                # Keep serving the previous list rather than opening or closing everything
+                logging.error(f"IP access list reload error: {str(e)}")
+                return False
+        finally:
+            self._lock.release()
+
+    def is_allowed(self, address, path=''):
+        """Decide whether an address may reach a path"""
+        acl = self._acl
+        if not acl.size:
+            return True
+        action = acl.lookup(address or '')
+        if action == DENY:
+            return False
+        if action == ALLOW or not acl.has_allow:
+            return True
+        return not path.startswith(self.protected_paths)
+
+    def stats(self):
+        """Return list size and rejection counters"""
+        acl = self._acl
+        return {
+            'entries': acl.size,
+            'trie_nodes': len(acl.v4) + len(acl.v6),
+            'denied': self._denied,
+            'reloads': self._reloads,
+        }
+
+    def _before_request(self):
+        if self.acl_file and time.monotonic() - self._checked_at >= self.reload_interval:
+            self.reload()
+
+        if not self.is_allowed(request.remote_addr, request.path):
+            self._denied += 1
+            return jsonify({'error': 'Access denied'}), 403
+
+
+# Create global instance
+ip_filter = IpFilter()
@@ -0,0 +1,246 @@
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from functools import wraps
+from flask import jsonify, request
+from flask_login import current_user
+
+# Rule name -> (requests, window seconds); RATELIMIT_RULES overrides these
+DEFAULT_RULES = {
+    'login': (10, 60),
+    'withdraw': (5, 60),
+    'simulate_deposit': (30, 60),
+    'kyc_upload': (10, 60),
+}
+
+PRUNE_EVERY = 1000
+DENY_CACHE_SIZE = 10000
+
+# UPSERT ... RETURNING needs SQLite 3.35
+RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+def parse_rules(spec):
+    """Parse 'login=10/60,withdraw=5/60' into a rules dict"""
+    rules = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        name, _, limit = item.partition('=')
+        requests, _, window = limit.partition('/')
+        rules[name.strip()] = (int(requests), float(window or 60))
+    return rules
+
+
+class MemoryBackend:
+    """Per-process window counters, for single-worker and development setups"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._calls = 0
+
+    def hit(self, key, slot, expires):
+        """Count one hit in the slot and return (current, previous) slot counts"""
+        with self._lock:
+            current = self._counts.get((key, slot), (0, expires))[0] + 1
+            self._counts[(key, slot)] = (current, expires)
+            previous = self._counts.get((key, slot - 1), (0, 0))[0]
+
+            self._calls += 1
+            if self._calls % PRUNE_EVERY == 0:
+                now = time.time()
+                for stale in [k for k, (_, until) in self._counts.items() if until < now]:
+                    del self._counts[stale]
+        return current, previous
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+class SQLiteBackend:
+    """Window counters in a host-local SQLite file shared by every worker process"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+
+    def hit(self, key, slot, expires):
+        """Count one hit in the slot and return (current, previous) slot counts"""
+        connection = self._connection()
+        if RETURNING:
+            current = connection.execute(
+                'INSERT INTO rate_hits (key, slot, hits, expires) VALUES (?, ?, 1, ?) '
+                'ON CONFLICT (key, slot) DO UPDATE SET hits = hits + 1 RETURNING hits',
+                (key, slot, expires)
+            ).fetchone()[0]
+        else:
+            connection.execute(
+                'INSERT INTO rate_hits (key, slot, hits, expires) VALUES (?, ?, 1, ?) '
+                'ON CONFLICT (key, slot) DO UPDATE SET hits = hits + 1',
+                (key, slot, expires)
+            )
+            current = connection.execute(
+                'SELECT hits FROM rate_hits WHERE key = ? AND slot = ?', (key, slot)
+            ).fetchone()[0]
+
+        # A finished window no longer changes, so each thread reads it once per slot
+        previous = self._local.previous.get(key)
+        if previous is None or previous[0] != slot:
+            row = connection.execute(
+                'SELECT hits FROM rate_hits WHERE key = ? AND slot = ?', (key, slot - 1)
+            ).fetchone()
+            previous = (slot, row[0] if row else 0)
+            if len(self._local.previous) >= DENY_CACHE_SIZE:
+                self._local.previous.clear()
+            self._local.previous[key] = previous
+
+        self._calls += 1
+        if self._calls % PRUNE_EVERY == 0:
+            connection.execute('DELETE FROM rate_hits WHERE expires < ?', (time.time(),))
+        return current, previous[1]
+
+    def reset(self):
+        self._connection().execute('DELETE FROM rate_hits')
+        self._local.previous.clear()
+
+    def _connection(self):
+        # One connection per thread, reopened after fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS rate_hits ('
+                'key TEXT NOT NULL, slot INTEGER NOT NULL, hits INTEGER NOT NULL, expires REAL NOT NULL, '
+                'PRIMARY KEY (key, slot)) WITHOUT ROWID'
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+            self._local.previous = {}
+        return connection
+
+
+class RateLimiter:
+    """Sliding-window rate limits keyed by endpoint and caller, shared across workers"""
+
+    def __init__(self, enabled=True, rules=None, backend=None):
+        self.enabled = enabled
+        self.rules = dict(DEFAULT_RULES, **(rules or {}))
+        self.backend = backend or MemoryBackend()
+
+        # Keys known to be over their limit, with the time they may retry
+        self._denied = {}
+
+        # Counters exposed through stats()
+        self._allowed = 0
+        self._rejected = 0
+        self._cached_rejections = 0
+        self._backend_errors = 0
+
+    def init_app(self, app):
+        """Bind to an application and choose the shared counter backend"""
+        self.enabled = app.config.get('RATELIMIT_ENABLED', self.enabled)
+        self.rules = dict(DEFAULT_RULES, **parse_rules(app.config.get('RATELIMIT_RULES')))
+
+        storage = app.config.get('RATELIMIT_STORAGE', 'sqlite')
+        if storage == 'sqlite':
+            path = app.config.get('RATELIMIT_STORAGE_PATH') or self._default_path(app)
+            self.backend = SQLiteBackend(path)
+        elif storage == 'memory':
+            self.backend = MemoryBackend()
+        else:
+            raise ValueError(f'Unknown rate limit storage: {storage}')
+        app.extensions['rate_limiter'] = self
+
+    def check(self, rule, identity, now=None):
+        """Count a request and return (allowed, retry_after_seconds)"""
+        limit, window = self.rules[rule]
+        key = f'{rule}:{identity}'
+        now = time.time() if now is None else now
+
+        # Fast path: a caller already over the limit is refused without touching the backend
+        until = self._denied.get(key)
+        if until is not None:
+            if until > now:
+                self._cached_rejections += 1
+                return False, until - now
+            self._denied.pop(key, None)
+
+        slot = int(now // window)
+        try:
+            current, previous = self.backend.hit(key, slot, (slot + 2) * window)
+        except sqlite3.Error as e:
+            # Fail open: a broken limiter store must not take the money endpoints down
+            self._backend_errors += 1
+            logging.error(f"Rate limiter backend error: {str(e)}")
+            return True, 0
+
+        # Weight the previous window by how much of it still overlaps the sliding window
+        elapsed = now - slot * window
+        estimate = previous * (1 - elapsed / window) + current
+        if estimate <= limit:
+            self._allowed += 1
+            return True, 0
+
+        retry_after = window - elapsed
+        if len(self._denied) >= DENY_CACHE_SIZE:
+            self._denied = {k: v for k, v in self._denied.items() if v > now}
+        self._denied[key] = now + retry_after
+        self._rejected += 1
+        return False, retry_after
+
+    def limit(self, rule, by='ip'):
+        """Decorate a view with the named rule, keyed by 'ip', 'user' or a callable"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return view(*args, **kwargs)
+
+                allowed, retry_after = self.check(rule, self._identity(by))
+                if not allowed:
+                    response = jsonify({'error': 'Too many requests'})
+                    response.status_code = 429
+                    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                    return response
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        """Clear every counter and the local deny cache"""
+        self._denied.clear()
+        self.backend.reset()
+
+    def stats(self):
+        """Return allow/reject counters"""
+        return {
+            'backend': type(self.backend).__name__,
+            'allowed': self._allowed,
+            'rejected': self._rejected,
+            'cached_rejections': self._cached_rejections,
+            'backend_errors': self._backend_errors,
+            'denied_keys': len(self._denied),
+        }
+
+    def _identity(self, by):
+        if callable(by):
+            return by()
+        if by == 'user' and current_user.is_authenticated:
+            return f'user:{current_user.id}'
+        return f'ip:{request.remote_addr}'
+
+    def _default_path(self, app):
+        digest = hashlib.sha1(str(app.config.get('SQLALCHEMY_DATABASE_URI')).encode()).hexdigest()[:12]
+        return os.path.join(tempfile.gettempdir(), f'chaingate-ratelimit-{digest}.db')
+
+
+# Create global instance
+rate_limiter = RateLimiter()
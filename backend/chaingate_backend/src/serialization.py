@@ -0,0 +1,73 @@
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Date, DateTime, Numeric, select, type_coerce
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson when it is installed"""
+
+    def dumps(self, obj, **kwargs):
+        """Serialize to a JSON string, as the default provider would"""
+        if orjson is None or kwargs.get('indent'):
+            return super().dumps(obj, **kwargs)
+        return self._encode(obj).decode()
+
+    def response(self, *args, **kwargs):
+        """Build a JSON response without a str round trip"""
+        if orjson is None or self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        body = self._encode(self._prepare_response_obj(args, kwargs))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+    def _encode(self, obj):
+        # Dates go through Flask's default so their format matches the stdlib encoder
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=self.default, option=options)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits, which the stdlib encoder accepts
+            return super().dumps(obj).encode()
+
+
+class Projection:
+    """Selected columns of one table, fetched as plain rows and converted to JSON-ready dicts"""
+
+    def __init__(self, model, *names):
+        table = model.__table__
+        self.keys = names
+        # Table columns keep the statement on the Core path, skipping ORM compilation and row loading
+        self.columns = tuple(
+            # Numeric columns come back as floats from the driver's result processor, not Decimals
+            type_coerce(table.c[name], Numeric(asdecimal=False)).label(name)
+            if isinstance(table.c[name].type, Numeric) else table.c[name]
+            for name in names
+        )
+        self.numeric = tuple(name for name in names if isinstance(table.c[name].type, Numeric))
+        self.temporal = tuple(name for name in names if isinstance(table.c[name].type, (DateTime, Date)))
+
+    def select(self):
+        """Core select of the projected columns"""
+        return select(*self.columns)
+
+    def rows(self, rows):
+        """Dicts keyed by column name, numbers and dates converted a column at a time"""
+        keys = self.keys
+        items = [dict(zip(keys, row)) for row in rows]
+        # Some drivers hand back whole numbers as ints; responses always carry floats
+        for key in self.numeric:
+            for item in items:
+                value = item[key]
+                if value is not None:
+                    item[key] = float(value)
+        for key in self.temporal:
+            for item in items:
+                value = item[key]
+                if value is not None:
+                    item[key] = value.isoformat()
+        return items
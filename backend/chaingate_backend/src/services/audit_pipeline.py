@@ -0,0 +1,181 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from ..database import db
+from ..models.user import AuditLog
+
+
+class AuditPipeline:
+    """Write-behind buffer that bulk inserts audit log rows from a background thread"""
+
+    def __init__(self, max_queue=10000, batch_size=500, flush_interval=1.0, put_timeout=0.05):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.app = None
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._flush_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        # Counters exposed through stats()
+        self._enqueued = 0
+        self._flushed = 0
+        self._failed = 0
+        self._batches = 0
+        self._backpressure = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def init_app(self, app):
+        """Bind the pipeline to an application and read its settings"""
+        self.app = app
+        self.max_queue = app.config.get('AUDIT_QUEUE_SIZE', self.max_queue)
+        self.batch_size = app.config.get('AUDIT_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.get('AUDIT_FLUSH_INTERVAL', self.flush_interval)
+        self.put_timeout = app.config.get('AUDIT_PUT_TIMEOUT', self.put_timeout)
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        app.extensions['audit_pipeline'] = self
+        atexit.register(self.shutdown)
+
+    def record(self, action, user_id=None, resource=None, details=None, ip_address=None, user_agent=None):
+        """Queue an audit row for the next batch flush"""
+        row = {
+            'user_id': user_id,
+            'action': action,
+            'resource': resource,
+            'details': details,
+            'ip_address': ip_address,
+            'user_agent': user_agent[:500] if user_agent else user_agent,
+        }
+        self._ensure_worker()
+
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+        except queue.Full:
+            # Backpressure: the caller drains a batch itself instead of dropping the row
+            with self._stats_lock:
+                self._backpressure += 1
+            self.flush()
+            self._queue.put(row)
+
+        with self._stats_lock:
+            self._enqueued += 1
+
+    def record_in_transaction(self, session, action, user_id=None, resource=None, details=None,
+                              ip_address=None, user_agent=None):
+        """Add an audit row to a session so it commits with the business write"""
+        audit_log = AuditLog(
+            user_id=user_id,
+            action=action,
+            resource=resource,
+            details=details,
+            ip_address=ip_address,
+            user_agent=user_agent
+        )
+        session.add(audit_log)
+        return audit_log
+
+    def flush(self):
+        """Drain everything currently queued and write it in batches"""
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    break
+                self._write(batch)
+
+    def shutdown(self, timeout=5.0):
+        """Stop the background thread and flush remaining rows"""
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+        if self.app is not None:
+            self.flush()
+
+    def stats(self):
+        """Return queue depth and flush latency counters"""
+        with self._stats_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self.max_queue,
+                'enqueued': self._enqueued,
+                'flushed': self._flushed,
+                'failed': self._failed,
+                'batches': self._batches,
+                'backpressure_events': self._backpressure,
+                'last_flush_ms': round(self._last_flush_ms, 3),
+                'max_flush_ms': round(self._max_flush_ms, 3),
+                'avg_flush_ms': round(self._total_flush_ms / self._batches, 3) if self._batches else 0.0,
+            }
+
+    def _ensure_worker(self):
+        # Threads do not survive a fork, so gunicorn workers start their own lazily
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._flush_lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='audit-pipeline', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch:
+                with self._flush_lock:
+                    self._write(batch)
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        started = time.perf_counter()
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as connection:
+                    connection.execute(AuditLog.__table__.insert(), batch)
+        except Exception as e:
+            logging.error(f"Audit flush error: {str(e)}")
+            with self._stats_lock:
+                self._failed += len(batch)
+            return
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            self._flushed += len(batch)
+            self._batches += 1
+            self._last_flush_ms = elapsed_ms
+            self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+
+
+# Create global instance
+audit_pipeline = AuditPipeline()
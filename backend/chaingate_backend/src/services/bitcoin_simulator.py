@@ -1,8 +1,15 @@
+import logging
+import os
 import random
+import threading
 import time
-from datetime import datetime
-from database import db
-from models.user import Transaction
+from sqlalchemy import and_, case, update
+from ..database import db
+from ..models.user import Transaction, SystemSetting, IN_FLIGHT_STATUSES
+from .job_queue import PermanentFailure, job_queue
+
+MAX_CONFIRMATIONS = 6
+DEFAULT_CONFIRMATION_THRESHOLD = 3
 
 class BitcoinSimulator:
     """Simulate Bitcoin transactions for testing"""
@@ -18,18 +25,15 @@ class BitcoinSimulator:
         return f"{prefix}{random_chars}"
     
     def simulate_transaction(self, transaction_id):
-        """Simulate blockchain confirmation process"""
-        transaction = Transaction.query.get(transaction_id)
+        """Hand a transaction to the confirmation engine instead of confirming it inline"""
+        transaction = db.session.get(Transaction, transaction_id)
         if not transaction:
             return False
         
-        # Simulate confirmations over time
-        for i in range(1, 7):  # Up to 6 confirmations
-            time.sleep(0.5)  # Simulate network delay
-            transaction.confirmations = i
-            if i >= 3:  # Consider confirmed after 3 confirmations
-                transaction.status = 'confirmed'
-            
+        # The engine picks up every in-flight row on its next block
+        if transaction.status not in IN_FLIGHT_STATUSES:
+            transaction.status = 'pending'
+            transaction.confirmations = 0
             db.session.commit()
         
         return True
@@ -53,5 +57,138 @@ class BitcoinSimulator:
         fee = base_fee * network_multiplier[current_status]
         return min(fee, amount * 0.01)  # Cap at 1% of amount
 
-# Create global instance
-bitcoin_simulator = BitcoinSimulator()
\ No newline at end of file
+class ConfirmationEngine:
+    """Advance every in-flight transaction by one confirmation per simulated block"""
+
+    def __init__(self, block_interval=0.5, max_confirmations=MAX_CONFIRMATIONS):
+        self.block_interval = block_interval
+        self.max_confirmations = max_confirmations
+        self.app = None
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        # Counters exposed through stats()
+        self.height = 0
+        self._last_tick_ms = 0.0
+        self._last_advanced = 0
+        self._last_confirmed = 0
+        self._total_confirmed = 0
+        self._errors = 0
+
+    def init_app(self, app):
+        """Bind the engine to an application and start the block clock if enabled"""
+        self.app = app
+        self.block_interval = app.config.get('CONFIRMATION_BLOCK_INTERVAL', self.block_interval)
+        app.extensions['confirmation_engine'] = self
+
+        @app.cli.command('confirmations')
+        def run_confirmations():
+            """Run the block clock in the foreground"""
+            self.run_forever()
+
+        if app.config.get('CONFIRMATION_ENGINE_ENABLED'):
+            self.start()
+
+    def get_threshold(self):
+        """Read the confirmation_threshold setting, falling back to config"""
+        value = db.session.query(SystemSetting.value).filter_by(key='confirmation_threshold').scalar()
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return self.app.config.get('CONFIRMATION_THRESHOLD', DEFAULT_CONFIRMATION_THRESHOLD)
+
+    def tick(self):
+        """Mine one block: confirm rows reaching the threshold and advance all in-flight rows"""
+        started = time.perf_counter()
+        threshold = self.get_threshold()
+
+        # Rows that will hit the threshold with this block flip to confirmed
+        confirmed = db.session.execute(
+            update(Transaction)
+            .where(Transaction.in_flight())
+            .where(Transaction.status == 'pending')
+            .where(Transaction.confirmations >= threshold - 1)
+            .values(status='confirmed', updated_at=db.func.now())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        # Every in-flight row gains a confirmation, up to the simulated maximum; confirmed
+        # rows reaching it complete, leaving ix_transactions_pending to the rows still moving
+        advanced = db.session.execute(
+            update(Transaction)
+            .where(Transaction.in_flight())
+            .where(Transaction.confirmations < self.max_confirmations)
+            .values(
+                confirmations=Transaction.confirmations + 1,
+                status=case(
+                    (and_(
+                        Transaction.status == 'confirmed',
+                        Transaction.confirmations >= self.max_confirmations - 1
+                    ), 'completed'),
+                    else_=Transaction.status
+                ),
+                updated_at=db.func.now()
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        db.session.commit()
+
+        self.height += 1
+        self._last_tick_ms = (time.perf_counter() - started) * 1000
+        self._last_advanced = advanced
+        self._last_confirmed = confirmed
+        self._total_confirmed += confirmed
+        return {'height': self.height, 'advanced': advanced, 'confirmed': confirmed}
+
+    def run_forever(self):
+        """Tick on the block clock until stopped"""
+        while not self._stop.wait(self.block_interval):
+            with self.app.app_context():
+                try:
+                    self.tick()
+                except Exception as e:
+                    db.session.rollback()
+                    self._errors += 1
+                    logging.error(f"Confirmation tick error: {str(e)}")
+
+    def start(self):
+        """Run the block clock in a daemon thread of this process"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='confirmation-engine', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop the block clock"""
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+
+    def stats(self):
+        """Return block height and last tick counters"""
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'height': self.height,
+            'last_tick_ms': round(self._last_tick_ms, 3),
+            'last_advanced': self._last_advanced,
+            'last_confirmed': self._last_confirmed,
+            'total_confirmed': self._total_confirmed,
+            'errors': self._errors,
+        }
+
+# Create global instances
+bitcoin_simulator = BitcoinSimulator()
+confirmation_engine = ConfirmationEngine()
+
+
+@job_queue.task('transactions.simulate', priority='high')
+def simulate_transaction_job(transaction_id):
+    """Job: hand a transaction to the confirmation engine"""
+    if not bitcoin_simulator.simulate_transaction(transaction_id):
+        raise PermanentFailure(f'Transaction {transaction_id} not found')
+    return {'transaction_id': transaction_id}
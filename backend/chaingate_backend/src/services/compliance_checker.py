@@ -0,0 +1,217 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+import numpy as np
+from sqlalchemy import bindparam, event, select, update
+from ..database import db
+from ..models.user import Transaction, ComplianceRule
+from .dashboard_stats import dashboard_stats
+
+# rule_type -> (transaction type it applies to, None for all; action on breach)
+RULE_TYPES = {
+    'deposit_limit': ('deposit', 'block'),
+    'withdrawal_limit': ('withdrawal', 'block'),
+    'transaction_monitoring': (None, 'flag'),
+}
+
+Decision = namedtuple('Decision', ['blocked', 'flagged'])
+ALLOWED = Decision((), ())
+
+
+class CompiledRules:
+    """Immutable rule index: per rule_type, thresholds in ascending order"""
+
+    def __init__(self, rules, fingerprint=None):
+        self.fingerprint = fingerprint
+        grouped = {}
+        for name, rule_type, threshold in rules:
+            if rule_type in RULE_TYPES and threshold is not None:
+                grouped.setdefault(rule_type, []).append((float(threshold), name))
+
+        self.index = {}
+        for rule_type, entries in grouped.items():
+            entries.sort()
+            applies_to, action = RULE_TYPES[rule_type]
+            self.index[rule_type] = (
+                applies_to,
+                action,
+                tuple(threshold for threshold, _ in entries),
+                tuple(name for _, name in entries),
+            )
+
+    def __len__(self):
+        return sum(len(thresholds) for _, _, thresholds, _ in self.index.values())
+
+
+class ComplianceChecker:
+    """Evaluate transactions against active compliance rules compiled in memory"""
+
+    def __init__(self, reload_interval=5.0):
+        self.reload_interval = reload_interval
+        self.app = None
+
+        self._lock = threading.Lock()
+        self._compiled = None
+        self._checked_at = 0.0
+        self._stale = True
+        self._listening = False
+
+        # Counters exposed through stats()
+        self._evaluations = 0
+        self._reloads = 0
+
+    def init_app(self, app):
+        """Bind to an application and reload on ComplianceRule writes"""
+        self.app = app
+        self.reload_interval = app.config.get('COMPLIANCE_RELOAD_INTERVAL', self.reload_interval)
+        app.extensions['compliance_checker'] = self
+
+        if not self._listening:
+            for name in ('after_insert', 'after_update', 'after_delete'):
+                event.listen(ComplianceRule, name, self._on_rule_write)
+            self._listening = True
+
+        @app.cli.command('compliance-backfill')
+        def compliance_backfill():
+            """Flag existing transactions that breach monitoring rules"""
+            print(f'Flagged {self.backfill()} transactions')
+
+    def rules(self):
+        """Current compiled rule set, reloaded when rules changed"""
+        now = time.monotonic()
+        if self._stale or now - self._checked_at >= self.reload_interval:
+            self._refresh(now)
+        return self._compiled
+
+    def applies(self, rule_type):
+        """Whether any active rule of this type exists"""
+        return rule_type in self.rules().index
+
+    def thresholds(self, tx_type):
+        """Ascending thresholds of every active rule that applies to a transaction type"""
+        return sorted(
+            threshold
+            for applies_to, _, thresholds, _ in self.rules().index.values()
+            if applies_to is None or applies_to == tx_type
+            for threshold in thresholds
+        )
+
+    def evaluate(self, tx_type, amount, daily_total=0):
+        """Return the names of rules that block or flag one transaction"""
+        compiled = self.rules()
+        self._evaluations += 1
+        amount = float(amount)
+
+        blocked = []
+        flagged = []
+        for rule_type, (applies_to, action, thresholds, names) in compiled.index.items():
+            if applies_to is not None and applies_to != tx_type:
+                continue
+            value = amount + float(daily_total) if rule_type == 'deposit_limit' else amount
+            # Every threshold strictly below the value is breached
+            breached = bisect_left(thresholds, value)
+            if breached:
+                (blocked if action == 'block' else flagged).extend(names[:breached])
+
+        if not blocked and not flagged:
+            return ALLOWED
+        return Decision(tuple(blocked), tuple(flagged))
+
+    def evaluate_batch(self, tx_types, amounts):
+        """Vectorized evaluation for backfills, returning blocked/flagged masks and breach counts"""
+        compiled = self.rules()
+        tx_types = np.asarray(tx_types)
+        amounts = np.asarray(amounts, dtype=np.float64)
+
+        blocked = np.zeros(len(amounts), dtype=bool)
+        flagged = np.zeros(len(amounts), dtype=bool)
+        breaches = np.zeros(len(amounts), dtype=np.int64)
+        for applies_to, action, thresholds, _ in compiled.index.values():
+            counts = np.searchsorted(np.asarray(thresholds), amounts, side='left')
+            if applies_to is not None:
+                counts = np.where(tx_types == applies_to, counts, 0)
+            breaches += counts
+            if action == 'block':
+                blocked |= counts > 0
+            else:
+                flagged |= counts > 0
+
+        self._evaluations += len(amounts)
+        return {'blocked': blocked, 'flagged': flagged, 'breaches': breaches}
+
+    def backfill(self, batch_size=10000):
+        """Flag existing unflagged transactions that breach monitoring rules, in id order"""
+        table = Transaction.__table__
+        total = 0
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(table.c.id, table.c.type, table.c.amount)
+                .where(table.c.id > last_id)
+                .where(table.c.flagged == False)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return total
+
+            ids, types, amounts = zip(*rows)
+            result = self.evaluate_batch(np.array(types, dtype=object), np.array(amounts, dtype=np.float64))
+            hits = [int(tx_id) for tx_id, hit in zip(ids, result['flagged']) if hit]
+            if hits:
+                db.session.execute(
+                    update(table).where(table.c.id == bindparam('b_id')).values(flagged=True),
+                    [{'b_id': tx_id} for tx_id in hits]
+                )
+                dashboard_stats.adjust(db.session, 'flagged_transactions', len(hits))
+            db.session.commit()
+
+            total += len(hits)
+            last_id = ids[-1]
+
+    def stats(self):
+        """Return evaluation counters"""
+        compiled = self._compiled
+        return {
+            'rules': len(compiled) if compiled else 0,
+            'evaluations': self._evaluations,
+            'reloads': self._reloads,
+        }
+
+    def _refresh(self, now):
+        with self._lock:
+            if not self._stale and now - self._checked_at < self.reload_interval:
+                return
+            try:
+                # A cheap fingerprint query decides whether the full rule set needs reloading,
+                # which also picks up rules changed by other workers
+                table = ComplianceRule.__table__
+                with db.engine.connect() as connection:
+                    fingerprint = tuple(connection.execute(
+                        select(db.func.count(), db.func.max(table.c.id), db.func.max(table.c.updated_at))
+                        .where(table.c.is_active == True)
+                    ).one())
+                    if self._compiled is None or self._stale or fingerprint != self._compiled.fingerprint:
+                        rows = connection.execute(
+                            select(table.c.rule_name, table.c.rule_type, table.c.threshold)
+                            .where(table.c.is_active == True)
+                        ).all()
+                        # Build fully, then swap the reference, so readers never see a partial index
+                        self._compiled = CompiledRules(rows, fingerprint)
+                        self._reloads += 1
+                self._stale = False
+                self._checked_at = now
+            except Exception as e:
+                logging.error(f"Compliance rule reload error: {str(e)}")
+                if self._compiled is None:
+                    raise
+                self._checked_at = now
+
+    def _on_rule_write(self, mapper, connection, target):
+        self._stale = True
+
+
+# Create global instance
+compliance_checker = ComplianceChecker()
@@ -0,0 +1,187 @@
+import logging
+import os
+import random
+import threading
+import time
+from sqlalchemy import event, inspect, insert, select, update
+from ..database import db
+from ..models.user import User, Transaction, StatCounter
+
+COUNTER_NAMES = ('total_users', 'total_transactions', 'pending_kyc', 'flagged_transactions')
+
+
+class DashboardStats:
+    """Admin dashboard aggregates kept in sharded counter rows"""
+
+    def __init__(self, ttl=2.0, shards=8, reconcile_interval=300.0):
+        self.ttl = ttl
+        self.shards = shards
+        self.reconcile_interval = reconcile_interval
+        self.app = None
+
+        self._lock = threading.RLock()
+        self._cached = None
+        self._cached_at = 0.0
+        self._listening = False
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        """Bind to an application, track ORM writes and start reconciliation if enabled"""
+        self.app = app
+        self.ttl = app.config.get('STATS_CACHE_TTL', self.ttl)
+        self.shards = app.config.get('STATS_COUNTER_SHARDS', self.shards)
+        self.reconcile_interval = app.config.get('STATS_RECONCILE_INTERVAL', self.reconcile_interval)
+        app.extensions['dashboard_stats'] = self
+
+        if not self._listening:
+            event.listen(db.session, 'before_flush', self._before_flush)
+            self._listening = True
+
+        @app.cli.command('reconcile-stats')
+        def reconcile_stats():
+            """Recount dashboard aggregates and fix counter drift"""
+            print(self.reconcile())
+
+        if app.config.get('STATS_RECONCILE_ENABLED'):
+            self.start()
+
+    def get(self):
+        """Return current aggregates, served from a short-TTL cache"""
+        now = time.monotonic()
+        cached = self._cached
+        if cached is not None and now - self._cached_at < self.ttl:
+            return cached
+
+        with self._lock:
+            if self._cached is not None and time.monotonic() - self._cached_at < self.ttl:
+                return self._cached
+
+            values = self._read()
+            if len(values) < len(COUNTER_NAMES):
+                # Counters were never bootstrapped on this database
+                self.reconcile()
+                values = self._read()
+
+            self._cached = {name: int(values.get(name, 0)) for name in COUNTER_NAMES}
+            self._cached_at = time.monotonic()
+            return self._cached
+
+    def adjust(self, session, name, delta):
+        """Apply a delta in the caller's transaction, for writes that bypass the ORM unit of work"""
+        if not delta:
+            return
+        # A random shard spreads concurrent writers over several rows instead of one hot row
+        session.connection().execute(
+            update(StatCounter.__table__)
+            .where(StatCounter.__table__.c.name == name)
+            .where(StatCounter.__table__.c.shard == random.randrange(self.shards))
+            .values(value=StatCounter.__table__.c.value + delta)
+        )
+
+    def reconcile(self):
+        """Recount from the source tables and fold any drift into shard 0"""
+        table = StatCounter.__table__
+        count = db.func.count()
+        sources = {
+            'total_users': select(count).select_from(User.__table__),
+            'total_transactions': select(count).select_from(Transaction.__table__),
+            'pending_kyc': select(count).select_from(User.__table__).where(User.kyc_status == 'pending'),
+            'flagged_transactions': select(count).select_from(Transaction.__table__).where(Transaction.flagged == True),
+        }
+
+        with db.engine.begin() as connection:
+            actual = {name: connection.execute(query).scalar_one() for name, query in sources.items()}
+
+            existing = set(connection.execute(select(table.c.name, table.c.shard)).all())
+            missing = [
+                {'name': name, 'shard': shard, 'value': 0}
+                for name in COUNTER_NAMES for shard in range(self.shards)
+                if (name, shard) not in existing
+            ]
+            if missing:
+                connection.execute(insert(table), missing)
+
+            for name, value in actual.items():
+                others = select(db.func.coalesce(db.func.sum(table.c.value), 0))\
+                    .where(table.c.name == name)\
+                    .where(table.c.shard != 0)\
+                    .scalar_subquery()
+                connection.execute(
+                    update(table)
+                    .where(table.c.name == name)
+                    .where(table.c.shard == 0)
+                    .values(value=value - others, updated_at=db.func.now())
+                )
+
+        with self._lock:
+            self._cached = None
+        return actual
+
+    def run_forever(self):
+        """Reconcile on a fixed interval until stopped"""
+        while not self._stop.wait(self.reconcile_interval):
+            with self.app.app_context():
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    db.session.rollback()
+                    logging.error(f"Stats reconciliation error: {str(e)}")
+
+    def start(self):
+        """Run periodic reconciliation in a daemon thread of this process"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='stats-reconcile', daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        table = StatCounter.__table__
+        with db.engine.connect() as connection:
+            rows = connection.execute(
+                select(table.c.name, db.func.sum(table.c.value)).group_by(table.c.name)
+            ).all()
+        return dict(rows)
+
+    def _before_flush(self, session, flush_context, instances):
+        deltas = dict.fromkeys(COUNTER_NAMES, 0)
+
+        for obj in session.new:
+            if isinstance(obj, User):
+                deltas['total_users'] += 1
+                # Column defaults are applied at INSERT, so None means 'pending'
+                deltas['pending_kyc'] += (obj.kyc_status or 'pending') == 'pending'
+            elif isinstance(obj, Transaction):
+                deltas['total_transactions'] += 1
+                deltas['flagged_transactions'] += bool(obj.flagged)
+
+        for obj in session.deleted:
+            if isinstance(obj, User):
+                deltas['total_users'] -= 1
+                deltas['pending_kyc'] -= obj.kyc_status == 'pending'
+            elif isinstance(obj, Transaction):
+                deltas['total_transactions'] -= 1
+                deltas['flagged_transactions'] -= bool(obj.flagged)
+
+        for obj in session.dirty:
+            if isinstance(obj, User):
+                deltas['pending_kyc'] += self._change(obj, 'kyc_status', lambda v: v == 'pending')
+            elif isinstance(obj, Transaction):
+                deltas['flagged_transactions'] += self._change(obj, 'flagged', bool)
+
+        for name, delta in deltas.items():
+            self.adjust(session, name, delta)
+
+    def _change(self, obj, attribute, predicate):
+        history = inspect(obj).attrs[attribute].history
+        if not history.has_changes() or not history.deleted:
+            return 0
+        added = history.added[0] if history.added else None
+        return int(predicate(added)) - int(predicate(history.deleted[0]))
+
+
+# Create global instance
+dashboard_stats = DashboardStats()
@@ -0,0 +1,73 @@
+import os
+import threading
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import IntegrityError
+from ..database import db
+from ..models.user import Transaction, IdSequence
+
+
+class IdAllocator:
+    """Hand out sequence values from blocks leased from the id_sequences table"""
+
+    def __init__(self, block_size=100):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._blocks = {}
+        self._pid = os.getpid()
+
+    def init_app(self, app):
+        """Read the lease size from config"""
+        self.block_size = app.config.get('ID_BLOCK_SIZE', self.block_size)
+        app.extensions['id_allocator'] = self
+
+    def next_value(self, name, seed=None):
+        """Return the next value of a named sequence, leasing a new block when exhausted"""
+        with self._lock:
+            # A forked worker must never reuse the block its parent leased
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._blocks = {}
+
+            block = self._blocks.get(name)
+            if block is None or block[0] >= block[1]:
+                block = self._blocks[name] = self._lease(name, seed)
+
+            value = block[0]
+            block[0] += 1
+            return value
+
+    def tx_hash(self, prefix, user_id):
+        """Build a simulated transaction hash unique across workers"""
+        seed = select(db.func.coalesce(db.func.max(Transaction.id), 0) + 1)
+        return f'{prefix}_{user_id}_{self.next_value("tx_hash", seed)}'
+
+    def _lease(self, name, seed):
+        table = IdSequence.__table__
+
+        for _ in range(3):
+            # The row lock taken by the UPDATE makes the read of the new high mark race-free
+            with db.engine.begin() as connection:
+                leased = connection.execute(
+                    update(table)
+                    .where(table.c.name == name)
+                    .values(next_value=table.c.next_value + self.block_size, updated_at=db.func.now())
+                ).rowcount
+                if leased:
+                    end = connection.execute(
+                        select(table.c.next_value).where(table.c.name == name)
+                    ).scalar_one()
+                    return [end - self.block_size, end]
+
+            # First use of this sequence; a concurrent worker may create it first
+            try:
+                with db.engine.begin() as connection:
+                    start = connection.execute(seed).scalar_one() if seed is not None else 1
+                    connection.execute(insert(table).values(name=name, next_value=start))
+            except IntegrityError:
+                pass
+
+        raise RuntimeError(f'Could not lease a block for sequence {name}')
+
+
+# Create global instance
+id_allocator = IdAllocator()
@@ -0,0 +1,448 @@
+import json
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime, timezone
+from ..database import db
+
+# Named priorities; larger numbers are claimed first
+PRIORITIES = {'high': 10, 'normal': 0, 'low': -10}
+
+STATUSES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+FINISHED = ('succeeded', 'failed', 'cancelled')
+
+MAX_ERROR_LENGTH = 2000
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS jobs ('
+    'id INTEGER PRIMARY KEY, task TEXT NOT NULL, args TEXT NOT NULL, priority INTEGER NOT NULL, '
+    'status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, '
+    'run_at REAL NOT NULL, lease_until REAL, worker TEXT, idempotency_key TEXT UNIQUE, user_id INTEGER, '
+    'result TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL)',
+    # Claim order; partial indexes stay as small as the backlog, not the history
+    "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (priority DESC, run_at, id) WHERE status = 'queued'",
+    "CREATE INDEX IF NOT EXISTS jobs_leases ON jobs (lease_until) WHERE status = 'running'",
+    'CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at) WHERE finished_at IS NOT NULL',
+    'CREATE INDEX IF NOT EXISTS jobs_user ON jobs (user_id, id)',
+)
+
+Task = namedtuple('Task', ['name', 'func', 'priority', 'max_attempts', 'on_abandon'])
+
+
+class PermanentFailure(Exception):
+    """Raised by a task whose job must fail now instead of being retried"""
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, timezone.utc).isoformat()
+
+
+class JobQueue:
+    """Durable job queue in a host-local SQLite file, drained by a pool of worker processes"""
+
+    def __init__(self, path=None, poll_interval=0.2, lease=300, max_attempts=5,
+                 backoff_base=2.0, backoff_max=600, retention=7 * 86400, synchronous='FULL'):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retention = retention
+        self.synchronous = synchronous
+        self.processes = os.cpu_count() or 1
+        self.app = None
+        self.tasks = {}
+
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._job = None
+
+        # Counters exposed through stats()
+        self._enqueued = 0
+        self._deduplicated = 0
+        self._succeeded = 0
+        self._retried = 0
+        self._failed = 0
+        self._reclaimed = 0
+
+    def init_app(self, app):
+        """Bind to an application, open the queue file and register the worker command"""
+        self.app = app
+        self.path = app.config.get('JOB_QUEUE_PATH') or os.path.join(app.instance_path, 'jobs.db')
+        self.processes = app.config.get('JOB_WORKER_PROCESSES') or self.processes
+        self.poll_interval = app.config.get('JOB_POLL_INTERVAL', self.poll_interval)
+        self.lease = app.config.get('JOB_LEASE_SECONDS', self.lease)
+        self.max_attempts = app.config.get('JOB_MAX_ATTEMPTS', self.max_attempts)
+        self.backoff_base = app.config.get('JOB_BACKOFF_BASE', self.backoff_base)
+        self.backoff_max = app.config.get('JOB_BACKOFF_MAX', self.backoff_max)
+        self.retention = app.config.get('JOB_RETENTION_DAYS', self.retention / 86400) * 86400
+        self.synchronous = app.config.get('JOB_SYNCHRONOUS', self.synchronous)
+        app.extensions['job_queue'] = self
+
+        import click
+
+        @app.cli.command('jobs-worker')
+        @click.option('--processes', type=int, default=None, help='worker processes; defaults to JOB_WORKER_PROCESSES')
+        def jobs_worker(processes):
+            """Drain the job queue with a pool of worker processes"""
+            self.run_pool(processes or self.processes)
+
+    def task(self, name, priority='normal', max_attempts=None, on_abandon=None):
+        """Register the decorated function as the handler for jobs named name"""
+        # on_abandon(job) runs once one of its jobs is cancelled or has failed for good,
+        # to settle whatever the caller set up before queueing it
+        def decorator(func):
+            self.tasks[name] = Task(name, func, self._priority(priority), max_attempts, on_abandon)
+            return func
+        return decorator
+
+    def enqueue(self, name, args=None, priority=None, delay=0, idempotency_key=None, user_id=None,
+                max_attempts=None):
+        """Persist a job and return it; a repeated idempotency key returns the existing job"""
+        task = self.tasks.get(name)
+        if task is None:
+            raise ValueError(f'Unknown task: {name}')
+        now = time.time()
+        cursor = self._connection().execute(
+            'INSERT INTO jobs (task, args, priority, status, max_attempts, run_at, idempotency_key, user_id, created_at) '
+            "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?, ?) ON CONFLICT (idempotency_key) DO NOTHING",
+            (name, json.dumps(args or {}, default=_json_default, separators=(',', ':')),
+             task.priority if priority is None else self._priority(priority),
+             max_attempts or task.max_attempts or self.max_attempts,
+             now + delay, idempotency_key, user_id, now)
+        )
+        if cursor.rowcount:
+            self._enqueued += 1
+            return self.get(cursor.lastrowid)
+        self._deduplicated += 1
+        return self._row(self._connection().execute(
+            'SELECT * FROM jobs WHERE idempotency_key = ?', (idempotency_key,)
+        ).fetchone())
+
+    def get(self, job_id):
+        """One job as a dict, or None"""
+        return self._row(self._connection().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone())
+
+    def find(self, user_id=None, status=None, task=None, before=None, limit=50):
+        """Jobs newest first, keyset-paginated on id"""
+        clauses, params = [], []
+        for column, value in (('user_id', user_id), ('status', status), ('task', task)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if before is not None:
+            clauses.append('id < ?')
+            params.append(before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self._connection().execute(
+            f'SELECT * FROM jobs {where} ORDER BY id DESC LIMIT ?', (*params, limit)
+        ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def cancel(self, job_id):
+        """Cancel a job that has not started; returns whether it was cancelled"""
+        cancelled = self._connection().execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+            (time.time(), job_id)
+        ).rowcount
+        if cancelled:
+            self._abandon(self.get(job_id))
+        return bool(cancelled)
+
+    def requeue(self, job_id):
+        """Give a failed or cancelled job a fresh set of attempts"""
+        return bool(self._connection().execute(
+            "UPDATE jobs SET status = 'queued', attempts = 0, run_at = ?, error = NULL, finished_at = NULL "
+            "WHERE id = ? AND status IN ('failed', 'cancelled')",
+            (time.time(), job_id)
+        ).rowcount)
+
+    def claim(self, worker=None):
+        """Atomically take the most urgent runnable job, or return None"""
+        connection = self._connection()
+        now = time.time()
+        # The write lock is taken up front so two workers never select the same row
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' AND run_at <= ? "
+                'ORDER BY priority DESC, run_at, id LIMIT 1', (now,)
+            ).fetchone()
+            if row is None:
+                connection.execute('COMMIT')
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, started_at = ?, "
+                'lease_until = ? WHERE id = ?',
+                (worker or self._worker_name(), now, now + self.lease, row[0])
+            )
+            job = connection.execute('SELECT * FROM jobs WHERE id = ?', (row[0],)).fetchone()
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return self._row(job)
+
+    def execute(self, job):
+        """Run a claimed job and record its outcome"""
+        self._job = job
+        try:
+            task = self.tasks.get(job['task'])
+            if task is None:
+                raise PermanentFailure(f"Unknown task: {job['task']}")
+            with self.app.app_context():
+                try:
+                    result = task.func(**job['args'])
+                except BaseException:
+                    db.session.rollback()
+                    raise
+        except Exception as e:
+            self._fail(job, e)
+        else:
+            self._finish(job, result)
+        finally:
+            self._job = None
+
+    def last_attempt(self):
+        """Whether a failure now is final: outside a job, or on the running job's last attempt"""
+        return self._job is None or self._job['attempts'] >= self._job['max_attempts']
+
+    def reclaim(self):
+        """Requeue running jobs whose worker stopped renewing the lease"""
+        connection = self._connection()
+        now = time.time()
+        # Under the write lock, the jobs selected here are exactly the jobs failed below
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            expired = [row[0] for row in connection.execute(
+                "SELECT id FROM jobs WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts",
+                (now,)
+            )]
+            connection.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Lease expired', finished_at = ?, lease_until = NULL "
+                "WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts", (now, now)
+            )
+            requeued = connection.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, lease_until = NULL, run_at = ? "
+                "WHERE status = 'running' AND lease_until < ?", (now, now)
+            ).rowcount
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        for job_id in expired:
+            self._abandon(self.get(job_id))
+        self._reclaimed += len(expired) + requeued
+        return len(expired) + requeued
+
+    def prune(self):
+        """Delete finished jobs older than the retention period"""
+        return self._connection().execute(
+            'DELETE FROM jobs WHERE finished_at < ?', (time.time() - self.retention,)
+        ).rowcount
+
+    def run_forever(self):
+        """Claim and run jobs in this process until stopped"""
+        heartbeat = threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True)
+        heartbeat.start()
+        maintenance_at = 0.0
+        while not self._stop.is_set():
+            if time.monotonic() >= maintenance_at:
+                try:
+                    self.reclaim()
+                    self.prune()
+                except sqlite3.Error as e:
+                    logging.error(f"Job queue maintenance error: {str(e)}")
+                maintenance_at = time.monotonic() + min(30.0, self.lease / 2)
+            try:
+                job = self.claim()
+            except sqlite3.Error as e:
+                logging.error(f"Job claim error: {str(e)}")
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            self.execute(job)
+
+    def run_pool(self, processes):
+        """Fork worker processes and replace any that exit, until SIGTERM or SIGINT"""
+        context = multiprocessing.get_context('fork')
+        stopping = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+        signal.signal(signal.SIGINT, lambda signum, frame: stopping.set())
+
+        children = [None] * processes
+        while not stopping.is_set():
+            for slot, child in enumerate(children):
+                if child is not None and child.is_alive():
+                    continue
+                if child is not None:
+                    logging.warning(f"Job worker {child.pid} exited with {child.exitcode}; restarting")
+                children[slot] = context.Process(target=self._child_main, name=f'job-worker-{slot}')
+                children[slot].start()
+            stopping.wait(1.0)
+
+        # Children finish their current job before exiting
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.join(self.lease)
+
+    def stop(self):
+        """Stop run_forever after the current job"""
+        self._stop.set()
+
+    def stats(self):
+        """Return queue depth and this process's counters"""
+        connection = self._connection()
+        return {
+            'queued': connection.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0],
+            'running': connection.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0],
+            'tasks': sorted(self.tasks),
+            'enqueued': self._enqueued,
+            'deduplicated': self._deduplicated,
+            'succeeded': self._succeeded,
+            'retried': self._retried,
+            'failed': self._failed,
+            'reclaimed': self._reclaimed,
+        }
+
+    def _child_main(self):
+        # Ctrl-C reaches the whole process group; only the supervisor reacts to it
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda signum, frame: self._stop.set())
+        # Pooled connections inherited from the supervisor belong to its process
+        with self.app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+        self.run_forever()
+
+    def _finish(self, job, result):
+        self._connection().execute(
+            "UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, finished_at = ?, lease_until = NULL "
+            'WHERE id = ? AND worker = ?',
+            (json.dumps(result, default=_json_default, separators=(',', ':')), time.time(), job['id'], job['worker'])
+        )
+        self._succeeded += 1
+
+    def _fail(self, job, error):
+        message = f'{type(error).__name__}: {error}'[:MAX_ERROR_LENGTH]
+        now = time.time()
+        # Only the worker still holding the lease may record the outcome
+        if isinstance(error, PermanentFailure) or job['attempts'] >= job['max_attempts']:
+            logging.error(f"Job {job['id']} ({job['task']}) failed: {message}")
+            failed = self._connection().execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, lease_until = NULL "
+                'WHERE id = ? AND worker = ?',
+                (message, now, job['id'], job['worker'])
+            ).rowcount
+            if failed:
+                self._abandon(self.get(job['id']))
+            self._failed += 1
+            return
+        logging.warning(f"Job {job['id']} ({job['task']}) attempt {job['attempts']} failed: {message}")
+        self._connection().execute(
+            "UPDATE jobs SET status = 'queued', error = ?, run_at = ?, worker = NULL, lease_until = NULL "
+            'WHERE id = ? AND worker = ?',
+            (message, now + self._backoff(job['attempts']), job['id'], job['worker'])
+        )
+        self._retried += 1
+
+    def _abandon(self, job):
+        task = self.tasks.get(job['task'])
+        if task is None or task.on_abandon is None:
+            return
+        try:
+            with self.app.app_context():
+                task.on_abandon(job)
+        except Exception as e:
+            logging.error(f"Job {job['id']} ({job['task']}) abandon hook error: {str(e)}")
+
+    def _backoff(self, attempts):
+        # Exponential with jitter, so jobs that failed together do not retry together
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.lease / 3):
+            job = self._job
+            if job is None:
+                continue
+            try:
+                self._connection().execute(
+                    "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                    (time.time() + self.lease, job['id'], job['worker'])
+                )
+            except sqlite3.Error as e:
+                logging.error(f"Job heartbeat error: {str(e)}")
+
+    def _priority(self, priority):
+        if isinstance(priority, str):
+            if priority not in PRIORITIES:
+                raise ValueError(f'Unknown priority: {priority}')
+            return PRIORITIES[priority]
+        return int(priority)
+
+    def _row(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['args'] = json.loads(job['args'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        return job
+
+    def _worker_name(self):
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def _connection(self):
+        # One connection per thread, reopened after fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(f'PRAGMA synchronous={self.synchronous}')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+
+def job_dict(job):
+    """JSON-ready view of a job for the API"""
+    return {
+        'id': job['id'],
+        'task': job['task'],
+        'status': job['status'],
+        'priority': job['priority'],
+        'attempts': job['attempts'],
+        'max_attempts': job['max_attempts'],
+        'result': job['result'],
+        'error': job['error'],
+        'created_at': _timestamp(job['created_at']),
+        'started_at': _timestamp(job['started_at']),
+        'finished_at': _timestamp(job['finished_at']),
+        'run_at': _timestamp(job['run_at']) if job['status'] == 'queued' else None,
+    }
+
+
+# Create global instance
+job_queue = JobQueue()
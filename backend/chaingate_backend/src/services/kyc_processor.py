@@ -0,0 +1,370 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+import uuid
+from contextlib import contextmanager
+from sqlalchemy import String, select, type_coerce
+from sqlalchemy.orm.attributes import flag_modified
+from ..database import db
+from ..models.user import KYCDocument
+from ..security.encryption import envelope_encryption
+from .job_queue import PermanentFailure, job_queue
+from .notification_service import notify_kyc_update
+
+DOCUMENT_TYPES = ('passport', 'national_id', 'drivers_license', 'proof_of_address')
+
+# kyc_documents.document_number holds the encrypted token in 255 characters, which fits
+# a number of up to 114 bytes; numbers are capped at 100 ASCII characters
+MAX_DOCUMENT_NUMBER_LENGTH = 100
+
+# Leading bytes of each accepted format; the client's Content-Type is not trusted
+MAGIC = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'%PDF-', 'application/pdf'),
+)
+
+# JPEG start-of-frame markers carry the dimensions; C4, C8 and CC are other segments
+JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+JPEG_STANDALONE = set(range(0xD0, 0xD8)) | {0x01, 0xD8}
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload stream passes the configured size limit"""
+
+
+def sniff(head):
+    """MIME type from the leading bytes, or None"""
+    for magic, mime_type in MAGIC:
+        if head.startswith(magic):
+            return mime_type
+    return None
+
+
+def png_size(handle):
+    """(width, height) from the IHDR chunk, or None"""
+    handle.seek(12)
+    header = handle.read(12)
+    if len(header) < 12 or header[:4] != b'IHDR':
+        return None
+    return struct.unpack('>II', header[4:])
+
+
+def jpeg_size(handle):
+    """(width, height) from the first start-of-frame segment, or None"""
+    handle.seek(2)
+    while True:
+        byte = handle.read(1)
+        if not byte:
+            return None
+        if byte != b'\xff':
+            continue
+        marker = handle.read(1)
+        # Runs of 0xFF are fill bytes before the marker
+        while marker == b'\xff':
+            marker = handle.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code in JPEG_STANDALONE:
+            continue
+        if code in (0xD9, 0xDA):
+            # End of image, or scan data before any frame header
+            return None
+        length = handle.read(2)
+        if len(length) < 2:
+            return None
+        if code in JPEG_SOF:
+            frame = handle.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:])
+            return width, height
+        handle.seek(struct.unpack('>H', length)[0] - 2, os.SEEK_CUR)
+
+
+class KYCProcessor:
+    """Stream KYC uploads into content-addressed storage and validate them in the job workers"""
+
+    def __init__(self, storage_dir=None, max_bytes=64 * 1024 * 1024, chunk_size=64 * 1024, concurrency=2,
+                 allowed_types=('image/jpeg', 'image/png', 'application/pdf'),
+                 min_width=600, min_height=400, max_pixels=50000000):
+        self.storage_dir = storage_dir
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.allowed_types = tuple(allowed_types)
+        self.min_width = min_width
+        self.min_height = min_height
+        self.max_pixels = max_pixels
+        self.app = None
+
+        self._slots = threading.BoundedSemaphore(concurrency)
+
+        # Counters exposed through stats()
+        self._stats_lock = threading.Lock()
+        self._uploads = 0
+        self._bytes = 0
+        self._stored = 0
+        self._deduplicated = 0
+        self._busy = 0
+        self._too_large = 0
+        self._validated = 0
+        self._rejected = 0
+
+    def init_app(self, app):
+        """Bind to an application and read storage and validation settings"""
+        self.app = app
+        self.storage_dir = app.config.get('KYC_STORAGE_DIR') or os.path.join(app.instance_path, 'kyc')
+        self.max_bytes = app.config.get('KYC_MAX_UPLOAD_BYTES', self.max_bytes)
+        self.chunk_size = app.config.get('KYC_UPLOAD_CHUNK_SIZE', self.chunk_size)
+        self.concurrency = app.config.get('KYC_UPLOAD_CONCURRENCY', self.concurrency)
+        types = app.config.get('KYC_ALLOWED_TYPES')
+        if types:
+            self.allowed_types = tuple(t.strip() for t in types.split(',') if t.strip())
+        self.min_width = app.config.get('KYC_MIN_IMAGE_WIDTH', self.min_width)
+        self.min_height = app.config.get('KYC_MIN_IMAGE_HEIGHT', self.min_height)
+        self.max_pixels = app.config.get('KYC_MAX_IMAGE_PIXELS', self.max_pixels)
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        app.extensions['kyc_processor'] = self
+
+        @app.cli.command('kyc-encrypt')
+        def kyc_encrypt():
+            """Encrypt plaintext KYC files and document numbers; rewrap data keys of retired master keys"""
+            print(self.encrypt_existing())
+
+    @contextmanager
+    def upload_slot(self):
+        """Yield whether this process may take another upload right now"""
+        # Uploads hold a request thread for as long as the client sends; capping
+        # them per process keeps the remaining threads free for the API
+        acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._stats_lock:
+                self._busy += 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self._slots.release()
+
+    def store(self, read):
+        """Copy a stream into storage chunk by chunk while hashing and encrypting it; returns (content_hash, size, file_path)"""
+        incoming = os.path.join(self.storage_dir, 'incoming')
+        os.makedirs(incoming, exist_ok=True)
+        partial = os.path.join(incoming, f'{uuid.uuid4().hex}.part')
+        digest = hashlib.sha256()
+        size = 0
+
+        try:
+            # Hashed in plaintext, so dedup still finds identical files under different data keys
+            with open(partial, 'wb') as raw, envelope_encryption.writer(raw) as handle:
+                while True:
+                    chunk = read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadTooLarge(f'Upload exceeds {self.max_bytes} bytes')
+                    digest.update(chunk)
+                    handle.write(chunk)
+
+            content_hash = digest.hexdigest()
+            file_path = self.file_path(content_hash)
+            final = os.path.join(self.storage_dir, file_path)
+            if os.path.exists(final):
+                # Same bytes already stored; identical concurrent uploads may both land here
+                os.remove(partial)
+                deduplicated = True
+            else:
+                os.makedirs(os.path.dirname(final), exist_ok=True)
+                os.replace(partial, final)
+                deduplicated = False
+        except BaseException as e:
+            if os.path.exists(partial):
+                os.remove(partial)
+            if isinstance(e, UploadTooLarge):
+                with self._stats_lock:
+                    self._too_large += 1
+            raise
+
+        with self._stats_lock:
+            self._uploads += 1
+            self._bytes += size
+            if deduplicated:
+                self._deduplicated += 1
+            else:
+                self._stored += 1
+        return content_hash, size, file_path
+
+    def file_path(self, content_hash):
+        """Storage path of a blob, relative to the storage directory"""
+        return os.path.join('blobs', content_hash[:2], content_hash)
+
+    def open_blob(self, content_hash):
+        """Readable, seekable plaintext view of a stored file"""
+        return envelope_encryption.open(os.path.join(self.storage_dir, self.file_path(content_hash)))
+
+    def validate(self, handle):
+        """Check size, sniffed type and image dimensions of an open stored file"""
+        size = handle.seek(0, os.SEEK_END)
+        if size <= 0:
+            return {'ok': False, 'reason': 'Empty file'}
+        if size > self.max_bytes:
+            return {'ok': False, 'reason': 'File too large'}
+
+        handle.seek(0)
+        mime_type = sniff(handle.read(16))
+        verdict = {'mime_type': mime_type}
+        if mime_type is None or mime_type not in self.allowed_types:
+            return dict(verdict, ok=False, reason='Unsupported file type')
+
+        if mime_type == 'application/pdf':
+            # A truncated upload loses the trailer
+            handle.seek(max(0, size - 1024))
+            if b'%%EOF' not in handle.read():
+                return dict(verdict, ok=False, reason='Truncated PDF')
+            return dict(verdict, ok=True)
+
+        dimensions = png_size(handle) if mime_type == 'image/png' else jpeg_size(handle)
+        if dimensions is None:
+            return dict(verdict, ok=False, reason='Unreadable image header')
+        width, height = dimensions
+        verdict.update(width=width, height=height)
+        if width < self.min_width or height < self.min_height:
+            return dict(verdict, ok=False, reason=f'Image smaller than {self.min_width}x{self.min_height}')
+        if width * height > self.max_pixels:
+            return dict(verdict, ok=False, reason='Image dimensions too large')
+        return dict(verdict, ok=True)
+
+    def verdict(self, content_hash):
+        """Validation result for a blob, computed once per content hash"""
+        cached = self.cached_verdict(content_hash)
+        if cached is not None:
+            return cached
+        path = os.path.join(self.storage_dir, self.file_path(content_hash))
+        with self.open_blob(content_hash) as handle:
+            verdict = self.validate(handle)
+        # Written beside the blob so later uploads of the same bytes skip validation
+        partial = f'{path}.verdict.{os.getpid()}.part'
+        with open(partial, 'w') as handle:
+            json.dump(verdict, handle)
+        os.replace(partial, f'{path}.verdict')
+        return verdict
+
+    def cached_verdict(self, content_hash):
+        """Validation result recorded for a blob, or None"""
+        path = os.path.join(self.storage_dir, self.file_path(content_hash))
+        try:
+            with open(f'{path}.verdict') as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def apply(self, document, verdict):
+        """Move a document out of processing according to a validation result"""
+        document.mime_type = verdict.get('mime_type')
+        if verdict['ok']:
+            # Valid files wait in the manual review queue
+            document.status = 'pending'
+            document.rejection_reason = None
+        else:
+            document.status = 'rejected'
+            document.rejection_reason = verdict['reason']
+        with self._stats_lock:
+            self._validated += 1
+            if not verdict['ok']:
+                self._rejected += 1
+
+    def encrypt_existing(self, batch_size=500):
+        """Bring stored files and document numbers under the active master key"""
+        if not envelope_encryption.enabled:
+            raise RuntimeError('ENCRYPTION_MASTER_KEY is not configured')
+        counts = {'files_encrypted': 0, 'files_rewrapped': 0, 'values_encrypted': 0, 'values_rewrapped': 0}
+
+        blobs = os.path.join(self.storage_dir, 'blobs')
+        for directory, _, names in os.walk(blobs):
+            for name in names:
+                if len(name) != 64:
+                    # Verdict sidecars and leftovers
+                    continue
+                path = os.path.join(directory, name)
+                if envelope_encryption.rewrap_file(path):
+                    counts['files_rewrapped'] += 1
+                elif self._encrypt_plaintext(path):
+                    counts['files_encrypted'] += 1
+
+        # Raw column values, so plaintext and retired-key tokens can be told apart
+        raw = type_coerce(KYCDocument.document_number, String)
+        stale = []
+        for document_id, value in db.session.execute(
+            select(KYCDocument.id, raw).where(KYCDocument.document_number.isnot(None))
+        ):
+            if not envelope_encryption.is_encrypted(value):
+                stale.append(document_id)
+                counts['values_encrypted'] += 1
+            elif envelope_encryption.needs_rewrap(value):
+                stale.append(document_id)
+                counts['values_rewrapped'] += 1
+        for start in range(0, len(stale), batch_size):
+            for document in KYCDocument.query.filter(KYCDocument.id.in_(stale[start:start + batch_size])):
+                # Rewritten through EncryptedString under the active key
+                flag_modified(document, 'document_number')
+            db.session.commit()
+        return counts
+
+    def _encrypt_plaintext(self, path):
+        """Replace a file stored before encryption was configured with its encrypted copy"""
+        if envelope_encryption.is_encrypted_file(path):
+            return False
+        with open(path, 'rb') as source:
+            partial = f'{path}.{os.getpid()}.part'
+            with open(partial, 'wb') as raw, envelope_encryption.writer(raw) as handle:
+                while True:
+                    chunk = source.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    handle.write(chunk)
+        os.replace(partial, path)
+        return True
+
+    def stats(self):
+        """Return upload and validation counters"""
+        with self._stats_lock:
+            return {
+                'uploads': self._uploads,
+                'bytes': self._bytes,
+                'stored': self._stored,
+                'deduplicated': self._deduplicated,
+                'busy_rejections': self._busy,
+                'too_large': self._too_large,
+                'validated': self._validated,
+                'rejected': self._rejected,
+            }
+
+
+# Create global instance
+kyc_processor = KYCProcessor()
+
+
+@job_queue.task('kyc.validate')
+def validate_document(document_id):
+    """Job: validate an uploaded document and settle its status"""
+    document = db.session.get(KYCDocument, document_id)
+    if document is None:
+        raise PermanentFailure(f'KYC document {document_id} not found')
+    if document.status != 'processing':
+        return {'document_id': document_id, 'status': document.status}
+
+    verdict = kyc_processor.verdict(document.content_hash)
+    kyc_processor.apply(document, verdict)
+    db.session.commit()
+
+    try:
+        notify_kyc_update(document.user_id, document.id, document.status, document.rejection_reason)
+    except Exception as e:
+        logging.error(f"KYC notification error: {str(e)}")
+    return {'document_id': document_id, 'status': document.status, 'reason': document.rejection_reason}
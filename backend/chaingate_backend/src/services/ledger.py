@@ -0,0 +1,162 @@
+import logging
+import os
+import threading
+from decimal import Decimal
+from sqlalchemy import and_, insert, or_, select, update
+from ..database import db
+from ..models.user import Wallet, WalletEntry, WalletSnapshot
+
+
+class InsufficientFunds(Exception):
+    """Raised when a conditional debit finds less than the requested amount"""
+
+
+class WalletLedger:
+    """Append-only wallet entries with atomic conditional balance updates"""
+
+    def __init__(self, snapshot_interval=300.0, snapshot_batch_size=500):
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_batch_size = snapshot_batch_size
+        self.app = None
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        """Bind to an application and start periodic snapshots if enabled"""
+        self.app = app
+        self.snapshot_interval = app.config.get('LEDGER_SNAPSHOT_INTERVAL', self.snapshot_interval)
+        self.snapshot_batch_size = app.config.get('LEDGER_SNAPSHOT_BATCH_SIZE', self.snapshot_batch_size)
+        app.extensions['wallet_ledger'] = self
+
+        @app.cli.command('ledger-snapshot')
+        def ledger_snapshot():
+            """Snapshot balances of wallets with new ledger entries"""
+            print(f'Snapshotted {self.snapshot()} wallets')
+
+        if app.config.get('LEDGER_SNAPSHOT_ENABLED'):
+            self.start()
+
+    def credit(self, session, wallet_id, amount, transaction_id=None):
+        """Add funds in the caller's transaction and return the new balance"""
+        return self._post(session, wallet_id, Decimal(amount), 'credit', transaction_id)
+
+    def debit(self, session, wallet_id, amount, transaction_id=None):
+        """Remove funds only if the balance covers them, in the caller's transaction"""
+        return self._post(session, wallet_id, -Decimal(amount), 'debit', transaction_id)
+
+    def balance(self, session, wallet_id):
+        """Materialized balance, a single primary-key read"""
+        return session.execute(select(Wallet.balance).where(Wallet.id == wallet_id)).scalar_one()
+
+    def ledger_balance(self, session, wallet_id):
+        """Balance derived from the latest snapshot plus the entries after it"""
+        snapshot = session.execute(
+            select(WalletSnapshot.balance, WalletSnapshot.last_entry_id)
+            .where(WalletSnapshot.wallet_id == wallet_id)
+            .order_by(WalletSnapshot.id.desc())
+            .limit(1)
+        ).first()
+        base, last_entry_id = snapshot if snapshot else (Decimal('0'), 0)
+
+        tail = session.execute(
+            select(db.func.coalesce(db.func.sum(WalletEntry.amount), 0))
+            .where(WalletEntry.wallet_id == wallet_id)
+            .where(WalletEntry.id > last_entry_id)
+        ).scalar_one()
+        return Decimal(base) + Decimal(tail)
+
+    def snapshot(self):
+        """Checkpoint balances of wallets with entries after their last snapshot"""
+        wallets = Wallet.__table__
+        entries = WalletEntry.__table__
+        snapshots = WalletSnapshot.__table__
+
+        latest = select(
+            snapshots.c.wallet_id,
+            db.func.max(snapshots.c.last_entry_id).label('last_entry_id')
+        ).group_by(snapshots.c.wallet_id).subquery()
+
+        stale = select(wallets.c.id)\
+            .outerjoin(latest, latest.c.wallet_id == wallets.c.id)\
+            .where(or_(
+                latest.c.wallet_id.is_(None),
+                select(entries.c.id)
+                .where(and_(entries.c.wallet_id == wallets.c.id, entries.c.id > latest.c.last_entry_id))
+                .exists()
+            ))
+
+        with db.engine.connect() as connection:
+            wallet_ids = connection.execute(stale).scalars().all()
+
+        for start in range(0, len(wallet_ids), self.snapshot_batch_size):
+            batch = wallet_ids[start:start + self.snapshot_batch_size]
+            with db.engine.begin() as connection:
+                # Entries are only written while the wallet row is locked, so once we hold
+                # the lock every entry for these wallets is committed and the copy is exact
+                connection.execute(
+                    update(wallets).where(wallets.c.id.in_(batch)).values(balance=wallets.c.balance)
+                )
+                last_entry = select(db.func.coalesce(db.func.max(entries.c.id), 0))\
+                    .where(entries.c.wallet_id == wallets.c.id)\
+                    .scalar_subquery()
+                connection.execute(
+                    insert(snapshots).from_select(
+                        ['wallet_id', 'balance', 'last_entry_id'],
+                        select(wallets.c.id, wallets.c.balance, last_entry).where(wallets.c.id.in_(batch))
+                    )
+                )
+
+        return len(wallet_ids)
+
+    def run_forever(self):
+        """Snapshot on a fixed interval until stopped"""
+        while not self._stop.wait(self.snapshot_interval):
+            with self.app.app_context():
+                try:
+                    self.snapshot()
+                except Exception as e:
+                    logging.error(f"Ledger snapshot error: {str(e)}")
+
+    def start(self):
+        """Run periodic snapshots in a daemon thread of this process"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='ledger-snapshot', daemon=True)
+        self._thread.start()
+
+    def _post(self, session, wallet_id, delta, entry_type, transaction_id):
+        statement = update(Wallet.__table__)\
+            .where(Wallet.__table__.c.id == wallet_id)\
+            .values(balance=Wallet.__table__.c.balance + delta, updated_at=db.func.now())
+        if delta < 0:
+            # The balance check and the debit are one statement, so concurrent debits cannot overdraw
+            statement = statement.where(Wallet.__table__.c.balance >= -delta)
+
+        connection = session.connection()
+        if connection.dialect.update_returning:
+            new_balance = connection.execute(statement.returning(Wallet.__table__.c.balance)).scalar()
+            updated = new_balance is not None
+        else:
+            updated = connection.execute(statement).rowcount == 1
+            new_balance = self.balance(session, wallet_id) if updated else None
+
+        if not updated:
+            if delta < 0:
+                raise InsufficientFunds(f'Wallet {wallet_id} cannot cover {-delta}')
+            raise LookupError(f'Wallet {wallet_id} not found')
+
+        connection.execute(insert(WalletEntry.__table__).values(
+            wallet_id=wallet_id,
+            transaction_id=transaction_id,
+            entry_type=entry_type,
+            amount=delta
+        ))
+        return Decimal(new_balance)
+
+
+# Create global instance
+wallet_ledger = WalletLedger()
@@ -1,51 +1,219 @@
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask import request
-from src.models.user import db, User
-import json
+from flask_login import current_user
+from datetime import datetime, timezone
+import logging
+import os
+import threading
+import time
 
 socketio = SocketIO()
 
-# Store connected users
-connected_users = {}
+ROOM_ADMINS = 'admins'
+
+
+def user_room(user_id):
+    return f'user_{user_id}'
+
+
+class NotificationHub:
+    """Socket index and coalescing fan-out for real-time notifications"""
+
+    def __init__(self, coalesce_window=0.05, max_pending=10000):
+        self.coalesce_window = coalesce_window
+        self.max_pending = max_pending
+
+        self._lock = threading.Lock()
+        # Bidirectional index: a user may have several tabs open
+        self._sids_by_user = {}
+        self._user_by_sid = {}
+        # room -> {coalesce key: (event, payload, enqueued_at)}; room None is everyone
+        self._pending = {}
+        self._depth = 0
+        self._sequence = 0
+        self._flusher_pid = None
+
+        # Counters exposed through stats()
+        self._published = 0
+        self._coalesced = 0
+        self._emits = 0
+        self._batches = 0
+        self._emit_errors = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def init_app(self, app):
+        """Bind the Socket.IO server to an application"""
+        self.coalesce_window = app.config.get('NOTIFY_COALESCE_WINDOW', self.coalesce_window)
+        self.max_pending = app.config.get('NOTIFY_MAX_PENDING', self.max_pending)
+        socketio.init_app(
+            app,
+            async_mode=app.config.get('SOCKETIO_ASYNC_MODE'),
+            message_queue=app.config.get('SOCKETIO_MESSAGE_QUEUE')
+        )
+        app.extensions['notification_hub'] = self
+
+    def connect(self, sid, user_id):
+        """Index a socket under its user"""
+        with self._lock:
+            self._user_by_sid[sid] = user_id
+            self._sids_by_user.setdefault(user_id, set()).add(sid)
+
+    def disconnect(self, sid):
+        """Drop a socket from the index and return its user"""
+        with self._lock:
+            user_id = self._user_by_sid.pop(sid, None)
+            if user_id is not None:
+                sids = self._sids_by_user.get(user_id)
+                if sids is not None:
+                    sids.discard(sid)
+                    if not sids:
+                        del self._sids_by_user[user_id]
+            return user_id
+
+    def is_online(self, user_id):
+        """Whether the user has at least one open socket on this worker"""
+        return user_id in self._sids_by_user
+
+    def publish(self, event, payload, room=None, key=None):
+        """Queue a message for a room; a newer message with the same key replaces the queued one"""
+        if socketio.server is None:
+            # No Socket.IO server in this process (CLI commands, scripts)
+            return
+        with self._lock:
+            messages = self._pending.setdefault(room, {})
+            if key is None:
+                self._sequence += 1
+                key = self._sequence
+            if key in messages:
+                self._coalesced += 1
+                # Keep the original enqueue time so latency reflects the oldest waiter
+                messages[key] = (event, payload, messages[key][2])
+            else:
+                messages[key] = (event, payload, time.monotonic())
+                self._depth += 1
+            self._published += 1
+            overflow = self._depth >= self.max_pending
+
+        if overflow:
+            # Backpressure: the publisher delivers the backlog itself
+            self.flush()
+        else:
+            self._ensure_flusher()
+
+    def flush(self):
+        """Emit everything queued, one emit per room"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._depth = 0
+        if not pending:
+            return 0
+
+        now = time.monotonic()
+        for room, messages in pending.items():
+            messages = list(messages.values())
+            try:
+                if len(messages) == 1:
+                    event, payload, _ = messages[0]
+                    socketio.emit(event, payload, to=room, namespace='/')
+                else:
+                    # One packet per room: Socket.IO encodes it once and reuses it for every socket
+                    socketio.emit(
+                        'notification_batch',
+                        [{'event': event, 'data': payload} for event, payload, _ in messages],
+                        to=room, namespace='/'
+                    )
+                    self._batches += 1
+                self._emits += 1
+            except Exception as e:
+                self._emit_errors += 1
+                logging.error(f"Notification emit error: {str(e)}")
+                continue
+
+            oldest = min(enqueued for _, _, enqueued in messages)
+            latency = now - oldest
+            self._latency_total += latency
+            self._latency_max = max(self._latency_max, latency)
+        return len(pending)
+
+    def stats(self):
+        """Return queue depth and emit latency metrics"""
+        with self._lock:
+            return {
+                'connected_sockets': len(self._user_by_sid),
+                'connected_users': len(self._sids_by_user),
+                'queue_depth': self._depth,
+                'published': self._published,
+                'coalesced': self._coalesced,
+                'emits': self._emits,
+                'batches': self._batches,
+                'emit_errors': self._emit_errors,
+                'avg_emit_latency_ms': round(self._latency_total / self._emits * 1000, 3) if self._emits else 0.0,
+                'max_emit_latency_ms': round(self._latency_max * 1000, 3),
+            }
+
+    def _ensure_flusher(self):
+        # Fork-safe: each worker process runs its own flusher
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        socketio.start_background_task(self._run)
+
+    def _run(self):
+        while True:
+            socketio.sleep(self.coalesce_window)
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Notification flush error: {str(e)}")
+
+
+# Create global instance
+notification_hub = NotificationHub()
+
 
 @socketio.on('connect')
 def handle_connect():
-    print(f"Client connected: {request.sid}")
+    # Sockets ride on the Flask-Login session; anonymous clients are refused
+    if not current_user.is_authenticated:
+        return False
+    notification_hub.connect(request.sid, current_user.id)
 
 @socketio.on('disconnect')
-def handle_disconnect():
-    print(f"Client disconnected: {request.sid}")
-    # Remove user from connected users
-    for user_id, sid in list(connected_users.items()):
-        if sid == request.sid:
-            del connected_users[user_id]
-            break
+def handle_disconnect(*args):
+    notification_hub.disconnect(request.sid)
 
 @socketio.on('join')
-def handle_join(data):
-    user_id = data.get('user_id')
-    if user_id:
-        connected_users[user_id] = request.sid
-        join_room(f'user_{user_id}')
-        print(f"User {user_id} joined room")
-        emit('joined', {'message': 'Connected successfully'})
+def handle_join(data=None):
+    # The room comes from the session, never from the client-supplied user_id
+    join_room(user_room(current_user.id))
+    if current_user.is_admin():
+        join_room(ROOM_ADMINS)
+    emit('joined', {'message': 'Connected successfully'})
 
 @socketio.on('leave')
-def handle_leave(data):
-    user_id = data.get('user_id')
-    if user_id in connected_users:
-        del connected_users[user_id]
-        leave_room(f'user_{user_id}')
-        print(f"User {user_id} left room")
-
-def notify_user(user_id, event_type, data):
+def handle_leave(data=None):
+    leave_room(user_room(current_user.id))
+    if current_user.is_admin():
+        leave_room(ROOM_ADMINS)
+
+def _timestamp():
+    return datetime.now(timezone.utc).isoformat()
+
+def notify_user(user_id, event_type, data, key=None):
     """Send notification to a specific user"""
-    room = f'user_{user_id}'
-    emit(event_type, data, room=room, namespace='/')
+    notification_hub.publish(event_type, data, room=user_room(user_id), key=key)
+
+def notify_admins(event_type, data, key=None):
+    """Send notification to connected admins"""
+    notification_hub.publish(event_type, data, room=ROOM_ADMINS, key=key)
 
-def notify_all(event_type, data):
+def notify_all(event_type, data, key=None):
     """Send notification to all connected users"""
-    emit(event_type, data, broadcast=True, namespace='/')
+    notification_hub.publish(event_type, data, key=key)
 
 def notify_transaction_update(transaction_id, status, user_id=None):
     """Notify about transaction status changes"""
@@ -53,22 +221,27 @@ def notify_transaction_update(transaction_id, status, user_id=None):
         'type': 'transaction_update',
         'transaction_id': transaction_id,
         'status': status,
-        'timestamp': json.dumps(json.dumps({'timestamp': 'now'}))  # Simplified
+        'timestamp': _timestamp()
     }
+    # Only the latest status of a transaction within a window is worth sending
+    key = ('transaction_update', transaction_id)
     if user_id:
-        notify_user(user_id, 'notification', notification_data)
+        notify_user(user_id, 'transaction_update', notification_data, key=key)
     else:
-        notify_all('notification', notification_data)
+        notify_all('transaction_update', notification_data, key=key)
 
 def notify_risk_alert(user_id, risk_score, reason):
     """Notify about risk assessment changes"""
     notification_data = {
         'type': 'risk_alert',
+        'user_id': user_id,
         'risk_score': risk_score,
         'reason': reason,
-        'timestamp': json.dumps({'timestamp': 'now'})
+        'message': reason,
+        'timestamp': _timestamp()
     }
-    notify_user(user_id, 'notification', notification_data)
+    # Risk alerts are for compliance staff; telling the user would tip them off
+    notify_admins('risk_alert', notification_data)
 
 def notify_compliance_report(report_id, status):
     """Notify about compliance report generation"""
@@ -76,6 +249,18 @@ def notify_compliance_report(report_id, status):
         'type': 'compliance_report',
         'report_id': report_id,
         'status': status,
-        'timestamp': json.dumps({'timestamp': 'now'})
+        'message': f'Report {report_id} {status}',
+        'timestamp': _timestamp()
+    }
+    notify_admins('compliance_report', notification_data, key=('compliance_report', report_id))
+
+def notify_kyc_update(user_id, document_id, status, reason=None):
+    """Notify a user that an uploaded KYC document was processed"""
+    notification_data = {
+        'type': 'kyc_update',
+        'document_id': document_id,
+        'status': status,
+        'reason': reason,
+        'timestamp': _timestamp()
     }
-    notify_all('notification', notification_data)
+    notify_user(user_id, 'kyc_update', notification_data, key=('kyc_update', document_id))
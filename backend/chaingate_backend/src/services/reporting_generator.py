@@ -0,0 +1,239 @@
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import select
+from ..database import read_engine
+from ..models.user import Transaction, AuditLog, RiskAssessment
+from .job_queue import PermanentFailure, job_queue
+from .notification_service import notify_compliance_report
+
+# Exportable tables and the columns each export carries
+EXPORTS = {
+    'transactions': (Transaction, (
+        'id', 'user_id', 'type', 'amount', 'status', 'tx_hash', 'from_address', 'to_address',
+        'confirmations', 'risk_score', 'flagged', 'created_at', 'updated_at'
+    )),
+    'audit_logs': (AuditLog, (
+        'id', 'user_id', 'action', 'resource', 'details', 'ip_address', 'user_agent', 'created_at'
+    )),
+    'risk_assessments': (RiskAssessment, (
+        'id', 'user_id', 'risk_score', 'risk_factors', 'assessed_by', 'created_at'
+    )),
+}
+
+FORMATS = ('ndjson', 'csv')
+REPORT_ID = re.compile(r'[0-9a-f]{32}')
+
+
+def _json_default(value):
+    # Amounts keep their exact decimal text in compliance exports
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Cannot serialize {type(value).__name__}')
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class ReportingGenerator:
+    """Stream compliance exports with server-side cursors in constant memory"""
+
+    def __init__(self, yield_per=1000, export_dir=None):
+        self.yield_per = yield_per
+        self.export_dir = export_dir
+        self.app = None
+
+    def init_app(self, app):
+        """Bind to an application and read export settings"""
+        self.app = app
+        self.yield_per = app.config.get('REPORT_YIELD_PER', self.yield_per)
+        self.export_dir = app.config.get('REPORT_EXPORT_DIR') or os.path.join(app.instance_path, 'exports')
+        app.extensions['reporting_generator'] = self
+
+    def build_query(self, kind, start=None, end=None, user_id=None):
+        """Select the export columns with date-range and user filters, oldest first"""
+        if kind not in EXPORTS:
+            raise ValueError(f'Unknown export: {kind}')
+        model, columns = EXPORTS[kind]
+
+        query = select(*[getattr(model, name) for name in columns])
+        if start is not None:
+            query = query.where(model.created_at >= start)
+        if end is not None:
+            query = query.where(model.created_at < end)
+        if user_id is not None:
+            query = query.where(model.user_id == user_id)
+        if start is None and end is None and user_id is None:
+            return query.order_by(model.id)
+        # Filtered exports walk the created_at indexes in order instead of sorting the range
+        return query.order_by(model.created_at, model.id)
+
+    def iter_rows(self, kind, **filters):
+        """Yield row tuples from a server-side cursor on the replica if configured, yield_per rows at a time"""
+        query = self.build_query(kind, **filters)
+        with read_engine().connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=self.yield_per).execute(query)
+            for partition in result.partitions():
+                yield from partition
+
+    def iter_ndjson(self, kind, **filters):
+        """Yield NDJSON text in chunks of yield_per rows"""
+        columns = EXPORTS[kind][1]
+        buffer = []
+        for row in self.iter_rows(kind, **filters):
+            buffer.append(json.dumps(dict(zip(columns, row)), default=_json_default, separators=(',', ':')))
+            if len(buffer) >= self.yield_per:
+                yield '\n'.join(buffer) + '\n'
+                buffer = []
+        if buffer:
+            yield '\n'.join(buffer) + '\n'
+
+    def iter_csv(self, kind, **filters):
+        """Yield CSV text, header first, in chunks of yield_per rows"""
+        columns = EXPORTS[kind][1]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+
+        pending = 0
+        for row in self.iter_rows(kind, **filters):
+            writer.writerow([_csv_value(value) for value in row])
+            pending += 1
+            if pending >= self.yield_per:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        yield buffer.getvalue()
+
+    def iter_format(self, kind, fmt, **filters):
+        """Dispatch to the NDJSON or CSV stream"""
+        if fmt not in FORMATS:
+            raise ValueError(f'Unknown format: {fmt}')
+        stream = self.iter_ndjson if fmt == 'ndjson' else self.iter_csv
+        return stream(kind, **filters)
+
+    def export_path(self, report_id, fmt):
+        """Final location of a finished export"""
+        return os.path.join(self.export_dir, f'{report_id}.{fmt}.gz')
+
+    def export_to_file(self, report_id, kind, fmt, **filters):
+        """Write a gzip-compressed export, then notify compliance listeners"""
+        os.makedirs(self.export_dir, exist_ok=True)
+        path = self.export_path(report_id, fmt)
+        partial = f'{path}.part'
+        # A retried job starts over; the report is running again, not failed
+        if os.path.exists(f'{path}.failed'):
+            os.remove(f'{path}.failed')
+
+        try:
+            with open(partial, 'wb') as raw:
+                # An empty member name keeps the temporary .part suffix out of the gzip header
+                with gzip.GzipFile(filename='', mode='wb', fileobj=raw) as compressed:
+                    with io.TextIOWrapper(compressed, encoding='utf-8', newline='') as handle:
+                        for chunk in self.iter_format(kind, fmt, **filters):
+                            handle.write(chunk)
+            os.replace(partial, path)
+            status = 'completed'
+        except Exception as e:
+            logging.error(f"Report export error: {str(e)}")
+            if not job_queue.last_attempt():
+                # The queue retries the job; the report stays running until then
+                open(partial, 'w').close()
+                raise
+            if os.path.exists(partial):
+                os.remove(partial)
+            with open(f'{path}.failed', 'w') as marker:
+                marker.write(str(e))
+            status = 'failed'
+
+        try:
+            notify_compliance_report(report_id, status)
+        except Exception as e:
+            logging.error(f"Report notification error: {str(e)}")
+        return path if status == 'completed' else None
+
+    def start_export(self, kind, fmt, requested_by=None, idempotency_key=None, **filters):
+        """Queue export_to_file for the job workers and return the report id and its job"""
+        self.build_query(kind, **filters)
+        if fmt not in FORMATS:
+            raise ValueError(f'Unknown format: {fmt}')
+        report_id = uuid.uuid4().hex
+
+        # Mark the export as running before it is queued so status is never unknown
+        os.makedirs(self.export_dir, exist_ok=True)
+        marker = f'{self.export_path(report_id, fmt)}.part'
+        open(marker, 'w').close()
+
+        job = job_queue.enqueue(
+            'reports.export',
+            {'report_id': report_id, 'kind': kind, 'fmt': fmt, 'filters': filters},
+            idempotency_key=idempotency_key,
+            user_id=requested_by
+        )
+        if job['args']['report_id'] != report_id:
+            # A repeated request; the export queued the first time answers it
+            os.remove(marker)
+        return job['args']['report_id'], job
+
+    def abandon_export(self, report_id, fmt, reason):
+        """Mark an export failed whose job ended without writing it, so it does not stay running"""
+        path = self.export_path(report_id, fmt)
+        if os.path.exists(path) or os.path.exists(f'{path}.failed'):
+            return
+        if os.path.exists(f'{path}.part'):
+            os.remove(f'{path}.part')
+        with open(f'{path}.failed', 'w') as marker:
+            marker.write(reason)
+        try:
+            notify_compliance_report(report_id, 'failed')
+        except Exception as e:
+            logging.error(f"Report notification error: {str(e)}")
+
+    def export_status(self, report_id, fmt):
+        """Report status derived from the files on disk, so any worker can answer"""
+        if not REPORT_ID.fullmatch(report_id) or fmt not in FORMATS:
+            return None
+        path = self.export_path(report_id, fmt)
+        if os.path.exists(path):
+            return 'completed'
+        if os.path.exists(f'{path}.failed'):
+            return 'failed'
+        if os.path.exists(f'{path}.part'):
+            return 'running'
+        return None
+
+
+# Create global instance
+reporting_generator = ReportingGenerator()
+
+
+def abandon_export(job):
+    """Job hook: settle an export whose job was cancelled or failed without finishing it"""
+    reason = 'Cancelled' if job['status'] == 'cancelled' else job['error'] or 'Failed'
+    reporting_generator.abandon_export(job['args']['report_id'], job['args']['fmt'], reason)
+
+
+@job_queue.task('reports.export', priority='low', max_attempts=3, on_abandon=abandon_export)
+def run_export(report_id, kind, fmt, filters):
+    """Job: write one offline export"""
+    for key in ('start', 'end'):
+        if filters.get(key):
+            filters[key] = datetime.fromisoformat(filters[key])
+    if reporting_generator.export_to_file(report_id, kind, fmt, **filters) is None:
+        raise PermanentFailure(f'Export {report_id} failed')
+    return {'report_id': report_id, 'format': fmt}
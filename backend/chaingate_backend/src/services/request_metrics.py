@@ -0,0 +1,400 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, got_request_exception, request
+from sqlalchemy import event
+from ..database import db
+from .sampling_profiler import SamplingProfiler
+
+PREFIX = 'chaingate_'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# name -> (type, help, label names, buckets for histograms)
+FAMILIES = {
+    'http_requests_total': (
+        'counter', 'Requests served', ('endpoint', 'method', 'status'), None),
+    'http_request_duration_seconds': (
+        'histogram', 'Time from first hook to response, excluding streamed bodies', ('endpoint', 'method'), LATENCY_BUCKETS),
+    'http_response_size_bytes': (
+        'summary', 'Response body size', ('endpoint',), None),
+    'http_request_sql_statements': (
+        'histogram', 'SQL statements executed per request', ('endpoint',), SQL_COUNT_BUCKETS),
+    'http_exceptions_total': (
+        'counter', 'Exceptions that escaped a view', ('endpoint', 'exception'), None),
+    'sql_statements_total': (
+        'counter', 'SQL statements executed', ('endpoint',), None),
+    'sql_duration_seconds_total': (
+        'counter', 'Time spent executing SQL statements', ('endpoint',), None),
+    'db_pool_checkout_wait_seconds': (
+        'histogram', 'Time to obtain a pooled connection, including any new connect', ('endpoint',), POOL_WAIT_BUCKETS),
+    'log_errors_total': (
+        'counter', 'Records logged at ERROR or above', ('endpoint',), None),
+    'http_requests_in_flight': (
+        'gauge', 'Requests currently being handled', (), None),
+    'db_pool_checked_out': (
+        'gauge', 'Connections currently checked out of the pool', ('bind',), None),
+}
+
+# Work outside a request, e.g. pipeline flushers and pollers
+BACKGROUND = '(background)'
+
+
+class RequestMetrics:
+    """Per-endpoint latency, SQL and pool metrics served in Prometheus text format"""
+
+    def __init__(self, shared_dir=None, flush_interval=1.0):
+        self.shared_dir = shared_dir
+        self.flush_interval = flush_interval
+        self.profiler = None
+        self.app = None
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._series = {}
+        self._engines = {}
+        self._in_flight = 0
+        self._flushed_at = 0.0
+        self._log_handler = None
+
+    def init_app(self, app):
+        """Bind to an application, instrument its engines and serve /metrics"""
+        self.app = app
+        app.extensions['request_metrics'] = self
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+
+        self.shared_dir = app.config.get('METRICS_DIR', self.shared_dir)
+        self.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', self.flush_interval)
+        if app.config.get('PROFILER_ENABLED') and _green_threads():
+            # Greenlets share one OS thread, so per-thread stacks would mix requests
+            logging.warning("Sampling profiler disabled: not supported under gevent")
+        elif app.config.get('PROFILER_ENABLED'):
+            self.profiler = SamplingProfiler(
+                interval=app.config.get('PROFILER_INTERVAL', 0.005),
+                slow_ms=app.config.get('PROFILER_SLOW_MS', 500),
+                output_dir=app.config.get('PROFILER_DIR') or os.path.join(tempfile.gettempdir(), 'chaingate-profiles'),
+            )
+
+        self._engines = {}
+        with app.app_context():
+            for key, engine in db.engines.items():
+                self._instrument(key or 'default', engine)
+
+        if self._log_handler is None:
+            self._log_handler = _ErrorCounter(self)
+            logging.getLogger().addHandler(self._log_handler)
+
+        # Registered before the other extensions, so these hooks see the whole request
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        got_request_exception.connect(self._on_exception, app)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def metrics_view(self):
+        """Prometheus scrape endpoint"""
+        return Response(self.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    def render(self):
+        """Prometheus text exposition of every worker's series"""
+        series = self._collect()
+        lines = []
+        for name, (kind, help_text, label_names, buckets) in FAMILIES.items():
+            entries = sorted((labels, value) for (family, labels), value in series.items() if family == name)
+            if not entries:
+                continue
+            lines.append(f'# HELP {PREFIX}{name} {help_text}')
+            lines.append(f'# TYPE {PREFIX}{name} {kind}')
+            for labels, value in entries:
+                pairs = list(zip(label_names, labels))
+                if kind == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(buckets + (float('inf'),), value):
+                        cumulative += count
+                        lines.append(f'{PREFIX}{name}_bucket{_labels(pairs + [("le", _number(bound))])} {cumulative}')
+                    lines.append(f'{PREFIX}{name}_sum{_labels(pairs)} {_number(value[-2])}')
+                    lines.append(f'{PREFIX}{name}_count{_labels(pairs)} {value[-1]}')
+                elif kind == 'summary':
+                    lines.append(f'{PREFIX}{name}_sum{_labels(pairs)} {_number(value[0])}')
+                    lines.append(f'{PREFIX}{name}_count{_labels(pairs)} {value[1]}')
+                else:
+                    lines.append(f'{PREFIX}{name}{_labels(pairs)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def stats(self):
+        """Return request and SQL totals for this worker"""
+        with self._lock:
+            series = dict(self._series)
+        totals = {}
+        for (family, _), value in series.items():
+            totals[family] = totals.get(family, 0) + (value if not isinstance(value, list) else value[-1])
+        return {
+            'requests': totals.get('http_requests_total', 0),
+            'in_flight': self._in_flight,
+            'sql_statements': totals.get('sql_statements_total', 0),
+            'exceptions': totals.get('http_exceptions_total', 0),
+            'logged_errors': totals.get('log_errors_total', 0),
+            'profiler': self.profiler.stats() if self.profiler else None,
+        }
+
+    def _instrument(self, bind, engine):
+        if bind in self._engines and self._engines[bind] is engine:
+            return
+        self._engines[bind] = engine
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._time_checkouts(engine.pool)
+
+    def _time_checkouts(self, pool):
+        # Wrap the pool's blocking get; dispose() builds a new pool, which is wrapped again on the next request
+        do_get = pool._do_get
+
+        def timed_do_get():
+            start = time.perf_counter()
+            try:
+                return do_get()
+            finally:
+                self._observe_checkout(time.perf_counter() - start)
+
+        pool._do_get = timed_do_get
+        pool._checkout_timed = True
+
+    def _before_request(self):
+        for engine in self._engines.values():
+            if not getattr(engine.pool, '_checkout_timed', False):
+                self._time_checkouts(engine.pool)
+
+        local = self._local
+        local.endpoint = request.endpoint or 'unmatched'
+        local.active = True
+        local.statements = 0
+        local.sql_seconds = 0.0
+        local.pool_waits = []
+        local.start = time.perf_counter()
+        with self._lock:
+            self._in_flight += 1
+        if self.profiler:
+            self.profiler.begin(local.endpoint)
+
+    def _after_request(self, response):
+        local = self._local
+        if not getattr(local, 'active', False):
+            return response
+        elapsed = time.perf_counter() - local.start
+        local.active = False
+        endpoint = local.endpoint
+
+        size = response.content_length
+        if size is None and response.is_streamed and not response.direct_passthrough:
+            response.response = self._count_stream(response.response, endpoint)
+
+        with self._lock:
+            self._in_flight -= 1
+            self._add(('http_requests_total', (endpoint, request.method, str(response.status_code))), 1)
+            self._observe(('http_request_duration_seconds', (endpoint, request.method)), LATENCY_BUCKETS, elapsed)
+            self._observe(('http_request_sql_statements', (endpoint,)), SQL_COUNT_BUCKETS, local.statements)
+            if local.statements:
+                self._add(('sql_statements_total', (endpoint,)), local.statements)
+                self._add(('sql_duration_seconds_total', (endpoint,)), local.sql_seconds)
+            for wait in local.pool_waits:
+                self._observe(('db_pool_checkout_wait_seconds', (endpoint,)), POOL_WAIT_BUCKETS, wait)
+            if size is not None:
+                self._add_pair(('http_response_size_bytes', (endpoint,)), size)
+
+        if self.profiler:
+            path = self.profiler.end(elapsed)
+            if path:
+                logging.warning(f"Slow request {endpoint} took {elapsed * 1000:.0f}ms, stacks written to {path}")
+        if self.shared_dir and time.monotonic() - self._flushed_at >= self.flush_interval:
+            self._flush()
+        return response
+
+    def _teardown_request(self, exc):
+        local = self._local
+        if getattr(local, 'active', False):
+            # after_request never ran, e.g. the response could not be built
+            local.active = False
+            with self._lock:
+                self._in_flight -= 1
+            if self.profiler:
+                self.profiler.end(0)
+        local.endpoint = None
+
+    def _on_exception(self, sender, exception, **extra):
+        endpoint = getattr(self._local, 'endpoint', None) or 'unmatched'
+        with self._lock:
+            self._add(('http_exceptions_total', (endpoint, type(exception).__name__)), 1)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.sql_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        local = self._local
+        elapsed = time.perf_counter() - getattr(local, 'sql_start', time.perf_counter())
+        if getattr(local, 'active', False):
+            # Accumulated without locking and folded in once the request completes
+            local.statements += 1
+            local.sql_seconds += elapsed
+            return
+        endpoint = getattr(local, 'endpoint', None) or BACKGROUND
+        with self._lock:
+            self._add(('sql_statements_total', (endpoint,)), 1)
+            self._add(('sql_duration_seconds_total', (endpoint,)), elapsed)
+
+    def _observe_checkout(self, wait):
+        local = self._local
+        if getattr(local, 'active', False):
+            local.pool_waits.append(wait)
+            return
+        endpoint = getattr(local, 'endpoint', None) or BACKGROUND
+        with self._lock:
+            self._observe(('db_pool_checkout_wait_seconds', (endpoint,)), POOL_WAIT_BUCKETS, wait)
+
+    def _count_errors(self):
+        endpoint = getattr(self._local, 'endpoint', None) or BACKGROUND
+        with self._lock:
+            self._add(('log_errors_total', (endpoint,)), 1)
+
+    def _count_stream(self, chunks, endpoint):
+        size = 0
+        try:
+            for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        finally:
+            with self._lock:
+                self._add_pair(('http_response_size_bytes', (endpoint,)), size)
+
+    def _add(self, key, amount):
+        self._series[key] = self._series.get(key, 0) + amount
+
+    def _add_pair(self, key, amount):
+        pair = self._series.get(key)
+        if pair is None:
+            pair = self._series[key] = [0, 0]
+        pair[0] += amount
+        pair[1] += 1
+
+    def _observe(self, key, buckets, value):
+        # Bucket counts, then sum and count; rendered cumulatively
+        histogram = self._series.get(key)
+        if histogram is None:
+            histogram = self._series[key] = [0] * (len(buckets) + 3)
+        histogram[bisect_left(buckets, value)] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+    def _snapshot(self):
+        with self._lock:
+            series = {key: list(value) if isinstance(value, list) else value for key, value in self._series.items()}
+            series[('http_requests_in_flight', ())] = self._in_flight
+        for bind, engine in self._engines.items():
+            checkedout = getattr(engine.pool, 'checkedout', None)
+            if checkedout:
+                series[('db_pool_checked_out', (bind,))] = checkedout()
+        return series
+
+    def _collect(self):
+        series = self._snapshot()
+        if not self.shared_dir:
+            return series
+        self._flush(series)
+        merged = {}
+        for name in os.listdir(self.shared_dir):
+            if not (name.startswith('metrics-') and name.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(self.shared_dir, name)) as handle:
+                    snapshot = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            # Counters of exited workers still count; their gauges do not
+            live = _alive(snapshot['pid'])
+            for family, labels, value in snapshot['series']:
+                if FAMILIES[family][0] == 'gauge' and not live:
+                    continue
+                key = (family, tuple(labels))
+                if isinstance(value, list):
+                    current = merged.setdefault(key, [0] * len(value))
+                    for i, item in enumerate(value):
+                        current[i] += item
+                else:
+                    merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def _flush(self, series=None):
+        # Each worker rewrites its own file atomically; readers merge them all
+        series = self._snapshot() if series is None else series
+        self._flushed_at = time.monotonic()
+        try:
+            os.makedirs(self.shared_dir, exist_ok=True)
+            path = os.path.join(self.shared_dir, f'metrics-{os.getpid()}.json')
+            temporary = f'{path}.tmp'
+            with open(temporary, 'w') as handle:
+                json.dump({
+                    'pid': os.getpid(),
+                    'series': [[family, list(labels), value] for (family, labels), value in series.items()],
+                }, handle)
+            os.replace(temporary, path)
+        except OSError as e:
+            logging.warning(f"Metrics flush error: {str(e)}")
+
+
+class _ErrorCounter(logging.Handler):
+    """Counts ERROR records against the endpoint that logged them"""
+
+    def __init__(self, metrics):
+        super().__init__(level=logging.ERROR)
+        self.metrics = metrics
+
+    def emit(self, record):
+        self.metrics._count_errors()
+
+
+def _alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _green_threads():
+    # True when gevent has replaced threading, as in the gunicorn socket workers
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+# Create global instance
+request_metrics = RequestMetrics()
@@ -0,0 +1,299 @@
+import json
+import logging
+import threading
+import time
+import numpy as np
+from sqlalchemy import bindparam, case, insert, select, update
+from ..database import db
+from ..models.user import Transaction, RiskAssessment, SystemSetting
+from .dashboard_stats import dashboard_stats
+
+# System setting row whose lock serializes scorers
+LOCK_KEY = 'risk_engine_lock'
+
+# Weights of each feature component in the 0-100 score
+WEIGHTS = {
+    'amount_zscore': 0.35,
+    'withdrawal_ratio': 0.25,
+    'velocity': 0.20,
+    'address_reuse': 0.20,
+}
+
+# SQL Server caps a statement at 2100 parameters
+IN_CHUNK = 1000
+
+
+def score_features(user_ids, is_withdrawal, amounts, times, addresses, history=None):
+    """Compute per-transaction features and scores for a whole batch with array operations"""
+    n = len(user_ids)
+    users, inverse = np.unique(user_ids, return_inverse=True)
+    k = len(users)
+
+    history = history or {}
+    hist_count = history.get('count', np.zeros(k))
+    hist_sum = history.get('sum', np.zeros(k))
+    hist_sumsq = history.get('sumsq', np.zeros(k))
+    hist_deposits = history.get('deposits', np.zeros(k))
+    hist_withdrawals = history.get('withdrawals', np.zeros(k))
+    hist_last = history.get('last_time', np.full(k, np.nan))
+
+    # Amount z-score against each user's full history including this batch
+    count = hist_count + np.bincount(inverse, minlength=k)
+    total = hist_sum + np.bincount(inverse, weights=amounts, minlength=k)
+    total_sq = hist_sumsq + np.bincount(inverse, weights=amounts * amounts, minlength=k)
+    mean = total / np.maximum(count, 1)
+    std = np.sqrt(np.maximum(total_sq / np.maximum(count, 1) - mean * mean, 1e-18))
+    zscore = np.where(count[inverse] > 1, (amounts - mean[inverse]) / std[inverse], 0.0)
+
+    # Withdrawn versus deposited volume per user
+    withdrawals = hist_withdrawals + np.bincount(inverse, weights=amounts * is_withdrawal, minlength=k)
+    deposits = hist_deposits + np.bincount(inverse, weights=amounts * ~is_withdrawal, minlength=k)
+    ratio = withdrawals / np.maximum(deposits, 1e-8)
+
+    # Seconds since the same user's previous transaction
+    order = np.lexsort((times, inverse))
+    sorted_users = inverse[order]
+    sorted_times = times[order]
+    previous = np.empty(n)
+    previous[0:1] = np.nan
+    previous[1:] = sorted_times[:-1]
+    first_of_user = np.ones(n, dtype=bool)
+    first_of_user[1:] = sorted_users[1:] != sorted_users[:-1]
+    previous[first_of_user] = hist_last[sorted_users[first_of_user]]
+    since_last = np.empty(n)
+    since_last[order] = sorted_times - previous
+    since_last = np.where(np.isnan(since_last), np.inf, np.maximum(since_last, 0.0))
+
+    # Distinct other users sending to the same address in this batch
+    reuse = np.zeros(n)
+    has_address = addresses != ''
+    if has_address.any():
+        address_codes = np.unique(addresses[has_address], return_inverse=True)[1]
+        pairs = np.unique(np.stack([address_codes, inverse[has_address]]), axis=1)
+        users_per_address = np.bincount(pairs[0])
+        reuse[has_address] = users_per_address[address_codes] - 1
+
+    components = {
+        'amount_zscore': np.clip(zscore / 4.0, 0.0, 1.0),
+        'withdrawal_ratio': np.clip((ratio[inverse] - 1.0) / 4.0, 0.0, 1.0),
+        'velocity': np.exp(-since_last / 300.0),
+        'address_reuse': np.clip(reuse / 3.0, 0.0, 1.0),
+    }
+    score = sum(WEIGHTS[name] * component for name, component in components.items()) * 100.0
+
+    return {
+        'users': users,
+        'inverse': inverse,
+        'score': np.round(score, 2),
+        'zscore': zscore,
+        'ratio': ratio,
+        'since_last': since_last,
+        'reuse': reuse,
+    }
+
+
+class RiskEngine:
+    """Score unscored transactions in columnar batches and record per-user assessments"""
+
+    def __init__(self, batch_size=50000, flag_threshold=75.0):
+        self.batch_size = batch_size
+        self.flag_threshold = flag_threshold
+        self.app = None
+
+        # Counters exposed through stats()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._scored = 0
+        self._flagged = 0
+        self._last_rate = 0.0
+
+    def init_app(self, app):
+        """Bind to an application and read scoring settings"""
+        self.app = app
+        self.batch_size = app.config.get('RISK_BATCH_SIZE', self.batch_size)
+        self.flag_threshold = app.config.get('RISK_FLAG_THRESHOLD', self.flag_threshold)
+        app.extensions['risk_engine'] = self
+
+        @app.cli.command('score-risk')
+        def score_risk():
+            """Score every transaction added since the last run"""
+            print(self.run_until_idle())
+
+    def run_until_idle(self):
+        """Score batches until no unscored transactions remain"""
+        totals = {'scored': 0, 'flagged': 0, 'assessments': 0}
+        while True:
+            result = self.run_batch()
+            for key in totals:
+                totals[key] += result[key]
+            if result['scored'] < self.batch_size:
+                return totals
+
+    def stats(self):
+        """Return scoring counters"""
+        with self._lock:
+            return {
+                'batches': self._batches,
+                'scored': self._scored,
+                'flagged': self._flagged,
+                'last_batch_per_second': round(self._last_rate, 1),
+            }
+
+    def run_batch(self):
+        """Score the next batch of unscored transactions in one transaction"""
+        started = time.perf_counter()
+        try:
+            self._lock_scorer()
+            # An unscored marker rather than an id mark: IDENTITY ids become visible at
+            # commit, so a lower id can appear after a higher one was already scored
+            rows = db.session.execute(
+                select(
+                    Transaction.id, Transaction.user_id, Transaction.type, Transaction.amount,
+                    Transaction.to_address, Transaction.created_at, Transaction.flagged
+                )
+                .where(Transaction.unscored())
+                .order_by(Transaction.id)
+                .limit(self.batch_size)
+            ).all()
+            if not rows:
+                db.session.rollback()
+                return {'scored': 0, 'flagged': 0, 'assessments': 0}
+
+            ids, user_ids, types, amounts, addresses, created, flagged = zip(*rows)
+            ids = np.array(ids, dtype=np.int64)
+            user_ids = np.array(user_ids, dtype=np.int64)
+            is_withdrawal = np.array(types, dtype=object) == 'withdrawal'
+            amounts = np.array(amounts, dtype=np.float64)
+            addresses = np.array([address or '' for address in addresses], dtype=str)
+            times = np.array(created, dtype='datetime64[us]').astype(np.int64) / 1e6
+            was_flagged = np.array(flagged, dtype=bool)
+
+            users = np.unique(user_ids)
+            history = self._history(users)
+            features = score_features(user_ids, is_withdrawal, amounts, times, addresses, history)
+
+            score = features['score']
+            now_flagged = was_flagged | (score >= self.flag_threshold)
+
+            # Bulk write-back as a single executemany
+            table = Transaction.__table__
+            db.session.execute(
+                update(table)
+                .where(table.c.id == bindparam('b_id'))
+                .values(risk_score=bindparam('b_score'), flagged=bindparam('b_flagged')),
+                [
+                    {'b_id': int(i), 'b_score': float(s), 'b_flagged': bool(f)}
+                    for i, s, f in zip(ids, score, now_flagged)
+                ]
+            )
+            newly_flagged = int(np.count_nonzero(now_flagged & ~was_flagged))
+            dashboard_stats.adjust(db.session, 'flagged_transactions', newly_flagged)
+
+            assessments = self._assessments(features, now_flagged)
+            db.session.execute(insert(RiskAssessment.__table__), assessments)
+
+            db.session.commit()
+
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._batches += 1
+                self._scored += len(ids)
+                self._flagged += newly_flagged
+                self._last_rate = len(ids) / elapsed if elapsed else 0.0
+            return {'scored': len(ids), 'flagged': newly_flagged, 'assessments': len(assessments)}
+
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Risk scoring error: {str(e)}")
+            raise
+
+    def _lock_scorer(self):
+        table = SystemSetting.__table__
+        # The UPDATE locks the row so two scorers cannot take the same batch
+        locked = db.session.execute(
+            update(table).where(table.c.key == LOCK_KEY).values(updated_at=db.func.now())
+        ).rowcount
+        if not locked:
+            db.session.execute(insert(table).values(
+                key=LOCK_KEY,
+                value='',
+                description='Held by the risk engine while it scores a batch'
+            ))
+
+    def _history(self, users):
+        k = len(users)
+        history = {
+            'count': np.zeros(k),
+            'sum': np.zeros(k),
+            'sumsq': np.zeros(k),
+            'deposits': np.zeros(k),
+            'withdrawals': np.zeros(k),
+            'last_time': np.full(k, np.nan),
+        }
+        amount = Transaction.amount
+        withdrawal = Transaction.type == 'withdrawal'
+        for start in range(0, k, IN_CHUNK):
+            chunk = users[start:start + IN_CHUNK]
+            rows = db.session.execute(
+                select(
+                    Transaction.user_id,
+                    db.func.count(),
+                    db.func.sum(amount),
+                    db.func.sum(amount * amount),
+                    db.func.sum(case((withdrawal, 0), else_=amount)),
+                    db.func.sum(case((withdrawal, amount), else_=0)),
+                    db.func.max(Transaction.created_at)
+                )
+                .where(Transaction.user_id.in_([int(user) for user in chunk]))
+                .where(Transaction.risk_score.isnot(None))
+                .group_by(Transaction.user_id)
+            ).all()
+            if not rows:
+                continue
+
+            user_ids, counts, sums, sumsqs, deposits, withdrawals, last_times = zip(*rows)
+            positions = np.searchsorted(users, np.array(user_ids, dtype=np.int64))
+            history['count'][positions] = counts
+            history['sum'][positions] = np.array(sums, dtype=np.float64)
+            history['sumsq'][positions] = np.array(sumsqs, dtype=np.float64)
+            history['deposits'][positions] = np.array(deposits, dtype=np.float64)
+            history['withdrawals'][positions] = np.array(withdrawals, dtype=np.float64)
+            history['last_time'][positions] = np.array(last_times, dtype='datetime64[us]').astype(np.int64) / 1e6
+        return history
+
+    def _assessments(self, features, flagged):
+        inverse = features['inverse']
+        k = len(features['users'])
+        counts = np.bincount(inverse, minlength=k)
+
+        # Per-user maxima via an unbuffered scatter
+        max_score = np.zeros(k)
+        np.maximum.at(max_score, inverse, features['score'])
+        max_zscore = np.full(k, -np.inf)
+        np.maximum.at(max_zscore, inverse, features['zscore'])
+        max_reuse = np.zeros(k)
+        np.maximum.at(max_reuse, inverse, features['reuse'])
+        min_gap = np.full(k, np.inf)
+        np.minimum.at(min_gap, inverse, features['since_last'])
+        flagged_count = np.bincount(inverse, weights=flagged, minlength=k)
+
+        return [
+            {
+                'user_id': int(user),
+                'risk_score': round(float(max_score[i]), 2),
+                'risk_factors': json.dumps({
+                    'transactions': int(counts[i]),
+                    'flagged': int(flagged_count[i]),
+                    'max_amount_zscore': round(float(max_zscore[i]), 3),
+                    'withdrawal_ratio': round(float(features['ratio'][i]), 3),
+                    'min_seconds_between': None if np.isinf(min_gap[i]) else round(float(min_gap[i]), 1),
+                    'address_reuse': int(max_reuse[i]),
+                }),
+                'assessed_by': None,
+            }
+            for i, user in enumerate(features['users'])
+        ]
+
+
+# Create global instance
+risk_engine = RiskEngine()
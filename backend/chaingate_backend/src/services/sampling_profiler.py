@@ -0,0 +1,118 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """Samples the stacks of in-flight requests and writes collapsed stacks for slow ones"""
+
+    def __init__(self, interval=0.005, slow_ms=500, output_dir=None, max_depth=64, max_files=500):
+        self.interval = interval
+        self.slow_ms = slow_ms
+        self.output_dir = output_dir
+        self.max_depth = max_depth
+        self.max_files = max_files
+
+        self._lock = threading.Lock()
+        self._active = {}
+        self._thread = None
+        self._pid = None
+
+        # Counters exposed through stats()
+        self._samples = 0
+        self._dumps = 0
+        self._errors = 0
+
+    def begin(self, label):
+        """Start collecting samples for the calling thread"""
+        self._ensure_thread()
+        with self._lock:
+            self._active[threading.get_ident()] = (label, Counter())
+
+    def end(self, elapsed):
+        """Stop sampling the calling thread and dump its stacks if the request was slow"""
+        with self._lock:
+            entry = self._active.pop(threading.get_ident(), None)
+        if entry is None or elapsed * 1000 < self.slow_ms:
+            return None
+        label, stacks = entry
+        if not stacks:
+            return None
+        return self._dump(label, elapsed, stacks)
+
+    def stats(self):
+        """Return sampling counters"""
+        return {
+            'active': len(self._active),
+            'samples': self._samples,
+            'dumps': self._dumps,
+            'errors': self._errors,
+        }
+
+    def _ensure_thread(self):
+        # Threads do not survive fork, so each worker starts its own sampler
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._active = {}
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            if not self._active:
+                continue
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, (_, stacks) in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        stacks[self._collapse(frame)] += 1
+                        self._samples += 1
+
+    def _collapse(self, frame):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({_short_path(code.co_filename)}:{frame.f_lineno})')
+            frame = frame.f_back
+        # Collapsed format lists frames root first, separated by semicolons
+        return ';'.join(reversed(names))
+
+    def _dump(self, label, elapsed, stacks):
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            if self.max_files and len(os.listdir(self.output_dir)) >= self.max_files:
+                return None
+            name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{_safe_name(label)}-{int(elapsed * 1000)}ms.folded"
+            path = os.path.join(self.output_dir, name)
+            with open(path, 'w') as handle:
+                for stack, count in stacks.most_common():
+                    handle.write(f'{stack} {count}\n')
+            self._dumps += 1
+            return path
+        except Exception as e:
+            self._errors += 1
+            logging.error(f"Profiler dump error: {str(e)}")
+            return None
+
+
+def _short_path(filename):
+    # Keep paths readable in flame graphs: package-relative where possible
+    for marker in (f'{os.sep}site-packages{os.sep}', f'{os.sep}src{os.sep}'):
+        index = filename.rfind(marker)
+        if index >= 0:
+            return filename[index + len(marker):]
+    return os.path.basename(filename)
+
+
+def _safe_name(label):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', label)[:80]
@@ -0,0 +1,197 @@
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+import numpy as np
+from .compliance_checker import compliance_checker
+from .notification_service import notify_risk_alert
+
+# One fixed-size record per tracked user; *_0 is the current window bucket, *_1 the previous one
+RECORD = np.dtype([
+    ('user_id', '<i8'),
+    ('last_seen', '<i8'),
+    ('bucket', '<i8'),
+    ('count_0', '<u4'),
+    ('count_1', '<u4'),
+    ('near_0', '<u4'),
+    ('near_1', '<u4'),
+])
+
+LAYOUT_VERSION = 2
+ALERT_SCORES = {'velocity': 60, 'structuring': 85}
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+class TransactionMonitor:
+    """Per-user sliding-window velocity and structuring checks in a fixed-size shared table"""
+
+    def __init__(self, max_users=1000000, ways=8, window=600, velocity_limit=10,
+                 structuring_count=3, structuring_margin=0.1):
+        self.max_users = max_users
+        self.ways = ways
+        self.window = window
+        self.velocity_limit = velocity_limit
+        self.structuring_count = structuring_count
+        self.structuring_margin = structuring_margin
+        self.state_path = None
+
+        self._lock = threading.Lock()
+        self._table = None
+        self._mmap = None
+        self._fd = None
+        self._pid = None
+
+        # Counters exposed through stats()
+        self._observed = 0
+        self._evictions = 0
+        self._hits = {'velocity': 0, 'structuring': 0}
+
+    def init_app(self, app):
+        """Bind to an application and read detection settings"""
+        self.max_users = app.config.get('TXMON_MAX_USERS', self.max_users)
+        self.window = app.config.get('TXMON_WINDOW', self.window)
+        self.velocity_limit = app.config.get('TXMON_VELOCITY_LIMIT', self.velocity_limit)
+        self.structuring_count = app.config.get('TXMON_STRUCTURING_COUNT', self.structuring_count)
+        self.structuring_margin = app.config.get('TXMON_STRUCTURING_MARGIN', self.structuring_margin)
+        self.state_path = app.config.get('TXMON_STATE_FILE') or self._default_state_path(app)
+        self._table = None
+        app.extensions['transaction_monitor'] = self
+
+    @property
+    def sets(self):
+        return max(1, -(-self.max_users // self.ways))
+
+    def observe(self, user_id, tx_type, amount, now=None):
+        """Record one transaction and return the patterns it completes"""
+        now = time.time() if now is None else now
+        amount = float(amount)
+        bucket = int(now // self.window)
+        elapsed = (now - bucket * self.window) / self.window
+        near = self._near_threshold(tx_type, amount)
+
+        table = self._open()
+        set_index = ((int(user_id) * HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) % self.sets
+        with self._lock, _RecordLock(self._fd, set_index):
+            ways = table[set_index]
+            ids = ways['user_id'].tolist()
+            if user_id in ids:
+                way = ids.index(user_id)
+                _, _, last_bucket, count, count_prev, near_count, near_prev = ways[way].item()
+            else:
+                # Take the least recently seen way; empty ways have last_seen 0
+                way = int(np.argmin(ways['last_seen']))
+                if ids[way]:
+                    self._evictions += 1
+                last_bucket, count, count_prev, near_count, near_prev = bucket, 0, 0, 0, 0
+
+            # Slide the two-bucket window forward
+            if last_bucket != bucket:
+                if last_bucket == bucket - 1:
+                    count_prev, near_prev = count, near_count
+                else:
+                    count_prev, near_prev = 0, 0
+                count, near_count = 0, 0
+
+            count += 1
+            near_count += near
+            ways[way] = (user_id, int(now), bucket, count, count_prev, near_count, near_prev)
+
+        # Weight the previous bucket by its overlap with the sliding window
+        weight = 1.0 - elapsed
+        velocity = count + count_prev * weight
+        structuring = near_count + near_prev * weight
+
+        self._observed += 1
+        patterns = []
+        if velocity > self.velocity_limit:
+            patterns.append('velocity')
+        if near and structuring >= self.structuring_count:
+            patterns.append('structuring')
+        for pattern in patterns:
+            self._hits[pattern] += 1
+        return patterns
+
+    def alert(self, user_id, transaction_id, patterns):
+        """Raise a risk alert for patterns found by observe()"""
+        try:
+            notify_risk_alert(
+                user_id,
+                max(ALERT_SCORES[pattern] for pattern in patterns),
+                f"Transaction {transaction_id}: {', '.join(patterns)} pattern detected"
+            )
+        except Exception as e:
+            logging.error(f"Risk alert error: {str(e)}")
+
+    def stats(self):
+        """Return detection counters and table size"""
+        return {
+            'capacity': self.sets * self.ways,
+            'memory_bytes': self.sets * self.ways * RECORD.itemsize,
+            'observed': self._observed,
+            'evictions': self._evictions,
+            'velocity_hits': self._hits['velocity'],
+            'structuring_hits': self._hits['structuring'],
+        }
+
+    def _near_threshold(self, tx_type, amount):
+        thresholds = compliance_checker.thresholds(tx_type)
+        index = bisect_left(thresholds, amount)
+        return index < len(thresholds) and amount >= thresholds[index] * (1 - self.structuring_margin)
+
+    def _open(self):
+        # Every worker maps the same file, so state is shared on the host; reopened after fork
+        if self._table is not None and self._pid == os.getpid():
+            return self._table
+        with self._lock:
+            if self._table is not None and self._pid == os.getpid():
+                return self._table
+            size = self.sets * self.ways * RECORD.itemsize
+            fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(fd).st_size != size:
+                # A new or resized table starts empty; the file is sparse until touched
+                with _RecordLock(fd, None):
+                    if os.fstat(fd).st_size != size:
+                        os.ftruncate(fd, 0)
+                        os.ftruncate(fd, size)
+            # A plain ndarray over the mapping avoids numpy.memmap's per-index overhead
+            self._mmap = mmap.mmap(fd, size)
+            self._table = np.frombuffer(self._mmap, dtype=RECORD).reshape(self.sets, self.ways)
+            self._fd = fd
+            self._pid = os.getpid()
+            return self._table
+
+    def _default_state_path(self, app):
+        digest = hashlib.sha1(str(app.config.get('SQLALCHEMY_DATABASE_URI')).encode()).hexdigest()[:12]
+        return os.path.join(
+            tempfile.gettempdir(),
+            f'chaingate-txmon-{digest}-v{LAYOUT_VERSION}-{self.sets}x{self.ways}.bin'
+        )
+
+
+class _RecordLock:
+    """Byte-range lock on one set of the table, or the whole file"""
+
+    def __init__(self, fd, set_index):
+        self.fd = fd
+        self.set_index = set_index
+
+    def __enter__(self):
+        if self.set_index is None:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX)
+        else:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, self.set_index)
+
+    def __exit__(self, *exc):
+        if self.set_index is None:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN)
+        else:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, self.set_index)
+
+
+# Create global instance
+transaction_monitor = TransactionMonitor()
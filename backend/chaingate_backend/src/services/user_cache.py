@@ -0,0 +1,181 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from flask_login import UserMixin
+from sqlalchemy import event, select
+from sqlalchemy.orm import object_session
+from ..database import db
+from ..models.user import User
+
+# Session.info key holding the ids of users written in the open transaction
+DIRTY_KEY = 'user_cache_dirty'
+
+
+class UserPrincipal(UserMixin):
+    """Lightweight stand-in for User on authenticated requests"""
+
+    def __init__(self, id, username, email, role, kyc_status, risk_level, is_active):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.role = role
+        self.kyc_status = kyc_status
+        self.risk_level = risk_level
+        self._active = bool(is_active)
+
+    @property
+    def is_active(self):
+        return self._active
+
+    def is_admin(self):
+        """Check if user is admin"""
+        return self.role == 'admin'
+
+    def is_kyc_verified(self):
+        """Check if KYC is verified"""
+        return self.kyc_status == 'verified'
+
+
+class UserCache:
+    """Bounded TTL/LRU cache of user principals for the Flask-Login loader"""
+
+    def __init__(self, max_size=10000, ttl=30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stamp_path = None
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stamp = None
+        self._listening = False
+
+        # Counters exposed through stats()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def init_app(self, app):
+        """Bind to an application and invalidate on User writes"""
+        self.max_size = app.config.get('USER_CACHE_SIZE', self.max_size)
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+        self.stamp_path = app.config.get('USER_CACHE_STAMP_FILE') or self._default_stamp_path(app)
+        app.extensions['user_cache'] = self
+
+        if not self._listening:
+            event.listen(User, 'after_update', self._on_user_write)
+            event.listen(User, 'after_delete', self._on_user_write)
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_rollback', self._after_rollback)
+            self._listening = True
+
+    def load(self, user_id):
+        """Return a cached principal, loading it on a miss"""
+        user_id = int(user_id)
+        self._check_stamp()
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+
+        row = db.session.execute(
+            select(
+                User.id, User.username, User.email, User.role,
+                User.kyc_status, User.risk_level, User.is_active
+            ).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+
+        principal = UserPrincipal(*row)
+        with self._lock:
+            self._entries[user_id] = (principal, now + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return principal
+
+    def invalidate(self, user_id=None):
+        """Drop one user, or everyone, here and in every worker sharing the stamp file"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(int(user_id), None)
+            self._invalidations += 1
+        self._bump_stamp()
+
+    def stats(self):
+        """Return hit/miss counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._entries),
+                'capacity': self.max_size,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+            }
+
+    def _on_user_write(self, mapper, connection, target):
+        # Flushed but not committed: invalidating now would let another worker reload
+        # the old row and cache it under the new stamp, so wait for the commit
+        session = object_session(target)
+        if session is None:
+            self.invalidate(target.id)
+            return
+        session.info.setdefault(DIRTY_KEY, set()).add(target.id)
+
+    def _after_commit(self, session):
+        user_ids = session.info.pop(DIRTY_KEY, None)
+        if not user_ids:
+            return
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+            self._invalidations += len(user_ids)
+        self._bump_stamp()
+
+    def _after_rollback(self, session):
+        session.info.pop(DIRTY_KEY, None)
+
+    def _check_stamp(self):
+        # One stat() per lookup lets a write in any worker on this host flush every cache
+        try:
+            stamp = os.stat(self.stamp_path).st_mtime_ns
+        except (OSError, TypeError):
+            stamp = None
+        if stamp != self._stamp:
+            with self._lock:
+                self._entries.clear()
+                self._stamp = stamp
+
+    def _bump_stamp(self):
+        if not self.stamp_path:
+            return
+        try:
+            with open(self.stamp_path, 'a'):
+                pass
+            now = time.time_ns()
+            os.utime(self.stamp_path, ns=(now, now))
+        except OSError:
+            pass
+
+    def _default_stamp_path(self, app):
+        digest = hashlib.sha1(str(app.config.get('SQLALCHEMY_DATABASE_URI')).encode()).hexdigest()[:12]
+        return os.path.join(tempfile.gettempdir(), f'chaingate-users-{digest}.stamp')
+
+
+# Create global instance
+user_cache = UserCache()
@@ -563,6 +563,16 @@ class ChainGateApp {
             this.socket.on('compliance_report', (data) => {
                 this.handleComplianceReport(data);
             });
+            
+            // Several notifications for the same room within one flush window arrive together
+            this.socket.on('notification_batch', (messages) => {
+                const handlers = {
+                    transaction_update: (data) => this.handleTransactionUpdate(data),
+                    risk_alert: (data) => this.handleRiskAlert(data),
+                    compliance_report: (data) => this.handleComplianceReport(data)
+                };
+                messages.forEach(({ event, data }) => handlers[event] && handlers[event](data));
+            });
         }
     }
 
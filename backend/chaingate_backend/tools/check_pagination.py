@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Cursor pagination walk
+Creates transactions through the ORM against a throwaway SQLite database, so
+created_at comes from the column default exactly as it does for rows the app
+writes, then walks every cursor-paginated listing forward with next_cursor
+and back with prev_cursor. Exits non-zero unless each walk visits every row
+once, newest first, and the walk back retraces the same pages.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+PASSWORD = 'page123'
+
+# (listing, login email) pairs to walk
+LISTINGS = (
+    ('/api/player/transactions', 'player@page.local'),
+    ('/api/admin/transactions', 'admin@page.local'),
+)
+
+
+def configure_environment(db_path):
+    """Point the app at the walk database; must run before src is imported"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['RATELIMIT_ENABLED'] = 'False'
+    for flag in ('CONFIRMATION_ENGINE_ENABLED', 'STATS_RECONCILE_ENABLED',
+                 'LEDGER_SNAPSHOT_ENABLED', 'LIVE_MONITOR_ENABLED'):
+        os.environ[flag] = 'False'
+
+
+def seed(app, rows):
+    """Users and transactions written the way the app writes them: no explicit timestamps"""
+    from src.database import db
+    from src.models.user import User, Transaction
+
+    with app.app_context():
+        db.create_all()
+        admin = User(username='page_admin', email='admin@page.local', role='admin', kyc_status='verified')
+        player = User(username='page_player', email='player@page.local', role='player', kyc_status='verified')
+        for user in (admin, player):
+            user.set_password(PASSWORD)
+        db.session.add_all([admin, player])
+        db.session.commit()
+        # One commit per row, as requests do; many rows share a created_at second
+        for n in range(rows):
+            db.session.add(Transaction(user_id=player.id, type='deposit', amount=0.01, status='completed'))
+            db.session.commit()
+        return [row.id for row in Transaction.query.order_by(Transaction.id.desc())]
+
+
+def walk(client, path, per_page, expected):
+    """Problems found walking one listing forward and back"""
+    problems = []
+    forward, cursor = [], None
+    url = f'{path}?paging=cursor&per_page={per_page}'
+    for _ in range(len(expected) + 2):
+        response = client.get(url if cursor is None else f'{path}?per_page={per_page}&cursor={cursor}')
+        if response.status_code != 200:
+            return [f'{path}: status {response.status_code}']
+        body = response.get_json()
+        forward.append(([tx['id'] for tx in body['transactions']], body))
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+
+    seen = [tx_id for ids, _ in forward for tx_id in ids]
+    if seen != expected:
+        problems.append(f'{path}: forward walk returned {len(seen)} rows, {len(set(seen))} distinct, '
+                        f'expected {len(expected)} newest first')
+
+    # Back from the last page, each prev_cursor must return the page before it
+    for position in range(len(forward) - 1, 0, -1):
+        prev_cursor = forward[position][1]['prev_cursor']
+        if prev_cursor is None:
+            problems.append(f'{path}: page {position + 1} has no prev_cursor')
+            break
+        body = client.get(f'{path}?per_page={per_page}&cursor={prev_cursor}').get_json()
+        ids = [tx['id'] for tx in body['transactions']]
+        if ids != forward[position - 1][0]:
+            problems.append(f'{path}: prev_cursor of page {position + 1} returned {ids}, '
+                            f'expected {forward[position - 1][0]}')
+            break
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Walk every cursor-paginated listing forward and back')
+    parser.add_argument('--rows', type=int, default=25, help='transactions to create')
+    parser.add_argument('--per-page', type=int, default=10)
+    args = parser.parse_args()
+
+    configure_environment(os.path.join(tempfile.mkdtemp(prefix='chaingate-pages-'), 'pages.db'))
+    from src.main import create_app
+
+    app = create_app('testing')
+    expected = seed(app, args.rows)
+
+    problems = []
+    for path, email in LISTINGS:
+        client = app.test_client()
+        response = client.post('/api/auth/login', json={'email': email, 'password': PASSWORD})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        problems += walk(client, path, args.per_page, expected)
+
+    for problem in problems:
+        print(problem)
+    print(f'{len(LISTINGS)} listings, {args.rows} rows, {len(problems)} problems')
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
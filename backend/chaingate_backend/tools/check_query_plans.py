@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression checker
+Drives the hot routes and background jobs against a throwaway SQLite database
+built from the models, captures every statement they issue and explains each one
+on the target database: EXPLAIN QUERY PLAN on SQLite, SHOWPLAN_XML on SQL Server.
+Exits non-zero when a plan scans or sorts a whole table instead of using an index,
+unless the step and table are listed in EXPECTED_SCANS.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+PASSWORD = 'plan123'
+
+# Configuration tables that stay small; scanning them is fine
+SMALL_TABLES = {'compliance_rules', 'system_settings', 'id_sequences', 'stat_counters'}
+
+# (step, table) -> why a full scan or sort there is accepted
+EXPECTED_SCANS = {
+    ('GET /api/admin/transactions?page', 'transactions'):
+        'offset paging counts every row for the total; cursor paging avoids it',
+    ('dashboard_stats.reconcile', 'users'): 'periodic recount of the source tables',
+    ('dashboard_stats.reconcile', 'transactions'): 'periodic recount of the source tables',
+    ('wallet_ledger.snapshot', 'wallets'): 'periodic sweep over every wallet',
+    ('wallet_ledger.snapshot', 'wallet_snapshots'): 'periodic sweep over every wallet',
+}
+
+SHOWPLAN_NS = {'p': 'http://schemas.microsoft.com/sqlserver/2004/07/showplan'}
+MSSQL_SCANS = {'Table Scan', 'Clustered Index Scan', 'Index Scan'}
+EXPLAINED = re.compile(r'^\s*(SELECT|UPDATE|DELETE|WITH)\b', re.IGNORECASE)
+SQLITE_TABLE = re.compile(r'^(?:SCAN|SEARCH) (\w+)')
+
+
+def configure_environment(db_path):
+    """Point the app at the capture database; must run before src is imported"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['RATELIMIT_ENABLED'] = 'False'
+    for flag in ('CONFIRMATION_ENGINE_ENABLED', 'STATS_RECONCILE_ENABLED',
+                 'LEDGER_SNAPSHOT_ENABLED', 'LIVE_MONITOR_ENABLED'):
+        os.environ[flag] = 'False'
+
+
+class Capture:
+    """Record the statements each step sends to the database"""
+
+    def __init__(self):
+        self.step = None
+        self.statements = []
+
+    def install(self, engine):
+        from sqlalchemy import event
+        event.listen(engine, 'before_execute', self._clause)
+        event.listen(engine, 'before_cursor_execute', self._cursor)
+
+    def _clause(self, conn, clauseelement, multiparams, params, execution_options):
+        self._pending = (clauseelement, multiparams[0] if multiparams else params)
+
+    def _cursor(self, conn, cursor, statement, parameters, context, executemany):
+        if self.step is None or not EXPLAINED.match(statement):
+            return
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        clause, params = getattr(self, '_pending', (None, None))
+        self._pending = (None, None)
+        self.statements.append({
+            'step': self.step,
+            'statement': statement,
+            'parameters': tuple(parameters or ()),
+            'clause': clause,
+            'params': params,
+        })
+
+
+def seed(app):
+    """A handful of rows so every route has something to read"""
+    from src.database import db
+    from src.models.user import User, Wallet, Transaction, ComplianceRule
+    from src.services.dashboard_stats import dashboard_stats
+
+    with app.app_context():
+        db.create_all()
+        admin = User(username='plan_admin', email='admin@plan.local', role='admin', kyc_status='verified')
+        player = User(username='plan_player', email='player@plan.local', role='player', kyc_status='verified')
+        for user in (admin, player):
+            user.set_password(PASSWORD)
+        db.session.add_all([admin, player])
+        db.session.flush()
+        db.session.add(Wallet(user_id=player.id, address='tb1qplanplayer', balance=10))
+        db.session.add_all([
+            ComplianceRule(rule_name='Daily Deposit Limit', rule_type='deposit_limit', threshold=1),
+            ComplianceRule(rule_name='Withdrawal Limit', rule_type='withdrawal_limit', threshold=0.5),
+            ComplianceRule(rule_name='Transaction Monitoring', rule_type='transaction_monitoring', threshold=0.1),
+        ])
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        statuses = ('completed', 'completed', 'pending', 'confirmed', 'failed')
+        for n in range(60):
+            created = now - timedelta(hours=n)
+            db.session.add(Transaction(
+                user_id=player.id, type='deposit' if n % 3 else 'withdrawal', amount=0.01,
+                status=statuses[n % len(statuses)], tx_hash=f'plan_seed_{n}',
+                flagged=n % 7 == 0, created_at=created, updated_at=created
+            ))
+        db.session.commit()
+        # Deployed databases always have their counters; without them the first read recounts
+        dashboard_stats.reconcile()
+        return player.id
+
+
+def steps(app, player_id):
+    """Hot paths in the order they run: (label, callable)"""
+    from src.database import db
+    from src.services.bitcoin_simulator import confirmation_engine
+    from src.services.compliance_checker import compliance_checker
+    from src.services.dashboard_stats import dashboard_stats
+    from src.services.ledger import wallet_ledger
+    from src.services.risk_engine import risk_engine
+    from src.real_time.live_monitoring import live_monitor
+
+    player = app.test_client()
+    admin = app.test_client()
+
+    def login(client, email):
+        response = client.post('/api/auth/login', json={'email': email, 'password': PASSWORD})
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    def get(client, path):
+        def run():
+            response = client.get(path)
+            assert response.status_code == 200, f'{path}: {response.status_code}'
+            response.get_data()
+            return response
+        return run
+
+    def cursor_walk(client, path):
+        def run():
+            first = get(client, f'{path}?paging=cursor&per_page=10')().get_json()
+            get(client, f"{path}?per_page=10&cursor={first['next_cursor']}")()
+        return run
+
+    def post(client, path, body):
+        def run():
+            response = client.post(path, json=body)
+            assert response.status_code in (200, 201), f'{path}: {response.get_data(as_text=True)}'
+        return run
+
+    def in_app(function):
+        def run():
+            with app.app_context():
+                function()
+                db.session.remove()
+        return run
+
+    today = datetime.now(timezone.utc).date()
+    return [
+        ('POST /api/auth/login', lambda: (login(player, 'player@plan.local'), login(admin, 'admin@plan.local'))),
+        ('GET /api/player/dashboard', get(player, '/api/player/dashboard')),
+        ('GET /api/player/balance', get(player, '/api/player/balance')),
+        ('GET /api/player/transactions?page', get(player, '/api/player/transactions?page=3&per_page=10')),
+        ('GET /api/player/transactions?cursor', cursor_walk(player, '/api/player/transactions')),
+        ('POST /api/player/simulate_deposit', post(player, '/api/player/simulate_deposit', {'amount': 0.001})),
+        ('POST /api/player/withdraw', post(player, '/api/player/withdraw', {'amount': 0.001, 'address': 'tb1qplanout'})),
+        ('GET /api/admin/dashboard', get(admin, '/api/admin/dashboard')),
+        ('GET /api/admin/transactions?page', get(admin, '/api/admin/transactions?page=3&per_page=10')),
+        ('GET /api/admin/transactions?cursor', cursor_walk(admin, '/api/admin/transactions')),
+        ('GET /api/compliance/exports/transactions?range', get(
+            admin, f'/api/compliance/exports/transactions?start={today - timedelta(days=1)}&end={today}')),
+        ('GET /api/compliance/exports/audit_logs?user', get(
+            admin, f'/api/compliance/exports/audit_logs?user_id={player_id}&start={today - timedelta(days=1)}')),
+        ('confirmation_engine.tick', in_app(confirmation_engine.tick)),
+        ('live_monitor.poll', in_app(live_monitor.poll)),
+        ('risk_engine.run_batch', in_app(risk_engine.run_batch)),
+        ('compliance_checker.backfill', in_app(compliance_checker.backfill)),
+        ('dashboard_stats.reconcile', in_app(dashboard_stats.reconcile)),
+        ('wallet_ledger.ledger_balance', in_app(lambda: wallet_ledger.ledger_balance(db.session, 1))),
+        ('wallet_ledger.snapshot', in_app(wallet_ledger.snapshot)),
+    ]
+
+
+def explain_sqlite(connection, captured):
+    """Plan lines as (table, detail, problem) from EXPLAIN QUERY PLAN"""
+    rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + captured['statement'], captured['parameters']).all()
+    plan = []
+    for row in rows:
+        detail = row[-1]
+        match = SQLITE_TABLE.match(detail)
+        table = match.group(1) if match else None
+        statement = captured['statement']
+        problem = None
+        if detail.startswith('SCAN CONSTANT ROW'):
+            table = None
+        elif detail.startswith('SCAN ') and ' USING ' not in detail:
+            # Newest-N by primary key reads only N rows
+            if not (' LIMIT ' in statement and ' WHERE ' not in statement):
+                problem = 'full scan'
+        elif detail.startswith('SCAN ') and 'COVERING INDEX' in detail and ' LIMIT ' not in statement:
+            problem = 'full index scan'
+        elif 'USE TEMP B-TREE' in detail:
+            problem = 'sort'
+        plan.append((table, detail, problem))
+    return plan
+
+
+def explain_mssql(connection, captured):
+    """Plan operators as (table, detail, problem) from SHOWPLAN_XML; statements are compiled, not run"""
+    connection.exec_driver_sql('SET SHOWPLAN_XML ON')
+    try:
+        if captured['clause'] is not None:
+            result = connection.execute(captured['clause'], captured['params'] or {})
+        else:
+            result = connection.exec_driver_sql(captured['statement'], captured['parameters'])
+        document = ''.join(row[0] for row in result)
+    finally:
+        connection.exec_driver_sql('SET SHOWPLAN_XML OFF')
+
+    plan = []
+
+    def walk(element, limited):
+        for child in element:
+            if child.tag.endswith('}RelOp'):
+                op = child.get('PhysicalOp')
+                obj = child.find('.//p:Object', SHOWPLAN_NS)
+                table = obj.get('Table', '').strip('[]') if obj is not None else None
+                problem = None
+                if op in MSSQL_SCANS and not limited and child.find('.//p:SeekPredicates', SHOWPLAN_NS) is None:
+                    problem = 'full scan'
+                elif op == 'Sort':
+                    problem = 'sort'
+                plan.append((table, f"{op} {obj.get('Index', '') if obj is not None else ''}".strip(), problem))
+                walk(child, limited or op == 'Top')
+            else:
+                walk(child, limited)
+
+    walk(ET.fromstring(document), False)
+    return plan
+
+
+def check(engine, statements):
+    """Explain each distinct statement and collect the plans"""
+    explain = explain_mssql if engine.dialect.name == 'mssql' else explain_sqlite
+    seen = set()
+    results = []
+    with engine.connect() as connection:
+        for captured in statements:
+            key = (captured['step'], captured['statement'])
+            if key in seen:
+                continue
+            seen.add(key)
+            plan = explain(connection, captured)
+            for table, detail, problem in plan:
+                if problem and table is None:
+                    # Sorts name no table; charge them to the statement's main table
+                    table = next((name for name, _, _ in plan if name), None)
+                if not problem or table in SMALL_TABLES:
+                    verdict = 'ok'
+                elif (captured['step'], table) in EXPECTED_SCANS:
+                    verdict = 'expected'
+                else:
+                    verdict = 'FAIL'
+                results.append({
+                    'step': captured['step'],
+                    'table': table,
+                    'plan': detail,
+                    'problem': problem,
+                    'verdict': verdict,
+                    'statement': ' '.join(captured['statement'].split()),
+                })
+            connection.rollback()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail when a hot query plan regresses to a full scan')
+    parser.add_argument('--database-url', help='explain on this database instead of the capture database, '
+                                               'e.g. a SQL Server copy with production statistics')
+    parser.add_argument('--output', help='write all plans as JSON')
+    parser.add_argument('--verbose', action='store_true', help='print every plan line, not only problems')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='chaingate-plans-')
+    configure_environment(os.path.join(work_dir, 'plans.db'))
+
+    from sqlalchemy import create_engine
+    from src.main import create_app
+    from src.database import db
+
+    app = create_app('production')
+    player_id = seed(app)
+
+    capture = Capture()
+    with app.app_context():
+        capture.install(db.engine)
+    for label, run in steps(app, player_id):
+        capture.step = label
+        run()
+    capture.step = None
+
+    with app.app_context():
+        target = create_engine(args.database_url) if args.database_url else db.engine
+        results = check(target, capture.statements)
+
+    failures = [row for row in results if row['verdict'] == 'FAIL']
+    width = max(len(row['step']) for row in results)
+    for row in results:
+        if args.verbose or row['problem']:
+            print(f"{row['verdict']:<9} {row['step']:<{width}}  {row['plan']}")
+            if row['verdict'] == 'FAIL':
+                print(f"{'':<9} {'':<{width}}  {row['statement'][:200]}")
+            elif row['verdict'] == 'expected':
+                print(f"{'':<9} {'':<{width}}  ({EXPECTED_SCANS[(row['step'], row['table'])]})")
+
+    statements = len({(row['step'], row['statement']) for row in results})
+    print(f'\n{statements} statements across {len({row["step"] for row in results})} steps, '
+          f'{len(failures)} regressions')
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump({
+                'generated_at': datetime.now(timezone.utc).isoformat(),
+                'dialect': target.dialect.name,
+                'plans': results,
+            }, handle, indent=2)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator for performance work
+Bulk-loads users, wallets, transactions and audit logs with heavy-tailed activity.
+Rows are generated in worker processes and written in order through chunked
+executemany, with secondary indexes dropped for the load and rebuilt afterwards.
+Apart from the salted password hash, the output depends only on the seed, the
+volumes, --as-of and --chunk-rows.
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+from collections import deque
+from datetime import datetime, timezone
+import multiprocessing
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# users, transactions, audit logs
+PRESETS = {
+    'small': (1000, 50000, 50000),
+    'medium': (100000, 5000000, 5000000),
+    'production': (1000000, 50000000, 50000000),
+}
+
+HISTORY_DAYS = 730
+# Values allowed by the CHECK constraints in database/schema.sql
+KYC_STATUSES = (('verified', 0.72), ('pending', 0.2), ('rejected', 0.05), ('expired', 0.03))
+RISK_LEVELS = (('low', 0.8), ('medium', 0.15), ('high', 0.05))
+TX_TYPES = (('deposit', 0.58), ('withdrawal', 0.37), ('transfer', 0.05))
+# Rows older than an hour have settled; newer ones may still be in flight
+SETTLED_STATUSES = (('completed', 0.97), ('failed', 0.03))
+RECENT_STATUSES = (('pending', 0.5), ('confirmed', 0.3), ('completed', 0.2))
+CONFIRMATIONS = {'completed': 6, 'failed': 0, 'pending': 0, 'confirmed': 3}
+AUDIT_ACTIONS = (
+    ('user_login', '/api/auth/login', 0.25),
+    ('GET player.dashboard', '/api/player/dashboard', 0.3),
+    ('GET player.get_balance', '/api/player/balance', 0.15),
+    ('GET player.get_transactions', '/api/player/transactions', 0.15),
+    ('simulated_deposit', '/api/player/simulate_deposit', 0.1),
+    ('withdrawal_request', '/api/player/withdraw', 0.05),
+)
+USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:127.0) Gecko/20100101 Firefox/127.0',
+    'okhttp/4.12.0',
+)
+BECH32_CHARSET = np.frombuffer(b'qpzry9x8gf2tvdw0s3jn54khce6mua7l', dtype=np.uint8)
+
+# Tables written by the generator, parents first
+LOAD_TABLES = ('users', 'transactions', 'audit_logs', 'wallets', 'wallet_snapshots')
+# Configuration tables kept by --truncate
+KEEP_TABLES = ('compliance_rules', 'system_settings')
+
+# Shared generation settings, set once per worker process
+_settings = {}
+
+
+def _init_worker(settings):
+    _settings.update(settings)
+
+
+def _choice(rng, options, size):
+    labels = np.array([label for label, _ in options], dtype=object)
+    return labels[rng.choice(len(options), size=size, p=[p for _, p in options])]
+
+
+def _mix(values):
+    # splitmix64 finalizer; uint64 arithmetic wraps as intended
+    z = values + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _keyed(ids, stream):
+    key = np.uint64((_settings['seed'] * 8 + stream) & 0xFFFFFFFFFFFFFFFF)
+    with np.errstate(over='ignore'):
+        return _mix(np.asarray(ids, dtype=np.uint64) * np.uint64(4) ^ (key << np.uint64(32)))
+
+
+def _bech32(words):
+    # bc1q plus 38 bech32 characters, five bits per character from four 64-bit words
+    words = np.asarray(words)
+    chars = np.empty((len(words), 38), dtype=np.uint8)
+    for i in range(38):
+        chars[:, i] = BECH32_CHARSET[(words[:, i // 12] >> np.uint64(5 * (i % 12))) & np.uint64(31)]
+    return [b'bc1q' + row for row in chars.view('S38').ravel().tolist()]
+
+
+def wallet_addresses(user_ids):
+    """Deposit address of each user, derived from the seed so any block can look it up"""
+    base = np.asarray(user_ids, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        words = np.stack([_keyed(base * np.uint64(4) + np.uint64(j), 0) for j in range(4)], axis=1)
+    return np.array([address.decode() for address in _bech32(words)], dtype=object)
+
+
+def _random_addresses(rng, size):
+    return np.array([address.decode() for address in _bech32(rng.integers(0, 2 ** 63, (size, 4), dtype=np.uint64))],
+                    dtype=object)
+
+
+def _timestamps(epochs):
+    values = np.asarray(epochs).astype(np.int64).astype('datetime64[s]')
+    if _settings['sqlite']:
+        # Same text layout SQLAlchemy stores, so string range comparisons stay ordered
+        return np.char.replace(np.datetime_as_string(values.astype('datetime64[us]')), 'T', ' ').tolist()
+    # ISO 8601 with a T is read the same way under every SQL Server DATEFORMAT
+    return np.datetime_as_string(values).tolist()
+
+
+def _owners(rng, size, lo, hi):
+    """Draw active users for a time slice, weighted by activity, with event times after signup"""
+    created = _settings['created']
+    weight = _settings['weight']
+    eligible = max(1, int(np.searchsorted(created, hi, side='right')))
+    owner = np.empty(size, dtype=np.int64)
+    when = np.empty(size)
+    redraw = np.arange(size)
+    # Redraw events that land before the owner's signup, so late joiners are not
+    # squeezed into the end of the slice
+    for _ in range(8):
+        owner[redraw] = np.minimum(
+            np.searchsorted(weight, rng.random(len(redraw)) * weight[eligible - 1], side='right'), eligible - 1)
+        when[redraw] = lo + rng.random(len(redraw)) * (hi - lo)
+        redraw = redraw[when[redraw] < created[owner[redraw]]]
+        if not len(redraw):
+            break
+    when = np.floor(np.maximum(when, created[owner]))
+    order = np.argsort(when, kind='stable')
+    return owner[order], when[order]
+
+
+def generate_users(index, first, last):
+    """Users with ids first..last-1, signed up in id order"""
+    rng = np.random.default_rng([_settings['seed'], 1, index])
+    n = last - first
+    user_ids = np.arange(first, last, dtype=np.int64)
+    created = _timestamps(_settings['created'][first - 1:last - 1])
+    kyc = _choice(rng, KYC_STATUSES, n)
+    risk = _choice(rng, RISK_LEVELS, n)
+    risk[kyc == 'rejected'] = 'high'
+    is_admin = user_ids <= _settings['admins']
+    names = [
+        f'admin{user_id:07d}' if admin else f'user{user_id:07d}'
+        for user_id, admin in zip(user_ids.tolist(), is_admin.tolist())
+    ]
+    return {'users': {
+        'id': user_ids.tolist(),
+        'username': names,
+        'email': [f'{name}@example.test' for name in names],
+        'password_hash': [_settings['password_hash']] * n,
+        'role': np.where(is_admin, 'admin', 'player').tolist(),
+        'kyc_status': kyc.tolist(),
+        'risk_level': risk.tolist(),
+        'is_active': (rng.random(n) >= 0.005).astype(int).tolist(),
+        'created_at': created,
+        'updated_at': created,
+    }}
+
+
+def generate_transactions(index, first_id, size, lo, hi):
+    """One time slice of transactions, ids ascending with created_at"""
+    rng = np.random.default_rng([_settings['seed'], 2, index])
+    now = _settings['as_of']
+    owner, created = _owners(rng, size, lo, hi)
+
+    tx_type = _choice(rng, TX_TYPES, size)
+    is_deposit = tx_type == 'deposit'
+    amount = np.clip(rng.lognormal(np.log(0.02), 1.4, size), 0.00001, 25.0)
+    amount = np.round(np.where(is_deposit, amount, amount * 0.6), 8)
+    recent = now - created < 3600
+    status = np.where(recent, _choice(rng, RECENT_STATUSES, size), _choice(rng, SETTLED_STATUSES, size))
+    confirmations = np.array([CONFIRMATIONS[value] for value in status.tolist()], dtype=np.int64)
+    pending = status == 'pending'
+    confirmations[pending] = rng.integers(0, 3, int(pending.sum()))
+    in_flight = pending | (status == 'confirmed')
+    updated = np.where(in_flight, created, np.floor(np.minimum(now, created + rng.uniform(600, 3600, size))))
+    risk_score = np.round(rng.beta(1.5, 12.0, size) * 100, 2)
+    flagged = (risk_score >= 75) | (rng.random(size) < 0.005)
+    hashes = rng.bytes(32 * size).hex()
+
+    user_ids = owner + 1
+    own = wallet_addresses(user_ids)
+    external = _random_addresses(rng, size)
+    counterpart = wallet_addresses(rng.integers(1, len(_settings['created']) + 1, size))
+
+    # Settled net per user, folded into wallet balances by the parent
+    users, inverse = np.unique(owner, return_inverse=True)
+    signed = np.where(is_deposit, amount, -amount) * (status == 'completed')
+    last_seen = np.zeros(len(users))
+    np.maximum.at(last_seen, inverse, updated)
+
+    return {
+        'transactions': {
+            'id': np.arange(first_id, first_id + size).tolist(),
+            'user_id': user_ids.tolist(),
+            'type': tx_type.tolist(),
+            'amount': amount.tolist(),
+            'status': status.tolist(),
+            'tx_hash': [hashes[i:i + 64] for i in range(0, 64 * size, 64)],
+            'from_address': np.where(is_deposit, external, own).tolist(),
+            'to_address': np.where(is_deposit, own, np.where(tx_type == 'transfer', counterpart, external)).tolist(),
+            'confirmations': confirmations.tolist(),
+            'risk_score': risk_score.tolist(),
+            'flagged': flagged.astype(int).tolist(),
+            'created_at': _timestamps(created),
+            'updated_at': _timestamps(updated),
+        },
+        'balances': (users, np.bincount(inverse, weights=signed, minlength=len(users)), last_seen),
+    }
+
+
+def generate_audit_logs(index, first_id, size, lo, hi):
+    """One time slice of audit logs, mostly from each user's usual address"""
+    rng = np.random.default_rng([_settings['seed'], 3, index])
+    owner, created = _owners(rng, size, lo, hi)
+    user_ids = owner + 1
+    action = rng.choice(len(AUDIT_ACTIONS), size=size, p=[p for _, _, p in AUDIT_ACTIONS])
+
+    home = (_keyed(user_ids, 1) % np.uint64(0xDE000000) + np.uint64(0x01000000)).astype(np.int64)
+    ip = np.where(rng.random(size) < 0.9, home, rng.integers(0x01000000, 0xDF000000, size))
+    octets = np.stack([(ip >> shift) & 255 for shift in (24, 16, 8, 0)], axis=1).tolist()
+    amounts = np.round(rng.lognormal(np.log(0.02), 1.4, size), 8).tolist()
+    external = _random_addresses(rng, size).tolist()
+
+    details = []
+    for user_id, action_index, value, address in zip(user_ids.tolist(), action.tolist(), amounts, external):
+        name = AUDIT_ACTIONS[action_index][0]
+        if name == 'user_login':
+            prefix = 'admin' if user_id <= _settings['admins'] else 'user'
+            details.append(f'User {prefix}{user_id:07d}@example.test logged in successfully')
+        elif name == 'simulated_deposit':
+            details.append(f'Simulated deposit of {value} BTC')
+        elif name == 'withdrawal_request':
+            details.append(f'Withdrawal request of {value} BTC to {address}')
+        else:
+            details.append(None)
+
+    stamps = _timestamps(created)
+    return {'audit_logs': {
+        'id': np.arange(first_id, first_id + size).tolist(),
+        'user_id': user_ids.tolist(),
+        'action': [AUDIT_ACTIONS[i][0] for i in action.tolist()],
+        'resource': [AUDIT_ACTIONS[i][1] for i in action.tolist()],
+        'details': details,
+        'ip_address': ['.'.join(map(str, parts)) for parts in octets],
+        'user_agent': [USER_AGENTS[i] for i in rng.integers(0, len(USER_AGENTS), size).tolist()],
+        'created_at': stamps,
+        'updated_at': stamps,
+    }}
+
+
+GENERATORS = {
+    'users': generate_users,
+    'transactions': generate_transactions,
+    'audit_logs': generate_audit_logs,
+}
+
+
+def generate(task):
+    """Run one planned task in a worker"""
+    kind, *args = task
+    return GENERATORS[kind](*args)
+
+
+def plan(users, transactions, audit_logs, seed, as_of, chunk_rows):
+    """Fix signups, activity and slice boundaries up front so output does not depend on --workers"""
+    rng = np.random.default_rng([seed, 0])
+    start = as_of - HISTORY_DAYS * 86400
+    # Signups accelerate over the history; ids follow signup order
+    created = np.floor(start + HISTORY_DAYS * 86400 * np.sqrt(np.sort(rng.random(users))))
+    # Heavy-tailed activity: most users transact rarely, a few very often
+    weight = np.cumsum(rng.lognormal(0.0, 1.2, users))
+
+    # Expected volume grows with the activity of everyone signed up so far; cut the
+    # history into slices of equal expected volume
+    grid = np.linspace(start, as_of, 4097)
+    signed_up = np.searchsorted(created, grid, side='right')
+    rate = np.where(signed_up > 0, weight[np.maximum(signed_up - 1, 0)], 0.0)
+    volume = np.concatenate([[0.0], np.cumsum((rate[1:] + rate[:-1]) / 2)])
+
+    def slices(kind, total):
+        count = max(1, -(-total // chunk_rows))
+        bounds = np.floor(np.interp(np.linspace(0, volume[-1], count + 1), volume, grid))
+        bounds[-1] = as_of
+        sizes = [total // count + (1 if i < total % count else 0) for i in range(count)]
+        offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(int)
+        return [
+            (kind, i, int(offsets[i]) + 1, sizes[i], float(bounds[i]), float(bounds[i + 1]))
+            for i in range(count) if sizes[i]
+        ]
+
+    user_tasks = [
+        ('users', i, first, min(first + chunk_rows, users + 1))
+        for i, first in enumerate(range(1, users + 1, chunk_rows))
+    ]
+    tasks = user_tasks + slices('transactions', transactions) + slices('audit_logs', audit_logs)
+    return tasks, {'created': created, 'weight': weight}
+
+
+def produce(tasks, workers, settings):
+    """Yield generated blocks in task order, keeping at most two blocks per worker in flight"""
+    _init_worker(settings)
+    if workers <= 1:
+        for task in tasks:
+            yield generate(task)
+        return
+
+    with multiprocessing.get_context().Pool(workers, initializer=_init_worker, initargs=(settings,)) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(generate, (task,)))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def wallet_blocks(balances, last_seen, chunk_rows):
+    """Wallets and opening snapshots, written once every transaction has been folded in"""
+    created = _settings['created']
+    for first in range(1, len(created) + 1, chunk_rows):
+        last = min(first + chunk_rows, len(created) + 1)
+        user_ids = np.arange(first, last)
+        balance = np.round(np.maximum(balances[first - 1:last - 1], 0.0), 8).tolist()
+        opened = _timestamps(created[first - 1:last - 1])
+        updated = _timestamps(np.maximum(created[first - 1:last - 1], last_seen[first - 1:last - 1]))
+        yield {
+            'wallets': {
+                'id': user_ids.tolist(),
+                'user_id': user_ids.tolist(),
+                'address': wallet_addresses(user_ids).tolist(),
+                'balance': balance,
+                'currency': ['BTC'] * len(user_ids),
+                'created_at': opened,
+                'updated_at': updated,
+            },
+            # The ledger derives balances from the latest snapshot, so it agrees with wallets.balance
+            'wallet_snapshots': {
+                'id': user_ids.tolist(),
+                'wallet_id': user_ids.tolist(),
+                'balance': balance,
+                'last_entry_id': [0] * len(user_ids),
+                'created_at': updated,
+                'updated_at': updated,
+            },
+        }
+
+
+class Loader:
+    """Write column blocks through the driver's executemany with dialect-compiled INSERTs"""
+
+    def __init__(self, connection, tables, batch_size):
+        self.connection = connection
+        self.dialect = connection.dialect
+        self.tables = tables
+        self.batch_size = batch_size
+        self.rows = dict.fromkeys(tables, 0)
+        self._statements = {}
+
+    def write(self, name, columns):
+        table = self.tables[name]
+        sql, order = self._statement(table, columns)
+        rows = list(zip(*(columns[key] for key in order)))
+        if not rows:
+            return 0
+
+        cursor = self.connection.connection.cursor()
+        try:
+            if self.dialect.name == 'mssql':
+                # Explicit ids into IDENTITY columns; pyodbc sends each batch as one parameter array
+                cursor.fast_executemany = True
+                cursor.execute(f'SET IDENTITY_INSERT {self._quoted(table)} ON')
+            for start in range(0, len(rows), self.batch_size):
+                cursor.executemany(sql, rows[start:start + self.batch_size])
+            if self.dialect.name == 'mssql':
+                cursor.execute(f'SET IDENTITY_INSERT {self._quoted(table)} OFF')
+        finally:
+            cursor.close()
+        self.rows[name] += len(rows)
+        return len(rows)
+
+    def _statement(self, table, columns):
+        key = (table.name, tuple(sorted(columns)))
+        if key not in self._statements:
+            compiled = table.insert().compile(dialect=self.dialect, column_keys=list(columns))
+            self._statements[key] = (str(compiled), list(compiled.positiontup))
+        return self._statements[key]
+
+    def _quoted(self, table):
+        return self.dialect.identifier_preparer.format_table(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-load a synthetic ChainGate dataset')
+    parser.add_argument('--database-url', help='target database, e.g. sqlite:///chaingate.db (default: app config)')
+    parser.add_argument('--config', default='default', help='application config name')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small')
+    parser.add_argument('--users', type=int, help='users, one wallet each')
+    parser.add_argument('--transactions', type=int, help='transactions in total')
+    parser.add_argument('--audit-logs', type=int, help='audit log rows in total')
+    parser.add_argument('--admins', type=int, default=1, help='the first N users are admins')
+    parser.add_argument('--password', default='demo123', help='password shared by every generated user')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--as-of', help='UTC end of the generated history, YYYY-MM-DD (default: today)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='generator processes')
+    parser.add_argument('--chunk-rows', type=int, default=200000, help='generated rows per worker task')
+    parser.add_argument('--batch-size', type=int, default=10000, help='rows per executemany call')
+    parser.add_argument('--truncate', action='store_true', help='delete existing data first')
+    parser.add_argument('--keep-indexes', action='store_true', help='maintain secondary indexes during the load')
+    args = parser.parse_args()
+
+    users, transactions, audit_logs = PRESETS[args.preset]
+    users = args.users if args.users is not None else users
+    transactions = args.transactions if args.transactions is not None else transactions
+    audit_logs = args.audit_logs if args.audit_logs is not None else audit_logs
+    as_of = datetime.strptime(args.as_of, '%Y-%m-%d') if args.as_of else datetime.now(timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+
+    # The app reads DATABASE_URL when src is imported
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+
+    from sqlalchemy import func, select
+    from werkzeug.security import generate_password_hash
+    from src.main import create_app
+    from src.database import db
+    from src.services.dashboard_stats import dashboard_stats
+
+    app = create_app(args.config)
+    with app.app_context():
+        db.create_all()
+        engine = db.engine
+        tables = {name: db.metadata.tables[name] for name in LOAD_TABLES}
+        deferred = [] if args.keep_indexes else [index for table in tables.values() for index in table.indexes]
+
+        with engine.connect() as connection:
+            with connection.begin():
+                existing = connection.execute(select(func.count()).select_from(tables['users'])).scalar_one()
+            if existing and not args.truncate:
+                parser.error(f'the target database already has {existing} users; pass --truncate to replace them')
+            if args.truncate:
+                with connection.begin():
+                    connection.execute(db.metadata.tables['system_settings'].update().values(updated_by=None))
+                    for table in reversed(db.metadata.sorted_tables):
+                        if table.name not in KEEP_TABLES:
+                            connection.execute(table.delete())
+
+            if engine.dialect.name == 'sqlite':
+                # Durability is pointless for a throwaway load; WAL stays on for the app
+                with connection.begin():
+                    connection.exec_driver_sql('PRAGMA synchronous=OFF')
+                    connection.exec_driver_sql('PRAGMA cache_size=-262144')
+
+            started = time.perf_counter()
+            with connection.begin():
+                for index in deferred:
+                    index.drop(connection, checkfirst=True)
+
+            as_of_epoch = as_of.replace(tzinfo=timezone.utc).timestamp()
+            tasks, timeline = plan(users, transactions, audit_logs, args.seed, as_of_epoch, args.chunk_rows)
+            settings = dict(
+                timeline,
+                seed=args.seed,
+                as_of=as_of_epoch,
+                admins=args.admins,
+                password_hash=generate_password_hash(args.password),
+                sqlite=engine.dialect.name == 'sqlite',
+            )
+            print(f'Generating {users} users, {transactions} transactions and {audit_logs} audit logs '
+                  f'as of {as_of:%Y-%m-%d} in {len(tasks)} blocks on {args.workers} workers (seed {args.seed})')
+
+            loader = Loader(connection, tables, args.batch_size)
+            balances = np.zeros(users)
+            last_seen = np.zeros(users)
+            blocks = produce(tasks, args.workers, settings)
+            for done, block in enumerate(itertools.chain(blocks, [None]), 1):
+                if block is None:
+                    # Wallets go last, once every transaction has been folded into the balances
+                    block = {}
+                    for wallets in wallet_blocks(balances, last_seen, args.chunk_rows):
+                        with connection.begin():
+                            for name, columns in wallets.items():
+                                loader.write(name, columns)
+                elif 'balances' in block:
+                    owners, net, seen = block.pop('balances')
+                    balances[owners] += net
+                    last_seen[owners] = np.maximum(last_seen[owners], seen)
+
+                with connection.begin():
+                    for name, columns in block.items():
+                        loader.write(name, columns)
+                elapsed = time.perf_counter() - started
+                total = sum(loader.rows.values())
+                print(f'  block {done}/{len(tasks) + 1}: {total} rows, {total / elapsed:,.0f} rows/s', flush=True)
+
+            indexed = time.perf_counter()
+            with connection.begin():
+                for index in deferred:
+                    index.create(connection, checkfirst=True)
+                if engine.dialect.name == 'sqlite':
+                    connection.exec_driver_sql('ANALYZE')
+            print(f'Rebuilt {len(deferred)} indexes in {time.perf_counter() - indexed:.1f}s')
+
+        dashboard_stats.reconcile()
+
+    elapsed = time.perf_counter() - started
+    for name, count in loader.rows.items():
+        print(f'  {name:<18} {count:>12,}')
+    print(f'Loaded {sum(loader.rows.values()):,} rows in {elapsed:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
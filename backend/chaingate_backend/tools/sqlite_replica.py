@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for an asynchronous read replica
+Copies a primary SQLite file into a replica file with the online backup API,
+once or every --interval seconds, so the replica lags the primary the way a
+SQL Server readable secondary does. Point the app at both files with
+DATABASE_URL=sqlite:///primary.db DATABASE_REPLICA_URL=sqlite:///replica.db
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+
+
+def sync(primary, replica):
+    """Replace the replica's contents with a consistent snapshot of the primary"""
+    source = sqlite3.connect(f'file:{primary}?mode=ro', uri=True)
+    target = sqlite3.connect(replica)
+    try:
+        # Readers of the replica keep their snapshot until the copy commits
+        target.execute('PRAGMA busy_timeout=5000')
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Copy a primary SQLite database into a replica file')
+    parser.add_argument('primary', help='primary database file')
+    parser.add_argument('replica', help='replica database file')
+    parser.add_argument('--interval', type=float, default=0, help='repeat every N seconds; 0 copies once')
+    args = parser.parse_args()
+
+    while True:
+        started = time.perf_counter()
+        try:
+            sync(args.primary, args.replica)
+        except sqlite3.Error as e:
+            print(f'Sync failed: {e}', file=sys.stderr)
+            if not args.interval:
+                sys.exit(1)
+        else:
+            print(f'Synced {args.primary} -> {args.replica} in {(time.perf_counter() - started) * 1000:.0f}ms')
+        if not args.interval:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+"""
+WSGI entry point for ChainGate
+Served by gunicorn with gunicorn.conf.py; FLASK_CONFIG picks the configuration
+"""
+
+import os
+
+from src.main import create_app
+
+app = create_app(os.getenv('FLASK_CONFIG', 'production'))
@@ -0,0 +1,65 @@
+-- ChainGate Index Definitions
+-- For SQL Server
+-- Mirrors the indexes declared on the models; tools/check_query_plans.py fails when a
+-- hot query stops using them
+
+USE chaingate;
+GO
+
+-- Superseded by the composite and filtered indexes below
+DROP INDEX IF EXISTS idx_transactions_user_id ON transactions;
+DROP INDEX IF EXISTS idx_transactions_created_at ON transactions;
+DROP INDEX IF EXISTS idx_transactions_status ON transactions;
+DROP INDEX IF EXISTS idx_audit_logs_user_id ON audit_logs;
+DROP INDEX IF EXISTS idx_kyc_documents_user_id ON kyc_documents;
+DROP INDEX IF EXISTS ix_kyc_documents_user_id ON kyc_documents;
+
+-- Users: KYC review queues and the pending_kyc counter
+CREATE INDEX ix_users_kyc_status ON users(kyc_status);
+
+-- Wallets: every player request looks up the wallet by owner
+CREATE INDEX ix_wallets_user_id ON wallets(user_id);
+
+-- Simulated transaction hashes are unique; filtered so legacy NULL hashes are allowed
+CREATE UNIQUE INDEX uq_transactions_tx_hash ON transactions(tx_hash) WHERE tx_hash IS NOT NULL;
+
+-- Player history, keyset pages and daily deposit totals; the clustered key (id)
+-- breaks created_at ties, so ORDER BY created_at, id needs no sort
+CREATE INDEX ix_transactions_user_id_created_at ON transactions(user_id, created_at) INCLUDE (type, amount, status);
+
+-- Admin listing and date-range exports
+CREATE INDEX ix_transactions_created_at ON transactions(created_at);
+
+-- Live monitoring tails recently changed transactions
+CREATE INDEX ix_transactions_updated_at ON transactions(updated_at);
+
+-- Flagged rows are a small slice of the table
+CREATE INDEX ix_transactions_flagged ON transactions(created_at) INCLUDE (user_id, amount, status) WHERE flagged = 1;
+
+-- Rows the risk engine has yet to score. It used to track a last-scored id in
+-- system_settings, with new rows defaulting to 0.00; rows past that mark are unscored
+UPDATE transactions SET risk_score = NULL
+WHERE risk_score = 0
+  AND id > (SELECT CAST(value AS INT) FROM system_settings WHERE [key] = 'risk_engine_last_id');
+DELETE FROM system_settings WHERE [key] = 'risk_engine_last_id';
+CREATE INDEX ix_transactions_unscored ON transactions(id) WHERE risk_score IS NULL;
+
+-- In-flight rows advanced by the confirmation engine on every block; queries must
+-- repeat the filter literally for the optimizer to match it. Confirmed rows complete
+-- at 6 confirmations; earlier versions left them confirmed, so settle those once
+UPDATE transactions SET status = 'completed' WHERE status = 'confirmed' AND confirmations >= 6;
+CREATE INDEX ix_transactions_pending ON transactions(status, confirmations) WHERE status IN ('pending', 'confirmed');
+
+-- KYC documents and risk assessments by user; uploads look up re-sent files by hash
+CREATE INDEX ix_kyc_documents_user_id_content_hash ON kyc_documents(user_id, content_hash);
+CREATE INDEX ix_risk_assessments_user_id_created_at ON risk_assessments(user_id, created_at);
+
+-- Audit logs: date-range exports and one user's activity
+CREATE INDEX ix_audit_logs_created_at ON audit_logs(created_at);
+CREATE INDEX ix_audit_logs_user_id_created_at ON audit_logs(user_id, created_at);
+
+-- Ledger balances sum the entries after a wallet's latest snapshot
+CREATE INDEX ix_wallet_entries_wallet_id ON wallet_entries(wallet_id);
+CREATE INDEX ix_wallet_snapshots_wallet_id ON wallet_snapshots(wallet_id);
+
+GO
@@ -43,7 +43,7 @@ CREATE TABLE transactions (
     from_address NVARCHAR(255),
     to_address NVARCHAR(255),
     confirmations INT DEFAULT 0,
-    risk_score DECIMAL(5,2) DEFAULT 0.00,
+    risk_score DECIMAL(5,2), -- NULL until the risk engine scores the row
     flagged BIT DEFAULT 0,
     created_at DATETIME2 DEFAULT GETDATE(),
     updated_at DATETIME2 DEFAULT GETDATE()
@@ -54,9 +54,13 @@ CREATE TABLE kyc_documents (
     id INT IDENTITY(1,1) PRIMARY KEY,
     user_id INT NOT NULL FOREIGN KEY REFERENCES users(id),
     document_type NVARCHAR(50) NOT NULL,
-    document_number NVARCHAR(100),
+    document_number NVARCHAR(255), -- envelope-encrypted token; holds up to 100 ASCII characters
     file_path NVARCHAR(500),
-    status NVARCHAR(20) DEFAULT 'pending' CHECK (status IN ('pending', 'approved', 'rejected')),
+    content_hash NVARCHAR(64),
+    file_size BIGINT,
+    mime_type NVARCHAR(50),
+    status NVARCHAR(20) DEFAULT 'pending' CHECK (status IN ('processing', 'pending', 'approved', 'rejected')),
+    rejection_reason NVARCHAR(255),
     verified_by INT FOREIGN KEY REFERENCES users(id),
     verified_at DATETIME2,
     created_at DATETIME2 DEFAULT GETDATE(),
@@ -93,7 +97,60 @@ CREATE TABLE compliance_rules (
     rule_type NVARCHAR(50) NOT NULL,
     threshold DECIMAL(18,8),
     is_active BIT DEFAULT 1,
-    created_at DATETIME2 DEFAULT GETDATE()
+    created_at DATETIME2 DEFAULT GETDATE(),
+    updated_at DATETIME2 DEFAULT GETDATE()
+);
+
+-- System Settings Table
+CREATE TABLE system_settings (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    [key] NVARCHAR(100) UNIQUE NOT NULL,
+    value NVARCHAR(500),
+    description NVARCHAR(500),
+    updated_by INT FOREIGN KEY REFERENCES users(id),
+    created_at DATETIME2 DEFAULT GETDATE(),
+    updated_at DATETIME2 DEFAULT GETDATE()
+);
+
+-- ID Sequences Table (blocks leased by the identifier allocator)
+CREATE TABLE id_sequences (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    name NVARCHAR(50) UNIQUE NOT NULL,
+    next_value BIGINT NOT NULL,
+    created_at DATETIME2 DEFAULT GETDATE(),
+    updated_at DATETIME2 DEFAULT GETDATE()
+);
+
+-- Stat Counters Table (sharded dashboard aggregates)
+CREATE TABLE stat_counters (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    name NVARCHAR(50) NOT NULL,
+    shard INT NOT NULL DEFAULT 0,
+    value BIGINT NOT NULL DEFAULT 0,
+    created_at DATETIME2 DEFAULT GETDATE(),
+    updated_at DATETIME2 DEFAULT GETDATE(),
+    CONSTRAINT uq_stat_counters_name UNIQUE (name, shard)
+);
+
+-- Wallet Entries Table (append-only ledger; amount is signed)
+CREATE TABLE wallet_entries (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    wallet_id INT NOT NULL FOREIGN KEY REFERENCES wallets(id),
+    transaction_id INT FOREIGN KEY REFERENCES transactions(id),
+    entry_type NVARCHAR(20) NOT NULL CHECK (entry_type IN ('credit', 'debit')),
+    amount DECIMAL(18,8) NOT NULL,
+    created_at DATETIME2 DEFAULT GETDATE(),
+    updated_at DATETIME2 DEFAULT GETDATE()
+);
+
+-- Wallet Snapshots Table (balance checkpoints over wallet_entries)
+CREATE TABLE wallet_snapshots (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    wallet_id INT NOT NULL FOREIGN KEY REFERENCES wallets(id),
+    balance DECIMAL(18,8) NOT NULL,
+    last_entry_id INT NOT NULL DEFAULT 0,
+    created_at DATETIME2 DEFAULT GETDATE(),
+    updated_at DATETIME2 DEFAULT GETDATE()
 );
 
 -- Insert Default Data
@@ -112,13 +169,6 @@ INSERT INTO compliance_rules (rule_name, description, rule_type, threshold) VALU
 
 GO
 
--- Create Indexes for Performance
-CREATE INDEX idx_transactions_user_id ON transactions(user_id);
-CREATE INDEX idx_transactions_created_at ON transactions(created_at);
-CREATE INDEX idx_transactions_status ON transactions(status);
-CREATE INDEX idx_audit_logs_user_id ON audit_logs(user_id);
-CREATE INDEX idx_kyc_documents_user_id ON kyc_documents(user_id);
-
-GO
+-- Indexes are created by indexes.sql
 
 PRINT 'ChainGate database schema created successfully!';
\ No newline at end of file